@@ -0,0 +1,89 @@
+"""Image sniffing and preprocessing shared by the api/ entry points.
+
+Uploads are checked by their magic bytes (never the client's Content-Type),
+then downscaled and re-encoded to fit the inline-data budget before they are
+sent to Gemini. Encoded images are memory-mapped rather than read onto the
+heap. Pillow is imported on first use, so a cold start that serves /health
+never pays for it.
+"""
+
+import mmap
+import os
+from contextlib import contextmanager
+from io import BytesIO
+from typing import BinaryIO, Iterator, Tuple, Union
+
+# Encoded size budget for the image sent inline to Gemini
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", "1048576"))
+IMAGE_MAX_DIMENSION = 1024
+JPEG_QUALITY_LADDER = (85, 75, 65, 55, 45)
+# Magic bytes of the formats Pillow can decode for Gemini
+IMAGE_SIGNATURES = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a", b"BM", b"II*\x00", b"MM\x00*")
+SNIFF_BYTES = 16
+
+
+def is_image(head: bytes) -> bool:
+    return head.startswith(IMAGE_SIGNATURES) or (head[:4] == b"RIFF" and head[8:12] == b"WEBP")
+
+
+@contextmanager
+def _mapped(source: Union[str, BinaryIO]) -> Iterator[mmap.mmap]:
+    if isinstance(source, str):
+        with open(source, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+            yield contents
+    else:
+        # fileno() rolls a SpooledTemporaryFile over to disk first
+        fd = source.fileno()
+        source.flush()
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as contents:
+            yield contents
+
+
+def preprocess_image(
+    source: Union[str, BinaryIO], max_size: int = IMAGE_MAX_DIMENSION, max_bytes: int = IMAGE_MAX_BYTES
+) -> Tuple[bytes, str]:
+    """Downscale and encode the image at ``source`` (a path or an open file) to fit the size budget.
+
+    Returns ``(bytes, mime_type)``. The file is memory-mapped rather than read
+    into a bytes object.
+    """
+    from PIL import Image
+
+    with _mapped(source) as contents, Image.open(contents) as img:
+        return _fit_image(img, contents, max_size, max_bytes)
+
+
+def _fit_image(img, contents, max_size: int, max_bytes: int) -> Tuple[bytes, str]:
+    from PIL import Image
+
+    # Already a model-ready JPEG without EXIF, comments or other metadata
+    # segments (GPS, device and patient fields): hand the upload over untouched.
+    # Anything else is re-encoded, which drops the metadata.
+    metadata = any(
+        not (marker == 'APP0' and payload.startswith(b'JFIF\0'))
+        and not (marker == 'APP14' and payload.startswith(b'Adobe'))
+        for marker, payload in getattr(img, 'applist', ())
+    )
+    if (img.format == 'JPEG' and img.mode in ('RGB', 'L') and not metadata
+            and max(img.size) <= max_size and len(contents) <= max_bytes):
+        return contents[:], "image/jpeg"
+
+    # Let libjpeg decode large scans at reduced resolution
+    if img.format == 'JPEG':
+        img.draft('RGB', (max_size, max_size))
+
+    # Convert to RGB if needed (grayscale scans stay single-channel)
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    # Resize if too large
+    if img.width > max_size or img.height > max_size:
+        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+    # Walk down the quality ladder until the encoded image fits the budget
+    for quality in JPEG_QUALITY_LADDER:
+        buffered = BytesIO()
+        img.save(buffered, format="JPEG", quality=quality)
+        if buffered.tell() <= max_bytes:
+            break
+    return buffered.getvalue(), "image/jpeg"
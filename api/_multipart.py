@@ -0,0 +1,205 @@
+"""Incremental multipart/form-data parser for the http.server entry point.
+
+The body is read from the request stream in fixed-size chunks and never held
+whole: text fields are kept in memory (up to ``max_field_bytes``), file parts
+are written to a ``SpooledTemporaryFile`` that moves to disk past
+``spool_bytes``, and a declared length over ``max_body_bytes`` is refused
+before anything is read. Bytes are never decoded, so binary image parts
+arrive intact. Standard library only.
+"""
+
+import re
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Dict, Optional, Tuple
+
+CHUNK_BYTES = 64 * 1024
+SPOOL_BYTES = 1024 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+
+_BOUNDARY = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+_PARAM = re.compile(r';\s*([\w*-]+)\s*=\s*(?:"((?:[^"\\]|\\.)*)"|([^;]*))')
+
+
+class MultipartError(ValueError):
+    """The body is not valid multipart/form-data."""
+
+
+class PayloadTooLarge(MultipartError):
+    """The body, or one of its parts, is over the configured limit."""
+
+
+@dataclass
+class UploadedFile:
+    """A file part, rewound and ready to read; ``close()`` deletes any spilled temp file."""
+
+    name: str
+    filename: str
+    content_type: str
+    file: BinaryIO
+    size: int
+
+    def read(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def parse_boundary(content_type: str) -> bytes:
+    match = _BOUNDARY.search(content_type or "")
+    if not match:
+        raise MultipartError("Missing boundary in multipart/form-data")
+    boundary = match.group(1).strip()
+    if not 1 <= len(boundary) <= 70:
+        raise MultipartError("Invalid multipart boundary")
+    return boundary.encode("latin-1")
+
+
+def _content_disposition(headers: Dict[str, str]) -> Tuple[str, Optional[str]]:
+    value = headers.get("content-disposition", "")
+    if not value.lower().startswith("form-data"):
+        raise MultipartError("Part is missing a form-data Content-Disposition")
+    params = {}
+    for match in _PARAM.finditer(value):
+        quoted, bare = match.group(2), match.group(3)
+        params[match.group(1).lower()] = quoted.replace('\\"', '"') if quoted is not None else bare.strip()
+    if "name" not in params:
+        raise MultipartError("Part is missing a field name")
+    return params["name"], params.get("filename")
+
+
+def _parse_headers(raw: bytes) -> Dict[str, str]:
+    headers = {}
+    # Browsers send UTF-8 filenames
+    for line in raw.decode("utf-8", errors="replace").split("\r\n"):
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise MultipartError("Malformed part header")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def parse_multipart(
+    stream: BinaryIO,
+    content_type: str,
+    content_length: int,
+    max_body_bytes: int,
+    max_field_bytes: int = MAX_FIELD_BYTES,
+    chunk_bytes: int = CHUNK_BYTES,
+    spool_bytes: int = SPOOL_BYTES,
+) -> Tuple[Dict[str, str], Dict[str, UploadedFile]]:
+    """Parse ``content_length`` bytes of multipart/form-data from ``stream``.
+
+    Returns ``(fields, files)``. Raises ``PayloadTooLarge`` before reading
+    anything if ``content_length`` is over ``max_body_bytes``, and
+    ``MultipartError`` for malformed or truncated bodies and repeated file
+    fields; files parsed so far are closed when parsing fails.
+    """
+
+    if content_length > max_body_bytes:
+        raise PayloadTooLarge(f"Request body is {content_length} bytes; the limit is {max_body_bytes}")
+    delimiter = b"\r\n--" + parse_boundary(content_type)
+    keep = len(delimiter) + 1  # enough to spot a delimiter split across chunks
+
+    fields: Dict[str, str] = {}
+    files: Dict[str, UploadedFile] = {}
+    # A leading CRLF lets the first boundary match the same delimiter as the rest
+    buffer = bytearray(b"\r\n")
+    remaining = content_length
+    state = "preamble"
+    part_name = ""
+    part_file: Optional[UploadedFile] = None
+    part_value = bytearray()
+
+    def write(data) -> None:
+        nonlocal part_value
+        if part_file is not None:
+            part_file.file.write(data)
+            part_file.size += len(data)
+        else:
+            if len(part_value) + len(data) > max_field_bytes:
+                raise PayloadTooLarge(f"Field {part_name!r} is over {max_field_bytes} bytes")
+            part_value += data
+
+    def fill() -> None:
+        nonlocal remaining
+        if not remaining:
+            raise MultipartError("Multipart body is truncated")
+        chunk = stream.read(min(chunk_bytes, remaining))
+        if not chunk:
+            raise MultipartError("Request body ended early")
+        remaining -= len(chunk)
+        buffer.extend(chunk)
+
+    try:
+        while state != "done":
+            if state in ("preamble", "body"):
+                index = buffer.find(delimiter)
+                if index == -1:
+                    safe = len(buffer) - keep
+                    if safe > 0:
+                        if state == "body":
+                            write(buffer[:safe])
+                        del buffer[:safe]
+                    fill()
+                    continue
+                if state == "body":
+                    write(buffer[:index])
+                    if part_file is not None:
+                        part_file.file.seek(0)
+                        files[part_name] = part_file
+                        part_file = None
+                    else:
+                        fields[part_name] = part_value.decode("utf-8", errors="replace")
+                        part_value = bytearray()
+                del buffer[: index + len(delimiter)]
+                state = "delimiter"
+            elif state == "delimiter":
+                if len(buffer) < 2:
+                    fill()
+                elif buffer[:2] == b"--":
+                    state = "done"
+                elif buffer[:2] == b"\r\n":
+                    del buffer[:2]
+                    state = "headers"
+                else:
+                    raise MultipartError("Malformed multipart boundary")
+            else:
+                index = buffer.find(b"\r\n\r\n")
+                if index == -1:
+                    if len(buffer) > MAX_HEADER_BYTES:
+                        raise MultipartError("Part headers are too large")
+                    fill()
+                    continue
+                headers = _parse_headers(bytes(buffer[:index]))
+                del buffer[: index + 4]
+                part_name, filename = _content_disposition(headers)
+                if filename is not None:
+                    if part_name in files:
+                        # Each repeat would otherwise hold another spooled file open
+                        raise MultipartError(f"File field {part_name!r} is repeated")
+                    part_file = UploadedFile(
+                        name=part_name,
+                        filename=filename,
+                        content_type=headers.get("content-type", "application/octet-stream"),
+                        file=SpooledTemporaryFile(max_size=spool_bytes),
+                        size=0,
+                    )
+                state = "body"
+    except BaseException:
+        if part_file is not None:
+            part_file.close()
+        for uploaded in files.values():
+            uploaded.close()
+        raise
+
+    # Drain the epilogue so the connection can be reused
+    while remaining:
+        chunk = stream.read(min(chunk_bytes, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+    return fields, files
@@ -0,0 +1,88 @@
+"""Configured LLM provider clients, cached per (provider, model, configuration).
+
+Shared by the backend and the serverless entry points in ``api/``. Vercel ships
+``api/`` without ``backend/`` and the Docker image ships only ``backend/app``,
+so this file is mirrored verbatim at ``api/_providers.py``; a backend test
+keeps the two identical. Keep it free of imports from either tree.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class ProviderRegistry:
+    """Build each configured client once and hand the same instance to every caller.
+
+    Constructing a chat model (or configuring the Gemini SDK) per request costs
+    a client, its connection pool and its auth setup every time; cached clients
+    keep their connections warm. Callers use the clients' async methods
+    (``ainvoke``/``astream``, ``generate_content_async``) so one worker can have
+    many generations in flight.
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self._genai_config: Optional[Hashable] = None
+
+    def get(self, provider: str, model: str, factory: Callable[[], Any], **config: Any) -> Any:
+        """The client for ``(provider, model, config)``, created with ``factory()`` on first use."""
+
+        key = (provider, model, _freeze(config))
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = factory()
+                    self._clients[key] = client
+        return client
+
+    def gemini(
+        self,
+        model: str,
+        api_key: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        safety_settings: Optional[Any] = None,
+        client_options: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """A ``google.generativeai.GenerativeModel``; the SDK is configured once per key and endpoint."""
+
+        def build() -> Any:
+            import google.generativeai as genai
+
+            sdk_config = (api_key, _freeze(client_options))
+            if sdk_config != self._genai_config:
+                genai.configure(api_key=api_key, client_options=client_options)
+                self._genai_config = sdk_config
+            options = {"generation_config": generation_config, "safety_settings": safety_settings}
+            return genai.GenerativeModel(model, **{name: value for name, value in options.items() if value is not None})
+
+        return self.get(
+            "gemini",
+            model,
+            build,
+            api_key=api_key,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+            client_options=client_options,
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            self._genai_config = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+registry = ProviderRegistry()
@@ -1,23 +1,44 @@
 # Vercel Python Serverless Function with Gemini AI
 from http.server import BaseHTTPRequestHandler
+import importlib.util
 import json
 import os
 import traceback
+import sys
 from urllib.parse import parse_qs
 from io import BytesIO
 import warnings
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _images import IMAGE_MAX_BYTES, SNIFF_BYTES, is_image, preprocess_image  # noqa: E402
+from _multipart import MultipartError, PayloadTooLarge, parse_multipart  # noqa: E402
+from _providers import registry  # noqa: E402
+
 # Suppress gRPC ALTS warnings
 os.environ['GRPC_VERBOSITY'] = 'ERROR'
 os.environ['GLOG_minloglevel'] = '2'
 warnings.filterwarnings('ignore', category=UserWarning, module='google.auth')
 
-# Import Gemini AI
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+# Gemini AI is imported on the first AI request, not at cold start
+GEMINI_AVAILABLE = importlib.util.find_spec("google.generativeai") is not None
+
+# Generation settings for complete responses; the configured model is built
+# once per warm instance by the shared provider registry
+GEMINI_MODEL = 'gemini-2.0-flash-exp'
+# host:port of a Gemini-compatible gRPC endpoint, e.g. the load-test stand-in
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 50,
+    "max_output_tokens": 8192,  # Allow longer responses
+    "response_mime_type": "text/plain",
+}
+
+# Uploads are streamed to a temp file and refused past this size before they
+# are read; the image itself is downscaled to IMAGE_MAX_BYTES before it is sent
+# inline to Gemini
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -35,6 +56,15 @@ class handler(BaseHTTPRequestHandler):
                 "message": "Mediverse API is running",
                 "service": "Medical AI Assistant"
             }
+        elif 'warmup' in path:
+            # Pre-warm ping: pay the SDK import now instead of on the first question
+            if GEMINI_AVAILABLE:
+                api_key = os.getenv('GEMINI_API_KEY')
+                if api_key:
+                    self.gemini_model(api_key)
+                else:
+                    import google.generativeai  # noqa: F401
+            response = {"status": "warm", "gemini_available": GEMINI_AVAILABLE}
         else:
             response = {
                 "message": "Mediverse Medical AI API",
@@ -43,6 +73,7 @@ class handler(BaseHTTPRequestHandler):
                 "endpoints": {
                     "GET /api": "API info",
                     "GET /api/health": "Health check",
+                    "GET /api/warmup": "Load the AI SDK ahead of traffic",
                     "POST /api/v1/analyze": "Medical AI analysis"
                 }
             }
@@ -51,13 +82,11 @@ class handler(BaseHTTPRequestHandler):
         return
     
     def do_POST(self):
+        image = None
         try:
             # Get content length
             content_length = int(self.headers.get('Content-Length', 0))
             
-            # Read the POST data
-            post_data = self.rfile.read(content_length)
-            
             # Parse path (remove query params)
             path = self.path.split('?')[0]
             
@@ -68,10 +97,18 @@ class handler(BaseHTTPRequestHandler):
                 
                 content_type = self.headers.get('Content-Type', '')
                 
+                if content_length > MAX_UPLOAD_BYTES:
+                    self.send_error_response(
+                        413,
+                        "Request body too large",
+                        {"content_length": content_length, "max_bytes": MAX_UPLOAD_BYTES}
+                    )
+                    return
+                
                 if 'application/json' in content_type:
                     # Parse JSON request
                     try:
-                        request_data = json.loads(post_data.decode('utf-8'))
+                        request_data = json.loads(self.rfile.read(content_length).decode('utf-8'))
                         query = request_data.get('query', '')
                         mode = request_data.get('mode', 'quick')
                     except json.JSONDecodeError:
@@ -79,54 +116,32 @@ class handler(BaseHTTPRequestHandler):
                         return
                         
                 elif 'multipart/form-data' in content_type:
-                    # Parse FormData - extract boundary and fields
+                    # Stream the form: text fields stay in memory, the image spools to a temp file
                     try:
-                        # Extract boundary from Content-Type header
-                        boundary = None
-                        for part in content_type.split(';'):
-                            if 'boundary=' in part:
-                                boundary = part.split('boundary=')[1].strip()
-                                break
-                        
-                        if not boundary:
-                            self.send_error_response(400, "Missing boundary in multipart/form-data")
-                            return
-                        
-                        body_str = post_data.decode('utf-8', errors='ignore')
-                        
-                        # Split by boundary
-                        parts = body_str.split('--' + boundary)
-                        
-                        for part in parts:
-                            # Skip empty parts
-                            if not part.strip() or part.strip() == '--':
-                                continue
-                                
-                            # Extract field name and value
-                            if 'Content-Disposition' in part:
-                                # Get the field name
-                                field_name = None
-                                if 'name="query"' in part:
-                                    field_name = 'query'
-                                elif 'name="mode"' in part:
-                                    field_name = 'mode'
-                                
-                                if field_name:
-                                    # Find the value after the headers (after \r\n\r\n)
-                                    header_end = part.find('\r\n\r\n')
-                                    if header_end != -1:
-                                        value_start = header_end + 4
-                                        # Value ends at the end of this part (may have trailing \r\n)
-                                        value = part[value_start:].strip()
-                                        
-                                        if field_name == 'query':
-                                            query = value
-                                        elif field_name == 'mode':
-                                            mode = value
-                        
-                    except Exception as parse_error:
+                        fields, files = parse_multipart(
+                            self.rfile, content_type, content_length, max_body_bytes=MAX_UPLOAD_BYTES
+                        )
+                    except PayloadTooLarge as too_large:
+                        self.send_error_response(413, str(too_large))
+                        return
+                    except MultipartError as parse_error:
                         self.send_error_response(400, f"Error parsing form data: {str(parse_error)}")
                         return
+                    
+                    query = fields.get('query')
+                    mode = fields.get('mode') or mode
+                    image = files.pop('image', None)
+                    for unused in files.values():
+                        unused.close()
+                    
+                    if image is not None:
+                        # The type comes from the bytes, not the client's Content-Type
+                        image.file.seek(0)
+                        if not is_image(image.file.read(SNIFF_BYTES)):
+                            self.send_error_response(
+                                415, "The 'image' field must be a JPEG, PNG, WebP, GIF, BMP or TIFF image"
+                            )
+                            return
                 else:
                     self.send_error_response(400, "Unsupported Content-Type. Use application/json or multipart/form-data")
                     return
@@ -157,8 +172,22 @@ class handler(BaseHTTPRequestHandler):
                     )
                     return
                 
+                # Downscale and re-encode the image (memory-mapped, never read whole)
+                prepared = None
+                if image is not None:
+                    try:
+                        prepared = preprocess_image(image.file)
+                    except Exception as image_error:
+                        self.send_error_response(400, f"Invalid image file: {str(image_error)}")
+                        return
+                    if len(prepared[0]) > IMAGE_MAX_BYTES:
+                        self.send_error_response(
+                            413, "Image is too large to send to the model", {"max_bytes": IMAGE_MAX_BYTES}
+                        )
+                        return
+                
                 # Generate AI response
-                response = self.generate_medical_response(query, mode, gemini_api_key)
+                response = self.generate_medical_response(query, mode, gemini_api_key, prepared)
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
@@ -171,31 +200,20 @@ class handler(BaseHTTPRequestHandler):
                 
         except Exception as e:
             self.send_error_response(500, f"Internal server error: {str(e)}")
+        finally:
+            if image is not None:
+                image.close()
     
-    def generate_medical_response(self, query: str, mode: str, api_key: str):
-        """Generate medical response using Gemini AI."""
+    def generate_medical_response(self, query: str, mode: str, api_key: str, image=None):
+        """Generate medical response using Gemini AI; ``image`` is a preprocessed ``(bytes, mime_type)``."""
         try:
             # Suppress any additional gRPC/ALTS warnings
             import logging
             logging.getLogger('google.auth').setLevel(logging.ERROR)
             logging.getLogger('google.api_core').setLevel(logging.ERROR)
             
-            # Configure Gemini
-            genai.configure(api_key=api_key)
-            
-            # Configure generation settings for better, complete responses
-            generation_config = {
-                "temperature": 0.7,
-                "top_p": 0.95,
-                "top_k": 50,
-                "max_output_tokens": 8192,  # Allow longer responses
-                "response_mime_type": "text/plain",
-            }
-            
-            model = genai.GenerativeModel(
-                'gemini-2.0-flash-exp',
-                generation_config=generation_config
-            )
+            # Reuse the configured model across requests on a warm instance
+            model = self.gemini_model(api_key)
             
             # Let Gemini work naturally without heavy prompting
             # Commented out custom prompts - using natural AI behavior
@@ -212,7 +230,12 @@ Respond to the following query with accurate, helpful medical information:
 Provide a clear, comprehensive answer as a medical professional would."""
             
             # Generate response with timeout handling
-            response = model.generate_content(prompt)
+            if image is not None:
+                prompt = f"{self.get_system_prompt('image')}\n\nPatient Query: {query}"
+                image_bytes, mime_type = image
+                response = model.generate_content([prompt, {"mime_type": mime_type, "data": image_bytes}])
+            else:
+                response = model.generate_content(prompt)
             
             return {
                 "response": response.text,
@@ -229,6 +252,13 @@ Provide a clear, comprehensive answer as a medical professional would."""
                 "error_details": traceback.format_exc()
             }
     
+    def gemini_model(self, api_key: str):
+        """The shared, configured Gemini model for this warm instance."""
+        client_options = {"api_endpoint": GEMINI_API_ENDPOINT} if GEMINI_API_ENDPOINT else None
+        return registry.gemini(
+            GEMINI_MODEL, api_key, generation_config=GENERATION_CONFIG, client_options=client_options
+        )
+    
     def get_system_prompt(self, mode: str) -> str:
         """Return appropriate system prompt based on mode."""
         
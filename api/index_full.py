@@ -3,22 +3,32 @@ Vercel Serverless API - Standalone Medical AI Assistant
 No dependencies on backend folder - all logic self-contained
 """
 import os
+import asyncio
 import base64
+import importlib.util
 import logging
-from io import BytesIO
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 
 from fastapi import FastAPI, File, Form, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from mangum import Mangum
 
-try:
-    import google.generativeai as genai
-    from PIL import Image
-    SERVICES_AVAILABLE = True
-except ImportError as e:
-    logging.error(f"Import error: {e}")
-    SERVICES_AVAILABLE = False
+# Vercel ships api/ without backend/; the provider registry is mirrored here and
+# the image helpers are shared with index.py
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _images import is_image, preprocess_image  # noqa: E402
+from _providers import registry  # noqa: E402
+
+# The Gemini SDK and Pillow are only checked for here and imported on first
+# use, so a cold start that serves /health never pays for them
+SERVICES_AVAILABLE = all(
+    importlib.util.find_spec(name) is not None for name in ("google.generativeai", "PIL")
+)
+if not SERVICES_AVAILABLE:
+    logging.error("Import error: google-generativeai and Pillow are required for analysis")
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -40,15 +50,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Gemini API
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-if GEMINI_API_KEY and SERVICES_AVAILABLE:
+GEMINI_MODEL = "gemini-1.5-flash"
+# host:port of a Gemini-compatible gRPC endpoint, e.g. the load-test stand-in
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+
+def get_model():
+    """The shared Gemini model; the SDK is imported and configured on first use."""
+    client_options = {"api_endpoint": GEMINI_API_ENDPOINT} if GEMINI_API_ENDPOINT else None
+    return registry.gemini(GEMINI_MODEL, GEMINI_API_KEY, client_options=client_options)
+
+# Image preprocessing pool. Serverless runtimes usually lack the shared memory
+# worker processes need, so the default (0) decodes on a thread instead; either
+# way the event loop stays free.
+IMAGE_POOL_WORKERS = int(os.getenv("IMAGE_POOL_WORKERS", "0"))
+IMAGE_POOL_MAX_PENDING = int(os.getenv("IMAGE_POOL_MAX_PENDING", "4"))
+_image_executor = None
+_pending_images = 0
+
+
+# Uploads are streamed to a temp file and refused once they pass this size
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+async def spool_upload(image_file: UploadFile):
+    """Copy an upload to a named temp file chunk by chunk, checking type and size as it goes."""
+    target = tempfile.NamedTemporaryFile(prefix="mediverse-upload-")
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        logger.info("Gemini API configured successfully")
-    except Exception as e:
-        logger.error(f"Failed to configure Gemini: {e}")
-        SERVICES_AVAILABLE = False
+        size = 0
+        while chunk := await image_file.read(UPLOAD_CHUNK_BYTES):
+            if size == 0 and not is_image(chunk):
+                raise HTTPException(status_code=415, detail="File must be a JPEG, PNG, WebP, GIF, BMP or TIFF image")
+            size += len(chunk)
+            if size > UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Image must be at most {UPLOAD_MAX_BYTES} bytes")
+            target.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Image file is empty")
+        target.flush()
+    except BaseException:
+        target.close()
+        raise
+    return target
+
+
+async def run_image_preprocessing(path: str) -> tuple:
+    """Run preprocess_image off the event loop with a queue-depth limit."""
+    global _image_executor, _pending_images
+
+    if _pending_images >= IMAGE_POOL_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Image analysis is busy right now. Please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
+
+    if IMAGE_POOL_WORKERS > 0 and _image_executor is None:
+        _image_executor = ProcessPoolExecutor(max_workers=IMAGE_POOL_WORKERS)
+
+    _pending_images += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_image_executor, preprocess_image, path)
+    finally:
+        _pending_images -= 1
 
 
 @app.get("/")
@@ -70,6 +137,14 @@ async def health():
         "gemini_api_key_set": bool(GEMINI_API_KEY)
     }
 
+@app.get("/warmup")
+async def warmup():
+    """Load the Gemini SDK and Pillow now, e.g. from a pre-warm ping before real traffic."""
+    if SERVICES_AVAILABLE:
+        await asyncio.to_thread(get_model)
+        await asyncio.to_thread(importlib.import_module, "PIL.Image")
+    return {"status": "warm", "services_available": SERVICES_AVAILABLE}
+
 @app.post("/v1/analyze")
 async def analyze(
     query: str = Form(...),
@@ -136,18 +211,9 @@ async def analyze(
 async def analyze_with_image(query: str, image_file: UploadFile) -> str:
     """Analyze medical image with Gemini Vision"""
     try:
-        # Read and process image
-        contents = await image_file.read()
-        img = Image.open(BytesIO(contents))
-        
-        # Convert to RGB if needed
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Resize if too large
-        max_size = 1024
-        if img.width > max_size or img.height > max_size:
-            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        # Stream the upload to disk, then process it there (off the event loop)
+        with await spool_upload(image_file) as upload:
+            image_bytes, mime_type = await run_image_preprocessing(upload.name)
         
         # Create prompt
         prompt = f"""You are a medical AI assistant analyzing a medical image.
@@ -163,11 +229,12 @@ Please analyze this medical image and provide:
 Remember: This is for educational purposes only. Always recommend consulting healthcare professionals."""
 
         # Use Gemini Vision model
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content([prompt, img])
+        response = await get_model().generate_content_async([prompt, {"mime_type": mime_type, "data": image_bytes}])
         
         return response.text
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Image analysis error: {e}")
         raise HTTPException(
@@ -202,8 +269,7 @@ Please provide a helpful response that includes:
 Remember: Always emphasize that this is educational information and recommend consulting healthcare professionals for diagnosis and treatment."""
 
         # Use Gemini model
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt)
+        response = await get_model().generate_content_async(prompt)
         
         return response.text
         
@@ -1,43 +1,78 @@
+import asyncio
 import base64
 import json
 import logging
+import time
 from datetime import datetime
-from io import BytesIO
-from typing import List
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-from app.models.database import MedicalQuery, SessionLocal, get_db
+from app.api.middleware import RATE_LIMIT_DETAIL, client_key
+from app.config import get_settings
+from app.models.database import (RESPONSE_PREVIEW_LENGTH, MedicalQuery,
+                                 SessionLocal, get_db)
 from app.models.schemas import MedicalQueryRequest, MedicalQueryResponse
 from app.services.ai_service import MedicalAIService
+from app.services.image_processing import (ImagePoolSaturated, ImageProcessor,
+                                           PreparedImage)
+from app.services.image_upload import (UnsupportedImage, UploadTooLarge,
+                                       ingest_upload)
 from app.services.medical_validator import MedicalValidator
+from app.services.query_writer import QueryWriter
 from app.services.search_service import MedicalSearchService
+from app.utils.deadline import Deadline, current_deadline, deadline_scope
+from app.utils.lazy import LazyObject, resolve
+from app.utils.rate_limiter import build_rate_limiter
 from fastapi import (APIRouter, BackgroundTasks, Depends, File, Form,
-                     HTTPException, UploadFile)
-from PIL import Image
+                     HTTPException, Request, Response, UploadFile)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-ai_service = MedicalAIService()
-search_service = MedicalSearchService()
-validator = MedicalValidator()
+# Seconds the client is willing to wait; can only shorten the mode's deadline
+DEADLINE_HEADER = "X-Request-Timeout"
+
+settings = get_settings()
+# Built on first use, so cold starts (and /health) skip langchain and the SDK clients
+ai_service: MedicalAIService = LazyObject(MedicalAIService)
+search_service: MedicalSearchService = LazyObject(MedicalSearchService)
+validator = MedicalValidator(keywords_file=settings.EMERGENCY_KEYWORDS_FILE)
+image_processor = ImageProcessor(
+    max_workers=settings.IMAGE_POOL_WORKERS,
+    max_pending=settings.IMAGE_POOL_MAX_PENDING,
+    max_size=settings.IMAGE_MAX_DIMENSION,
+    max_bytes=settings.IMAGE_MAX_BYTES,
+)
+rate_limiter = build_rate_limiter(settings)
+query_writer = QueryWriter(
+    SessionLocal,
+    batch_size=settings.QUERY_WRITER_BATCH_SIZE,
+    flush_interval_seconds=settings.QUERY_WRITER_FLUSH_INTERVAL_SECONDS,
+    max_queue=settings.QUERY_WRITER_MAX_QUEUE,
+    put_timeout_seconds=settings.QUERY_WRITER_PUT_TIMEOUT_SECONDS,
+)
 
 
 @router.post("/query", response_model=MedicalQueryResponse, summary="Process a medical question")
 async def process_medical_query(
     request: MedicalQueryRequest,
     background_tasks: BackgroundTasks,
+    http_request: Request,
     db: Session = Depends(get_db),
 ) -> MedicalQueryResponse:
     validation = validator.validate_query(request.query)
     if not validation.get("valid"):
         raise HTTPException(status_code=400, detail=validation.get("message"))
 
-    search_results = await search_service.search_medical_info(request.query)
-    ai_payload = await ai_service.generate_response(
-        query=request.query,
-        search_context=search_results.get("context"),
-    )
+    with deadline_scope(_request_deadline(http_request, "quick")):
+        search_results, degraded = await _search_within_deadline(request.query)
+        ai_payload = await ai_service.generate_response(
+            query=request.query,
+            search_context=search_results.get("context"),
+            session_id=request.session_id,
+        )
 
     final_response = validator.add_safety_wrapper(ai_payload["response"])
     sources: List[str] = []
@@ -51,6 +86,7 @@ async def process_medical_query(
         sources=sources,
         disclaimer=validator.disclaimer,
         timestamp=datetime.utcnow(),
+        degraded=degraded,
     )
 
     background_tasks.add_task(
@@ -59,25 +95,105 @@ async def process_medical_query(
         response=final_response,
         confidence=ai_payload["confidence_score"],
         sources=json.dumps(sources),
+        mode="quick",
     )
 
     return response
 
 
+@router.post("/query/stream", summary="Stream a medical answer as Server-Sent Events")
+async def stream_medical_query(
+    request: MedicalQueryRequest,
+    background_tasks: BackgroundTasks,
+    http_request: Request,
+) -> StreamingResponse:
+    validation = validator.validate_query(request.query)
+    if not validation.get("valid"):
+        raise HTTPException(status_code=400, detail=validation.get("message"))
+
+    deadline = _request_deadline(http_request, "quick")
+
+    async def event_stream() -> AsyncIterator[str]:
+        with deadline_scope(deadline):
+            search_results, degraded = await _search_within_deadline(request.query)
+            sources: List[str] = []
+            if request.include_sources:
+                sources = [r.get("url") for r in search_results.get("results", [])[:3] if r.get("url")]
+
+            events = ai_service.stream_response(
+                query=request.query,
+                search_context=search_results.get("context"),
+                session_id=request.session_id,
+            )
+            def on_complete(payload: Dict[str, Any]) -> None:
+                background_tasks.add_task(
+                    save_query_to_db,
+                    query=request.query,
+                    response=payload["response"],
+                    confidence=payload["confidence_score"],
+                    sources=json.dumps(sources),
+                    mode="quick",
+                )
+
+            async for frame in _stream_events(events, sources, validator.disclaimer, on_complete, degraded):
+                yield frame
+
+    return _sse_response(event_stream())
+
+
 @router.get("/history", summary="Retrieve query history")
-def get_query_history(limit: int = 10, db: Session = Depends(get_db)):
+def get_query_history(
+    response: Response,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    mode: Optional[str] = None,
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Most recent queries first, optionally filtered by ``mode`` and ``user_id``.
+
+    Pages are keyset-paginated: when more rows exist, the ``X-Next-Cursor``
+    response header holds the ``cursor`` to pass for the next page. Each page is
+    a range scan on a ``(..., created_at, id)`` index, so it costs the same no
+    matter how deep into the history it is.
+    """
     limit = max(1, min(limit, 50))
-    records = (
-        db.query(MedicalQuery)
-        .order_by(MedicalQuery.created_at.desc())
-        .limit(limit)
-        .all()
+    # Rows written before response_preview existed fall back to a SQL substring,
+    # so the full response text never leaves the database
+    preview = func.coalesce(
+        MedicalQuery.response_preview,
+        func.substr(MedicalQuery.response, 1, RESPONSE_PREVIEW_LENGTH),
+    )
+    stmt = select(
+        MedicalQuery.id,
+        MedicalQuery.mode,
+        MedicalQuery.query,
+        preview.label("response_preview"),
+        MedicalQuery.confidence_score,
+        MedicalQuery.created_at,
+        MedicalQuery.sources,
     )
+    if mode:
+        stmt = stmt.where(MedicalQuery.mode == mode)
+    if user_id is not None:
+        stmt = stmt.where(MedicalQuery.user_id == user_id)
+    if cursor:
+        created_at, record_id = _decode_history_cursor(cursor)
+        stmt = stmt.where(tuple_(MedicalQuery.created_at, MedicalQuery.id) < tuple_(created_at, record_id))
+
+    stmt = stmt.order_by(MedicalQuery.created_at.desc(), MedicalQuery.id.desc()).limit(limit + 1)
+    records = db.execute(stmt).all()
+    if len(records) > limit:
+        records = records[:limit]
+        response.headers["X-Next-Cursor"] = _encode_history_cursor(records[-1].created_at, records[-1].id)
+
     return [
         {
             "id": record.id,
+            "mode": record.mode,
             "query": record.query,
-            "response_preview": (record.response[:200] + "...") if record.response else "",
+            "response_preview": record.response_preview or "",
             "confidence_score": record.confidence_score,
             "created_at": record.created_at,
             "sources": json.loads(record.sources or "[]"),
@@ -86,11 +202,26 @@ def get_query_history(limit: int = 10, db: Session = Depends(get_db)):
     ]
 
 
+def _encode_history_cursor(created_at: datetime, record_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{record_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, record_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+
 @router.post("/analyze", response_model=MedicalQueryResponse, summary="Analyze medical imaging with AI")
 async def analyze_medical_image(
+    request: Request,
     query: str = Form(...),
     mode: str = Form("quick"),  # quick, image, deep_search, expert
     image: UploadFile = File(None),
+    session_id: Optional[str] = Form(None),
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db),
 ) -> MedicalQueryResponse:
@@ -105,74 +236,55 @@ async def analyze_medical_image(
     if not validation.get("valid"):
         raise HTTPException(status_code=400, detail=validation.get("message"))
 
-    image_data = None
-    if image:
-        # Validate image file
-        if not image.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Read and process image
-        contents = await image.read()
-        try:
-            img = Image.open(BytesIO(contents))
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Resize if too large (max 1024x1024 for API efficiency)
-            max_size = 1024
-            if img.width > max_size or img.height > max_size:
-                img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-            
-            # Convert to base64 for AI processing
-            buffered = BytesIO()
-            img.save(buffered, format="JPEG")
-            image_data = base64.b64encode(buffered.getvalue()).decode('utf-8')
-            
-        except Exception as e:
-            logger.error(f"Error processing image: {e}")
-            raise HTTPException(status_code=400, detail="Invalid image file")
+    await _charge_mode_cost(request, "image" if image else mode)
+    deadline = _request_deadline(request, "image" if image else mode)
+    image_data = await _prepare_image(image, mode)
 
     # Process based on mode
     search_sources = []  # Store sources for response
-    
-    if mode == "image" or image_data:
-        # Image analysis mode
-        ai_payload = await ai_service.analyze_medical_image(
-            query=query,
-            image_base64=image_data
-        )
-        mode_label = "IMAGE ANALYSIS"
-        
-    elif mode == "deep_search":
-        # Deep search mode with web research
-        search_results = await search_service.search_medical_info(query)
-        ai_payload = await ai_service.generate_response(
-            query=query,
-            search_context=search_results.get("context"),
-            mode="deep_search"
-        )
-        mode_label = "DEEP SEARCH"
-        # Extract sources for display
-        search_sources = search_results.get("results", [])[:10]  # Top 10 sources
-        
-    elif mode == "expert":
-        # Expert mode with OpenRouter
-        ai_payload = await ai_service.generate_response(
-            query=query,
-            search_context=None,
-            mode="expert"
-        )
-        mode_label = "EXPERT MODE"
-        
-    else:
-        # Quick mode (default)
-        ai_payload = await ai_service.generate_response(
-            query=query,
-            search_context=None,
-            mode="quick"
-        )
-        mode_label = "QUICK CONSULT"
+    degraded = False
+
+    with deadline_scope(deadline):
+        if mode == "image" or image_data:
+            # Image analysis mode
+            ai_payload = await ai_service.analyze_medical_image(
+                query=query,
+                image=image_data
+            )
+            history_mode = "image"
+
+        elif mode == "deep_search":
+            # Deep search mode with web research, within a share of the deadline
+            search_results, degraded = await _search_within_deadline(query, mode="deep_search")
+            ai_payload = await ai_service.generate_response(
+                query=query,
+                search_context=search_results.get("context"),
+                mode="deep_search",
+                session_id=session_id,
+            )
+            history_mode = "deep_search"
+            # Extract sources for display
+            search_sources = search_results.get("results", [])[:10]  # Top 10 sources
+
+        elif mode == "expert":
+            # Expert mode with OpenRouter
+            ai_payload = await ai_service.generate_response(
+                query=query,
+                search_context=None,
+                mode="expert",
+                session_id=session_id,
+            )
+            history_mode = "expert"
+
+        else:
+            # Quick mode (default)
+            ai_payload = await ai_service.generate_response(
+                query=query,
+                search_context=None,
+                mode="quick",
+                session_id=session_id,
+            )
+            history_mode = "quick"
 
     final_response = validator.add_safety_wrapper(ai_payload["response"])
     
@@ -185,33 +297,240 @@ async def analyze_medical_image(
         sources=search_sources,  # Include sources from deep search
         disclaimer="",  # Empty - disclaimer shown once in frontend UI
         timestamp=datetime.utcnow(),
+        degraded=degraded,
     )
 
     if background_tasks:
         background_tasks.add_task(
             save_query_to_db,
-            query=f"[{mode_label}] {query}",
+            query=query,
             response=final_response,
             confidence=ai_payload["confidence_score"],
             sources="[]",
+            mode=history_mode,
         )
 
     return response
 
 
-def save_query_to_db(query: str, response: str, confidence: float, sources: str) -> None:
-    session = SessionLocal()
+@router.post("/analyze/stream", summary="Stream medical analysis as Server-Sent Events")
+async def stream_medical_analysis(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    query: str = Form(...),
+    mode: str = Form("quick"),  # quick, image, deep_search, expert
+    image: UploadFile = File(None),
+    session_id: Optional[str] = Form(None),
+) -> StreamingResponse:
+    """
+    Streaming variant of ``/analyze``: emits ``token`` events as the model writes
+    and a final ``complete`` event with confidence score, sources and detected
+    medications.
+    """
+    validation = validator.validate_query(query)
+    if not validation.get("valid"):
+        raise HTTPException(status_code=400, detail=validation.get("message"))
+
+    await _charge_mode_cost(request, "image" if image else mode)
+    deadline = _request_deadline(request, "image" if image else mode)
+    image_data = await _prepare_image(image, mode)
+
+    async def event_stream() -> AsyncIterator[str]:
+        search_sources: List[Any] = []
+        degraded = False
+
+        with deadline_scope(deadline):
+            if mode == "image" or image_data:
+                events = ai_service.stream_medical_image_analysis(query=query, image=image_data)
+                history_mode = "image"
+            elif mode == "deep_search":
+                search_results, degraded = await _search_within_deadline(query, mode="deep_search")
+                search_sources = search_results.get("results", [])[:10]  # Top 10 sources
+                events = ai_service.stream_response(
+                    query=query,
+                    search_context=search_results.get("context"),
+                    mode="deep_search",
+                    session_id=session_id,
+                )
+                history_mode = "deep_search"
+            elif mode == "expert":
+                events = ai_service.stream_response(
+                    query=query, search_context=None, mode="expert", session_id=session_id
+                )
+                history_mode = "expert"
+            else:
+                events = ai_service.stream_response(
+                    query=query, search_context=None, mode="quick", session_id=session_id
+                )
+                history_mode = "quick"
+
+            def on_complete(payload: Dict[str, Any]) -> None:
+                background_tasks.add_task(
+                    save_query_to_db,
+                    query=query,
+                    response=payload["response"],
+                    confidence=payload["confidence_score"],
+                    sources="[]",
+                    mode=history_mode,
+                )
+
+            async for frame in _stream_events(events, search_sources, "", on_complete, degraded):
+                yield frame
+
+    return _sse_response(event_stream())
+
+
+def _request_deadline(request: Request, mode: str) -> Deadline:
+    """Deadline for ``mode``, shortened (never extended) by a valid ``X-Request-Timeout``."""
+    budgets = settings.REQUEST_DEADLINE_SECONDS
+    seconds = budgets.get(mode, budgets.get("quick", 25.0))
+    requested = request.headers.get(DEADLINE_HEADER)
+    if requested:
+        try:
+            value = float(requested)
+        except ValueError:
+            value = 0.0
+        if 0 < value < seconds:
+            seconds = value
+    return Deadline(seconds)
+
+
+async def _search_within_deadline(query: str, mode: str = "quick") -> Tuple[Dict[str, Any], bool]:
+    """
+    Search with at most ``SEARCH_DEADLINE_SHARE`` of the remaining deadline.
+
+    Returns the results and whether the answer is degraded: when search overruns
+    its share (or fails), the caller goes ahead with whatever context there is,
+    which may be none, rather than running out of time for the LLM call.
+    """
+    deadline = current_deadline()
+    budget = None if deadline is None else deadline.remaining() * settings.SEARCH_DEADLINE_SHARE
     try:
-        db_query = MedicalQuery(
-            query=query,
-            response=response,
-            confidence_score=confidence,
-            sources=sources,
+        results = await asyncio.wait_for(search_service.search_medical_info(query, mode=mode), budget)
+    except asyncio.TimeoutError:
+        logger.warning("Search exceeded its %.1fs share of the deadline; answering without it", budget)
+        return {"results": [], "context": "", "query": query}, True
+    return results, bool(results.get("error"))
+
+
+def warmup() -> Dict[str, float]:
+    """
+    Build the lazily created services now; returns the seconds each took.
+
+    Runs in a thread after startup when ``WARMUP_ON_STARTUP`` is set, and behind
+    ``GET /warmup`` so a serverless platform can warm an instance before it takes
+    real traffic.
+    """
+    timings: Dict[str, float] = {}
+    for name, service in (("ai_service", ai_service), ("search_service", search_service)):
+        started = time.perf_counter()
+        resolve(service)
+        timings[name] = round(time.perf_counter() - started, 3)
+    return timings
+
+
+async def _charge_mode_cost(request: Request, mode: str) -> None:
+    """Debit the extra rate-limit cost of ``mode`` (the middleware already took one unit)."""
+    extra = settings.RATE_LIMIT_MODE_COSTS.get(mode, 1) - 1
+    if extra <= 0:
+        return
+    result = await rate_limiter.acquire(client_key(request), extra)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=RATE_LIMIT_DETAIL,
+            headers={"Retry-After": result.retry_after_header},
         )
-        session.add(db_query)
-        session.commit()
-    except Exception as exc:  # pragma: no cover - defensive logging
-        session.rollback()
-        logger.error("Failed to persist medical query: %s", exc)
-    finally:
-        session.close()
+
+
+async def _prepare_image(image: Optional[UploadFile], mode: str) -> Optional[PreparedImage]:
+    """Validate and downscale an uploaded image into a model-ready encoded blob."""
+    if not image:
+        return None
+
+    # The type is sniffed from the upload's bytes (the client's content type is
+    # not trusted) and the size checked against the mode's limit; the worker
+    # pool then decodes the spooled file by path, never as a bytes copy
+    max_bytes = settings.IMAGE_UPLOAD_MAX_BYTES.get(mode, settings.IMAGE_UPLOAD_MAX_BYTES["image"])
+    try:
+        upload = await ingest_upload(image, max_bytes)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=f"Image must be at most {exc.max_bytes // 1_048_576} MB")
+    except UnsupportedImage as exc:
+        raise HTTPException(status_code=415, detail=str(exc))
+
+    try:
+        with upload:
+            processed = await image_processor.preprocess(upload.path)
+    except ImagePoolSaturated as exc:
+        logger.warning("Image preprocessing pool saturated: %s", exc)
+        raise HTTPException(
+            status_code=503,
+            detail="Image analysis is busy right now. Please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
+    except Exception as e:
+        logger.error(f"Error processing image: {e}")
+        raise HTTPException(status_code=400, detail="Invalid image file")
+
+    return processed
+
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _sse_response(stream: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _stream_events(
+    events: AsyncIterator[Dict[str, Any]],
+    sources: List[Any],
+    disclaimer: str,
+    on_complete: Callable[[Dict[str, Any]], None],
+    degraded: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Translate service events into SSE frames.
+
+    ``on_complete`` receives the final payload (safety-wrapped response included)
+    once the answer has been fully streamed, so callers can persist it.
+    ``degraded`` is reported in the ``complete`` event.
+    """
+    try:
+        async for event in events:
+            if event["event"] == "token":
+                yield _sse_event("token", {"text": event["data"]})
+                continue
+
+            payload = event["data"]
+            final_response = validator.add_safety_wrapper(payload["response"])
+            yield _sse_event(
+                "complete",
+                {
+                    "confidence_score": payload["confidence_score"],
+                    "sources": sources,
+                    "medications_detected": payload.get("medications_detected", []),
+                    "model_used": payload.get("model_used"),
+                    "disclaimer": disclaimer,
+                    "timestamp": datetime.utcnow(),
+                    "degraded": degraded,
+                },
+            )
+            on_complete({**payload, "response": final_response})
+    except Exception as exc:
+        logger.error("Streaming response failed: %s", exc)
+        yield _sse_event("error", {"detail": "The response stream was interrupted. Please try again."})
+
+
+def save_query_to_db(
+    query: str, response: str, confidence: float, sources: str, mode: Optional[str] = None
+) -> None:
+    # Runs as a background task on the threadpool, so backpressure from a full
+    # write queue never blocks the event loop
+    query_writer.submit(query=query, response=response, confidence=confidence, sources=sources, mode=mode)
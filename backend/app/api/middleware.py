@@ -1,41 +1,196 @@
-import asyncio
+import re
 import time
-from collections import defaultdict, deque
-from typing import Deque, DefaultDict, Optional
+import uuid
+from typing import Any, Optional, Tuple
 
 from fastapi import HTTPException, Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import JSONResponse
+from prometheus_client import Histogram
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.config import get_settings
+from app.utils.logger import request_id_var
+from app.utils.rate_limiter import RateLimitResult, build_rate_limiter
 
+RATE_LIMIT_DETAIL = "Rate limit exceeded. Please slow down and try again shortly."
+BODY_TOO_LARGE_DETAIL = "Request body is too large."
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple in-memory rate limiting per client IP address."""
+REQUEST_ID_HEADER = "X-Request-ID"
+# Incoming ids are echoed back and logged, so only accept short, plain tokens
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
 
-    def __init__(self, app, calls: Optional[int] = None, period: int = 60) -> None:
-        super().__init__(app)
-        settings = get_settings()
-        self.calls = calls or settings.RATE_LIMIT_PER_MINUTE
-        self.period = period
-        self._lock = asyncio.Lock()
-        self._requests: DefaultDict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.calls))
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request until its response body is fully sent",
+    ["method", "handler", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
 
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host if request.client else "anonymous"
-        now = time.time()
 
-        async with self._lock:
-            window = self._requests[client_ip]
-            while window and now - window[0] > self.period:
-                window.popleft()
+def client_key(request: Request) -> str:
+    return scope_client_key(request.scope)
 
-            if len(window) >= self.calls:
-                raise HTTPException(
-                    status_code=429,
-                    detail="Rate limit exceeded. Please slow down and try again shortly.",
-                )
 
-            window.append(now)
+def scope_client_key(scope: Scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "anonymous"
 
-        response = await call_next(request)
-        return response
+
+def rate_limited_response(result: RateLimitResult) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": RATE_LIMIT_DETAIL},
+        headers={"Retry-After": result.retry_after_header},
+    )
+
+
+class RateLimitMiddleware:
+    """Token-bucket rate limiting per client IP address.
+
+    Every request costs one token; endpoints charge expensive modes extra through
+    the same limiter. Health checks and metrics scrapes are never limited.
+
+    Written as a plain ASGI app rather than ``BaseHTTPMiddleware``: allowed
+    requests are passed through untouched, with no extra task or response
+    stream wrapped around them, so streaming responses flush as they are produced.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: Optional[Any] = None,
+        exempt_paths: Tuple[str, ...] = ("/health", "/metrics"),
+    ) -> None:
+        self.app = app
+        self.limiter = limiter if limiter is not None else build_rate_limiter(get_settings())
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        result = await self.limiter.acquire(scope_client_key(scope))
+        if not result.allowed:
+            await rate_limited_response(result)(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class RequestIDMiddleware:
+    """Tag every request with an id, echoed in ``X-Request-ID`` and available to logs.
+
+    A well-formed id sent by the client or a proxy is kept so one request can be
+    followed across services; otherwise a new one is generated.
+    """
+
+    def __init__(self, app: ASGIApp, header_name: str = REQUEST_ID_HEADER) -> None:
+        self.app = app
+        self.header_name = header_name
+        self._raw_header = header_name.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == self._raw_header:
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[self.header_name] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
+
+
+class TimingMiddleware:
+    """Record request latency in Prometheus and report it in ``Server-Timing``.
+
+    The header carries the time until the response headers were sent (for a
+    stream, its time to first byte); the histogram covers the whole response,
+    labelled by the handler that served it rather than the raw path.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                MutableHeaders(scope=message).append("Server-Timing", f"app;dur={elapsed_ms:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # The router records the matched endpoint in the shared scope
+            endpoint = scope.get("endpoint")
+            handler = getattr(endpoint, "__name__", type(endpoint).__name__) if endpoint else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], handler, str(status)).observe(
+                time.perf_counter() - started
+            )
+
+
+class BodySizeLimitMiddleware:
+    """Refuse request bodies over ``max_bytes`` with a 413 before they are parsed.
+
+    A declared ``Content-Length`` over the limit is answered without reading the
+    body. Bodies without one are counted as they stream in and cut off once they
+    cross the limit, so the form parser never spools more than that to disk.
+    Endpoints apply tighter, per-mode limits to the uploads themselves.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        declared = Headers(scope=scope).get("content-length", "")
+        if declared.isdigit() and int(declared) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": BODY_TOO_LARGE_DETAIL})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the body parser, so the app's HTTPException handler answers
+                    raise HTTPException(status_code=413, detail=BODY_TOO_LARGE_DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
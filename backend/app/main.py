@@ -1,13 +1,20 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from datetime import datetime
 
-from app.api.endpoints import router
-from app.api.middleware import RateLimitMiddleware
+from app.api.endpoints import (image_processor, query_writer, rate_limiter,
+                               router, search_service, warmup)
+from app.api.middleware import (BodySizeLimitMiddleware, RateLimitMiddleware,
+                                RequestIDMiddleware, TimingMiddleware)
 from app.config import get_settings
+from app.utils.circuit_breaker import CircuitOpenError, circuit_states
+from app.utils.deadline import DeadlineExceeded
+from app.utils.lazy import is_built
 from app.utils.logger import setup_logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from prometheus_client import make_asgi_app
 
 setup_logging()
@@ -18,10 +25,25 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting Mediverse...")
+    # Warm up off the event loop so /health answers while the clients are built
+    warming = asyncio.create_task(_warm_up()) if settings.WARMUP_ON_STARTUP else None
     try:
         yield
     finally:
         logger.info("Shutting down Mediverse...")
+        if warming is not None:
+            warming.cancel()
+        image_processor.shutdown()
+        query_writer.close()
+        if is_built(search_service):
+            await search_service.aclose()
+
+
+async def _warm_up() -> None:
+    try:
+        logger.info("Services warmed up in %s", await asyncio.to_thread(warmup))
+    except Exception as exc:  # pragma: no cover - the next request retries the build
+        logger.warning("Startup warmup failed: %s", exc)
 
 
 app = FastAPI(
@@ -31,15 +53,29 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Room for the text fields sent alongside the largest allowed image upload
+FORM_FIELDS_BYTES = 64 * 1024
+
+# The last middleware added runs first: request id, timing, CORS, rate limiting,
+# then the body size limit, so 429s and 413s still carry an id, a timing and
+# CORS headers
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=max(settings.IMAGE_UPLOAD_MAX_BYTES.values()) + FORM_FIELDS_BYTES,
+)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID", "Retry-After", "Server-Timing"],
 )
 
-app.add_middleware(RateLimitMiddleware)
+app.add_middleware(TimingMiddleware)
+app.add_middleware(RequestIDMiddleware)
 
 metrics_app = make_asgi_app()
 app.mount("/metrics", metrics_app)
@@ -47,6 +83,25 @@ app.mount("/metrics", metrics_app)
 app.include_router(router, prefix="/api/v1", tags=["medical"])
 
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    logger.warning("Rejected request, %s", exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "The AI service is temporarily unavailable. Please retry shortly."},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    logger.warning("Request ran out of time: %s", exc)
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "The answer took too long to generate. Please try again or use quick mode."},
+    )
+
+
 @app.get("/")
 async def root():
     return {
@@ -62,4 +117,12 @@ async def health_check():
         "status": "healthy",
         "service": "mediverse",
         "timestamp": datetime.utcnow(),
+        "dependencies": circuit_states(),
     }
+
+
+@app.get("/warmup")
+async def warmup_services():
+    """Build the lazily created services (e.g. from a platform's pre-warm ping)."""
+    timings = await asyncio.to_thread(warmup)
+    return {"status": "warm", "seconds": timings}
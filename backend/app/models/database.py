@@ -3,7 +3,7 @@ from typing import Generator
 from urllib.parse import quote, unquote
 
 from app.config import get_settings
-from sqlalchemy import (Column, DateTime, Float, Integer, String, Text,
+from sqlalchemy import (Column, DateTime, Float, Index, Integer, String, Text,
                         create_engine)
 from sqlalchemy.orm import declarative_base, sessionmaker
 
@@ -62,18 +62,39 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
+RESPONSE_PREVIEW_LENGTH = 200
+
+
 class MedicalQuery(Base):
     __tablename__ = "medical_queries"
+    # Every index ends in (created_at, id) so /history pages are index range scans
+    __table_args__ = (
+        Index("ix_medical_queries_created_at_id", "created_at", "id"),
+        Index("ix_medical_queries_user_created_at", "user_id", "created_at", "id"),
+        Index("ix_medical_queries_mode_created_at", "mode", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, index=True, nullable=True)
+    user_id = Column(Integer, nullable=True)
+    mode = Column(String(32), nullable=True)  # quick, image, deep_search, expert
     query = Column(Text, nullable=False)
     response = Column(Text, nullable=False)
+    response_preview = Column(String(RESPONSE_PREVIEW_LENGTH + 3), nullable=True)
     confidence_score = Column(Float, nullable=False)
     sources = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
+def response_preview(response: str) -> str:
+    """Short excerpt of a response shown in the query history."""
+
+    if not response:
+        return ""
+    if len(response) <= RESPONSE_PREVIEW_LENGTH:
+        return response
+    return response[:RESPONSE_PREVIEW_LENGTH] + "..."
+
+
 def get_db() -> Generator:
     """Database session dependency for FastAPI routes."""
 
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -8,15 +8,17 @@ class MedicalQueryRequest(BaseModel):
     query: str = Field(..., min_length=10, max_length=1000)
     include_sources: bool = True
     language: str = Field("en", min_length=2, max_length=5)
+    session_id: Optional[str] = Field(None, max_length=128)
 
 
 class MedicalQueryResponse(BaseModel):
     query: str
     response: str
     confidence_score: float
-    sources: List[str]
+    sources: List[Union[str, Dict[str, Any]]]  # URLs from /query, search results from /analyze
     disclaimer: str
     timestamp: datetime
+    degraded: bool = False  # answered without (full) search context to meet the deadline
 
 
 class HealthCheck(BaseModel):
@@ -2,24 +2,49 @@ import asyncio
 import hashlib
 import json
 import logging
-from typing import Any, Dict, Optional
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional, Tuple
 
 from app.config import get_settings
+from app.services.conversation_memory import ConversationStore
+from app.services.image_cache import (IMAGE_CACHE_LOOKUP_SECONDS,
+                                     IMAGE_CACHE_LOOKUPS, ImageResultCache)
+from app.services.image_processing import ImageInput, to_vision_part
 from app.services.medical_validator import MedicalValidator
-from langchain.chains import LLMChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
-from langchain_google_genai import (ChatGoogleGenerativeAI, HarmBlockThreshold,
-                                    HarmCategory)
-from langchain_openai import ChatOpenAI
+from app.services.provider_tape import (TapedChatModel, TapedVisionModel,
+                                        get_provider_tape)
+from app.services.providers import registry
+from app.services.semantic_cache import SemanticQueryCache
+from app.utils.cache import L1Cache
+from app.utils.circuit_breaker import (CircuitBreaker, CircuitBreakingRedis,
+                                       get_circuit_breaker)
+from app.utils.hedging import Hedger
+from app.utils.lazy import lazy_imports
+from app.utils.singleflight import SingleFlight
 
 try:
     import redis.asyncio as redis
 except ImportError:  # pragma: no cover
     redis = None
 
+if TYPE_CHECKING:
+    from langchain.prompts import PromptTemplate
+
 logger = logging.getLogger(__name__)
 
+# langchain and the provider SDKs take seconds to import, so they load when the
+# first service is built rather than whenever this module is imported
+__getattr__ = _lazy = lazy_imports(
+    globals(),
+    {
+        "PromptTemplate": ("langchain.prompts", "PromptTemplate"),
+        "ChatGoogleGenerativeAI": ("langchain_google_genai", "ChatGoogleGenerativeAI"),
+        "HarmBlockThreshold": ("langchain_google_genai", "HarmBlockThreshold"),
+        "HarmCategory": ("langchain_google_genai", "HarmCategory"),
+        "ChatOpenAI": ("langchain_openai", "ChatOpenAI"),
+    },
+)
+
 
 class MedicalAIService:
     """Orchestrate LLM responses with safety controls and caching."""
@@ -27,16 +52,42 @@ class MedicalAIService:
     def __init__(self) -> None:
         self.settings = get_settings()
         self.validator = MedicalValidator()
+        self._tape = get_provider_tape(self.settings)
         self.llm = self._initialize_llm()
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            input_key="query",
-        )
         self.prompt = self._create_prompt()
         self._redis = self._create_redis_client()
+        self.conversations = ConversationStore(
+            history_token_budget=self.settings.CONVERSATION_HISTORY_TOKEN_BUDGET,
+            summary_token_budget=self.settings.CONVERSATION_SUMMARY_TOKEN_BUDGET,
+            max_sessions=self.settings.CONVERSATION_MAX_SESSIONS,
+            ttl_seconds=self.settings.CONVERSATION_SESSION_TTL_SECONDS,
+            redis_client=self._redis if self.settings.CONVERSATION_BACKEND == "redis" else None,
+            namespace=self.settings.CACHE_NAMESPACE,
+        )
+        self._l1 = L1Cache(
+            "ai",
+            max_bytes=self.settings.L1_CACHE_MAX_BYTES,
+            ttl_seconds=min(self.settings.L1_CACHE_TTL_SECONDS, self.settings.CACHE_TTL_SECONDS),
+        )
+        self._semantic_cache = SemanticQueryCache(
+            threshold=self.settings.SEMANTIC_CACHE_THRESHOLD,
+            num_bands=self.settings.SEMANTIC_CACHE_BANDS,
+            rows_per_band=self.settings.SEMANTIC_CACHE_ROWS_PER_BAND,
+            max_entries=self.settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        )
+        self._image_cache = ImageResultCache(
+            max_distance=self.settings.IMAGE_CACHE_MAX_DISTANCE,
+            max_entries=self.settings.IMAGE_CACHE_MAX_ENTRIES,
+        )
+        self._single_flight = SingleFlight(
+            redis_client=self._redis if self.settings.SINGLE_FLIGHT_REDIS_LOCK else None,
+            lock_ttl_seconds=self.settings.SINGLE_FLIGHT_LOCK_TTL_SECONDS,
+            poll_interval_seconds=self.settings.SINGLE_FLIGHT_POLL_INTERVAL_SECONDS,
+        )
+        self._hedger = self._create_hedger()
+        self._hedge_llm: Optional[Any] = None
 
-    def _create_prompt(self) -> PromptTemplate:
+    def _create_prompt(self) -> "PromptTemplate":
         template = (
             "You are Mediverse, an expert medical AI assistant. Provide comprehensive, detailed, accurate, and safe medical information.\n\n"
             "IMPORTANT GUIDELINES:\n"
@@ -59,7 +110,7 @@ class MedicalAIService:
             "User Query: {query}\n\n"
             "Provide a detailed, comprehensive medical response:"
         )
-        return PromptTemplate(input_variables=["search_context", "chat_history", "query"], template=template)
+        return _lazy("PromptTemplate")(input_variables=["search_context", "chat_history", "query"], template=template)
 
     def _initialize_llm(self):
         provider = (self.settings.LLM_PROVIDER or "gemini").lower()
@@ -67,106 +118,272 @@ class MedicalAIService:
         if provider == "openrouter":
             if not self.settings.OPENROUTER_API_KEY:
                 raise ValueError("OPENROUTER_API_KEY must be set when LLM_PROVIDER=openrouter")
-
-            default_headers = {}
-            if self.settings.OPENROUTER_SITE_URL:
-                default_headers["HTTP-Referer"] = self.settings.OPENROUTER_SITE_URL
-            if self.settings.OPENROUTER_APP_NAME:
-                default_headers["X-Title"] = self.settings.OPENROUTER_APP_NAME
-
-            return ChatOpenAI(
-                model=self.settings.OPENROUTER_MODEL,
-                openai_api_key=self.settings.OPENROUTER_API_KEY,
-                openai_api_base=self.settings.OPENROUTER_BASE_URL.rstrip("/"),
-                temperature=0.5,  # Slightly higher for more detailed, natural responses
-                max_tokens=self.settings.MAX_RESPONSE_LENGTH,
-                default_headers=default_headers or None,
-            )
-
-        return ChatGoogleGenerativeAI(
-            model=self.settings.GEMINI_MODEL,
-            google_api_key=self.settings.GEMINI_API_KEY,
-            temperature=0.5,  # Slightly higher for more comprehensive responses
+            return self._openrouter_llm()
+
+        llm = registry.get(
+            "gemini",
+            self.settings.GEMINI_MODEL,
+            lambda: _lazy("ChatGoogleGenerativeAI")(
+                model=self.settings.GEMINI_MODEL,
+                google_api_key=self.settings.GEMINI_API_KEY,
+                client_options=self._gemini_client_options(),
+                temperature=0.5,  # Slightly higher for more comprehensive responses
+                max_output_tokens=self.settings.MAX_RESPONSE_LENGTH,
+            ),
+            sdk="langchain",
+            api_key=self.settings.GEMINI_API_KEY,
+            client_options=self._gemini_client_options(),
+            temperature=0.5,
             max_output_tokens=self.settings.MAX_RESPONSE_LENGTH,
         )
+        return self._taped(llm, "gemini")
 
     def _get_expert_llm(self):
         """Get expert-level model via OpenRouter."""
         if not self.settings.OPENROUTER_API_KEY:
             logger.warning("OPENROUTER_API_KEY not set, falling back to Gemini")
             return self.llm
-        
+        return self._openrouter_llm()
+
+    def _gemini_client_options(self) -> Optional[Dict[str, Any]]:
+        endpoint = self.settings.GEMINI_API_ENDPOINT
+        return {"api_endpoint": endpoint} if endpoint else None
+
+    def _vision_model(self):
+        model = registry.gemini(
+            self.settings.GEMINI_MODEL,
+            self.settings.GEMINI_API_KEY,
+            client_options=self._gemini_client_options(),
+        )
+        return model if self._tape is None else TapedVisionModel(model, self._tape)
+
+    def _taped(self, llm: Any, provider: str) -> Any:
+        """``llm`` recording to, or replaying from, the provider tape when one is configured."""
+        return llm if self._tape is None else TapedChatModel(llm, self._tape, provider)
+
+    def _openrouter_llm(self):
+        """The shared OpenRouter chat model (one client for every request)."""
         default_headers = {}
         if self.settings.OPENROUTER_SITE_URL:
             default_headers["HTTP-Referer"] = self.settings.OPENROUTER_SITE_URL
         if self.settings.OPENROUTER_APP_NAME:
             default_headers["X-Title"] = self.settings.OPENROUTER_APP_NAME
+        base_url = self.settings.OPENROUTER_BASE_URL.rstrip("/")
 
-        return ChatOpenAI(
-            model=self.settings.OPENROUTER_MODEL,
-            openai_api_key=self.settings.OPENROUTER_API_KEY,
-            openai_api_base=self.settings.OPENROUTER_BASE_URL.rstrip("/"),
-            temperature=0.5,  # Balanced for detailed expert analysis
+        llm = registry.get(
+            "openrouter",
+            self.settings.OPENROUTER_MODEL,
+            lambda: _lazy("ChatOpenAI")(
+                model=self.settings.OPENROUTER_MODEL,
+                openai_api_key=self.settings.OPENROUTER_API_KEY,
+                openai_api_base=base_url,
+                temperature=0.5,  # Balanced for detailed expert analysis
+                max_tokens=self.settings.MAX_RESPONSE_LENGTH,
+                default_headers=default_headers or None,
+            ),
+            sdk="langchain",
+            api_key=self.settings.OPENROUTER_API_KEY,
+            base_url=base_url,
+            temperature=0.5,
             max_tokens=self.settings.MAX_RESPONSE_LENGTH,
-            default_headers=default_headers or None,
+            default_headers=default_headers,
+        )
+        return self._taped(llm, "openrouter")
+
+    def _create_hedger(self) -> Optional[Hedger]:
+        if not self.settings.LLM_HEDGING_ENABLED:
+            return None
+        # The backup must be a different provider than the primary
+        if not self.settings.OPENROUTER_API_KEY or (self.settings.LLM_PROVIDER or "gemini").lower() != "gemini":
+            logger.warning("LLM hedging needs LLM_PROVIDER=gemini and OPENROUTER_API_KEY; hedging disabled")
+            return None
+        return Hedger(
+            quantile=self.settings.LLM_HEDGE_QUANTILE,
+            delay=self.settings.LLM_HEDGE_DELAY_SECONDS,
+            min_delay=self.settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+            max_delay=self.settings.LLM_HEDGE_MAX_DELAY_SECONDS,
+            max_ratio=self.settings.LLM_HEDGE_MAX_RATIO,
         )
 
+    async def _stream_llm(self, llm: Any, prompt_text: str) -> Tuple[Any, AsyncIterator[Any]]:
+        """Start streaming ``prompt_text``; hedged against OpenRouter when enabled.
+
+        Returns the model that is actually answering and its chunk stream.
+        """
+        if self._hedger is None or llm is not self.llm:
+            return llm, self._breaker_for(llm).stream(lambda: llm.astream(prompt_text))
+
+        if self._hedge_llm is None:
+            self._hedge_llm = self._get_expert_llm()
+        backup = self._hedge_llm
+        if self._breaker_for(llm).is_open:
+            # Gemini is failing; go straight to the backup instead of waiting out a hedge delay
+            return backup, self._breaker_for(backup).stream(lambda: backup.astream(prompt_text))
+        winner, stream = await self._hedger.race(
+            lambda: self._breaker_for(llm).stream(lambda: llm.astream(prompt_text)),
+            lambda: self._breaker_for(backup).stream(lambda: backup.astream(prompt_text)),
+            primary_name="gemini",
+            secondary_name="openrouter",
+        )
+        return (llm if winner == "gemini" else backup), stream
+
+    def _breaker_for(self, llm: Any) -> CircuitBreaker:
+        """Breaker of the provider behind ``llm``; everything but the primary model is OpenRouter."""
+        provider = (self.settings.LLM_PROVIDER or "gemini").lower() if llm is self.llm else "openrouter"
+        return get_circuit_breaker(provider, self.settings)
+
     def _create_redis_client(self) -> Optional[Any]:
         if not redis:
             return None
         try:
-            return redis.from_url(self.settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+            client = redis.from_url(self.settings.REDIS_URL, encoding="utf-8", decode_responses=True)
         except Exception as exc:  # pragma: no cover
             logger.warning("Could not initialize Redis for AI caching: %s", exc)
             return None
+        # Shared with the search cache, so an outage opens one circuit for both
+        return CircuitBreakingRedis(client, get_circuit_breaker("redis", self.settings))
 
     async def generate_response(
         self, 
         query: str, 
         search_context: Optional[str] = None,
-        mode: str = "quick"
+        mode: str = "quick",
+        session_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Generate AI response based on mode:
         - quick: Fast Gemini responses
         - deep_search: With web search context
         - expert: Using OpenRouter powerful models
+
+        Pass ``session_id`` to continue a conversation; without it the call is stateless.
         """
-        # Select appropriate model based on mode
-        if mode == "expert":
-            llm = self._get_expert_llm()
-        elif mode == "deep_search":
-            llm = self.llm  # Use default Gemini
-            search_context = search_context or "No additional context available"
-        else:  # quick mode
-            llm = self.llm
-            search_context = "No additional context available"
-        
-        cache_key = self._cache_key(query, search_context or "", mode)
-        cached = await self._fetch_cache(cache_key)
+        llm, search_context = self._resolve_mode(search_context, mode)
+        chat_history = await self.conversations.load_history(session_id)
+
+        cache_key = self._cache_key(query, search_context or "", mode, chat_history)
+        cached = await self._lookup_cached(cache_key, query, mode, chat_history)
         if cached:
             logger.debug("Returning cached AI response for query: %s", query)
+            await self.conversations.append(session_id, query, cached["response"])
             return cached
 
-        chain = LLMChain(llm=llm, prompt=self.prompt, memory=self.memory, verbose=False)
+        # Identical concurrent misses share one LLM call
+        payload = await self._single_flight.do(
+            cache_key,
+            lambda: self._generate_uncached(cache_key, llm, query, search_context, mode, chat_history),
+            fetch_shared=lambda: self._fetch_cache(cache_key),
+        )
+        await self.conversations.append(session_id, query, payload["response"])
+        return payload
+
+    async def _generate_uncached(
+        self,
+        cache_key: str,
+        llm: Any,
+        query: str,
+        search_context: Optional[str],
+        mode: str,
+        chat_history: str,
+    ) -> Dict[str, Any]:
+        if self._hedger is not None and llm is self.llm:
+            llm, response = await self._invoke_hedged(llm, query, search_context, chat_history)
+        else:
+            response = await self._invoke_llm(llm, query, search_context, chat_history)
+        payload = self._build_payload(response, search_context, llm)
+        await self._store_response(cache_key, query, mode, payload, chat_history)
+        return payload
+
+    async def _invoke_hedged(
+        self, llm: Any, query: str, search_context: Optional[str], chat_history: str = ""
+    ) -> Tuple[Any, str]:
+        prompt_text = self.prompt.format(query=query, search_context=search_context, chat_history=chat_history)
+        try:
+            used_llm, stream = await self._stream_llm(llm, prompt_text)
+            chunks = [getattr(chunk, "content", chunk) async for chunk in stream]
+        except Exception as exc:  # pragma: no cover - external API
+            logger.error("LLM generation failed: %s", exc)
+            raise
+        return used_llm, "".join(text for text in chunks if text)
+
+    async def _invoke_llm(self, llm: Any, query: str, search_context: Optional[str], chat_history: str = "") -> str:
+        prompt_text = self.prompt.format(query=query, search_context=search_context, chat_history=chat_history)
 
         try:
-            result = await chain.ainvoke({"query": query, "search_context": search_context})
-            response = result.get("text", "") if isinstance(result, dict) else str(result)
+            message = await self._breaker_for(llm).call(lambda: llm.ainvoke(prompt_text))
+            return str(getattr(message, "content", message))
         except Exception as exc:  # pragma: no cover - external API
             logger.error("LLM generation failed: %s", exc)
             raise
 
+    async def stream_response(
+        self,
+        query: str,
+        search_context: Optional[str] = None,
+        mode: str = "quick",
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the AI response as it is generated.
+
+        Yields ``{"event": "token", "data": <text>}`` for every chunk emitted by the
+        LLM, followed by a single ``{"event": "complete", "data": <payload>}`` carrying
+        the same payload ``generate_response`` returns. The completed payload is
+        cached exactly like the non-streaming path.
+        """
+        llm, search_context = self._resolve_mode(search_context, mode)
+        chat_history = await self.conversations.load_history(session_id)
+
+        cache_key = self._cache_key(query, search_context or "", mode, chat_history)
+        cached = await self._lookup_cached(cache_key, query, mode, chat_history)
+        if cached:
+            logger.debug("Streaming cached AI response for query: %s", query)
+            await self.conversations.append(session_id, query, cached.get("response", ""))
+            yield {"event": "token", "data": cached.get("response", "")}
+            yield {"event": "complete", "data": cached}
+            return
+
+        prompt_text = self.prompt.format(query=query, search_context=search_context, chat_history=chat_history)
+
+        chunks = []
+        try:
+            llm, stream = await self._stream_llm(llm, prompt_text)
+            async for chunk in stream:
+                text = getattr(chunk, "content", chunk)
+                if not text:
+                    continue
+                chunks.append(text)
+                yield {"event": "token", "data": text}
+        except Exception as exc:  # pragma: no cover - external API
+            logger.error("LLM streaming failed: %s", exc)
+            raise
+
+        response = "".join(chunks)
+        await self.conversations.append(session_id, query, response)
+
+        payload = self._build_payload(response, search_context, llm)
+        await self._store_response(cache_key, query, mode, payload, chat_history)
+        yield {"event": "complete", "data": payload}
+
+    def _resolve_mode(self, search_context: Optional[str], mode: str):
+        """Return the LLM and effective search context for ``mode``."""
+        if mode == "expert":
+            return self._get_expert_llm(), search_context
+        if mode == "deep_search":
+            return self.llm, search_context or "No additional context available"
+        # quick mode
+        return self.llm, "No additional context available"
+
+    def _build_payload(self, response: str, search_context: Optional[str], llm: Any = None) -> Dict[str, Any]:
         confidence_score = self._calculate_confidence(response, search_context)
-        model_identifier = getattr(self.llm, "model", None) or getattr(self.llm, "model_name", "unknown")
-        payload = {
+        llm = llm or self.llm
+        model_identifier = getattr(llm, "model", None) or getattr(llm, "model_name", "unknown")
+        return {
             "response": response,
             "confidence_score": confidence_score,
             "model_used": model_identifier,
             "medications_detected": self.validator.detect_medication_mentions(response),
         }
-        await self._persist_cache(cache_key, payload)
-        return payload
 
     def _calculate_confidence(self, response: str, context: Optional[str]) -> float:
         score = 0.5
@@ -181,54 +398,117 @@ class MedicalAIService:
 
         return min(score, 0.95)
 
-    def _cache_key(self, query: str, context: str, mode: str = "quick") -> str:
-        payload = json.dumps({"query": query, "context": context[:200], "mode": mode}, sort_keys=True)
+    def _cache_key(self, query: str, context: str, mode: str = "quick", chat_history: str = "") -> str:
+        key_fields = {"query": query, "context": context[:200], "mode": mode}
+        if chat_history:
+            # Follow-up questions depend on the conversation so far
+            key_fields["history"] = hashlib.sha256(chat_history.encode("utf-8")).hexdigest()
+        payload = json.dumps(key_fields, sort_keys=True)
         digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
         return f"{self.settings.CACHE_NAMESPACE}:ai:{digest}"
 
+    async def _lookup_cached(
+        self, cache_key: str, query: str, mode: str, chat_history: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        """Return an exact cache hit, else the answer to a near-duplicate query in the same mode."""
+        cached = await self._fetch_cache(cache_key)
+        # Near-duplicates are only interchangeable outside of a conversation
+        if cached or chat_history or not self.settings.SEMANTIC_CACHE_ENABLED:
+            return cached
+
+        match = self._semantic_cache.lookup(query, mode)
+        if not match:
+            return None
+        cached = await self._fetch_cache(match.cache_key)
+        if not cached:
+            # The answer it pointed at has expired
+            self._semantic_cache.invalidate(match.cache_key)
+            return None
+        logger.debug("Near-duplicate cache hit (similarity %.2f) for query: %s", match.similarity, query)
+        return cached
+
+    async def _store_response(
+        self, cache_key: str, query: str, mode: str, payload: Dict[str, Any], chat_history: str = ""
+    ) -> None:
+        await self._persist_cache(cache_key, payload)
+        if self.settings.SEMANTIC_CACHE_ENABLED and not chat_history:
+            self._semantic_cache.add(query, mode, cache_key)
+
+    def _image_cache_key(self, query: str, image: Optional[ImageInput]) -> Optional[str]:
+        """Cache key for an image analysis, or ``None`` when it cannot be cached.
+
+        Keyed on a digest of the prepared bytes, not the perceptual hash: distinct
+        scans of the same view can share a dHash.
+        """
+        if getattr(image, "dhash", None) is None or not self.settings.IMAGE_CACHE_ENABLED:
+            return None
+        scope = hashlib.sha256(ImageResultCache.scope(query).encode("utf-8")).hexdigest()
+        digest = hashlib.sha256(image.data).hexdigest()
+        return f"{self.settings.CACHE_NAMESPACE}:image:{scope}:{digest}"
+
+    async def _lookup_image_cached(self, cache_key: str, query: str, image_hash: int) -> Optional[Dict[str, Any]]:
+        """Return the analysis of these exact bytes, else (when opted in) of the closest similar image."""
+        started = time.perf_counter()
+        result = "miss"
+        try:
+            cached = await self._fetch_cache(cache_key)
+            if cached:
+                result = "exact"
+                return cached
+            if self.settings.IMAGE_CACHE_MAX_DISTANCE <= 0:
+                return None
+
+            match = self._image_cache.lookup(query, image_hash)
+            if not match:
+                return None
+            cached = None if match.cache_key == cache_key else await self._fetch_cache(match.cache_key)
+            if not cached:
+                # The answer it pointed at has expired
+                self._image_cache.invalidate(match.cache_key)
+                return None
+            logger.debug("Near-duplicate image cache hit (distance %d) for query: %s", match.distance, query)
+            result = "near"
+            return cached
+        finally:
+            IMAGE_CACHE_LOOKUPS.labels(result).inc()
+            IMAGE_CACHE_LOOKUP_SECONDS.observe(time.perf_counter() - started)
+
+    async def _store_image_response(
+        self, cache_key: str, query: str, image_hash: int, payload: Dict[str, Any]
+    ) -> None:
+        await self._persist_cache(cache_key, payload)
+        if self.settings.IMAGE_CACHE_MAX_DISTANCE > 0:
+            self._image_cache.add(query, image_hash, cache_key)
+
     async def _fetch_cache(self, key: str) -> Optional[Dict[str, Any]]:
+        local = self._l1.get(key)
+        if local is not None:
+            return local
         if not self._redis:
             return None
         try:
             cached = await self._redis.get(key)
             if cached:
-                return json.loads(cached)
+                payload = json.loads(cached)
+                self._l1.set(key, payload, size=len(cached))
+                return payload
         except Exception as exc:  # pragma: no cover
             logger.debug("AI cache fetch failed: %s", exc)
         return None
 
     async def _persist_cache(self, key: str, payload: Dict[str, Any]) -> None:
+        serialized = json.dumps(payload)
+        self._l1.set(key, payload, size=len(serialized))
         if not self._redis:
             return
         try:
-            await self._redis.setex(key, self.settings.CACHE_TTL_SECONDS, json.dumps(payload))
+            await self._redis.setex(key, self.settings.CACHE_TTL_SECONDS, serialized)
         except Exception as exc:  # pragma: no cover
             logger.debug("AI cache persist failed: %s", exc)
 
-    async def analyze_medical_image(
-        self, 
-        query: str, 
-        image_base64: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """
-        Analyze medical imaging with multimodal AI (Gemini Pro Vision or GPT-4 Vision).
-        
-        Args:
-            query: User's question or clinical context
-            image_base64: Base64 encoded image data (optional)
-            
-        Returns:
-            Dictionary with response and confidence score
-        """
-        try:
-            # Use Gemini Pro Vision for image analysis
-            import google.generativeai as genai
-            
-            genai.configure(api_key=self.settings.GEMINI_API_KEY)
-            model = genai.GenerativeModel(self.settings.GEMINI_MODEL)
-            
-            # Create comprehensive medical imaging analysis prompt
-            imaging_prompt = f"""You are Mediverse, an expert medical imaging AI assistant with advanced diagnostic capabilities.
+    def _imaging_prompt(self, query: str) -> str:
+        """Build the comprehensive medical imaging analysis prompt."""
+        return f"""You are Mediverse, an expert medical imaging AI assistant with advanced diagnostic capabilities.
 
 IMPORTANT: You are analyzing medical scans for educational and preliminary assessment purposes only.
 
@@ -284,21 +564,49 @@ CRITICAL DISCLAIMERS:
 
 Provide your analysis in a clear, structured, professional medical format with specific details."""
 
-            # Generate response
-            if image_base64:
-                # Decode base64 image
-                import base64
-                from io import BytesIO
+    def _vision_contents(self, query: str, image: Optional[ImageInput]) -> Any:
+        imaging_prompt = self._imaging_prompt(query)
+        if image is None:
+            # Text-only query (fallback to standard medical AI)
+            return imaging_prompt
 
-                from PIL import Image
-                
-                image_bytes = base64.b64decode(image_base64)
-                image = Image.open(BytesIO(image_bytes))
-                
-                response = model.generate_content([imaging_prompt, image])
-            else:
-                # Text-only query (fallback to standard medical AI)
-                response = model.generate_content(imaging_prompt)
+        return [imaging_prompt, to_vision_part(image)]
+
+    async def analyze_medical_image(
+        self, 
+        query: str, 
+        image: Optional[ImageInput] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyze medical imaging with multimodal AI (Gemini Pro Vision or GPT-4 Vision).
+        
+        Args:
+            query: User's question or clinical context
+            image: Encoded image (``PreparedImage``, bytes or memoryview) or a decoded
+                PIL image (optional)
+            
+        Returns:
+            Dictionary with response and confidence score
+
+        Analyses of a ``PreparedImage`` are cached by its perceptual hash, so a
+        re-upload of the same scan with the same question skips the model call.
+        """
+        cache_key = self._image_cache_key(query, image)
+        if cache_key:
+            cached = await self._lookup_image_cached(cache_key, query, image.dhash)
+            if cached:
+                logger.debug("Returning cached image analysis for query: %s", query)
+                return cached
+
+        try:
+            # Use Gemini Pro Vision for image analysis
+            model = self._vision_model()
+
+            # Generate response
+            contents = self._vision_contents(query, image)
+            response = await get_circuit_breaker("gemini", self.settings).call(
+                lambda: model.generate_content_async(contents)
+            )
             
             # Extract and process response
             if response and response.text:
@@ -307,10 +615,13 @@ Provide your analysis in a clear, structured, professional medical format with s
                 # Calculate confidence score based on response quality
                 confidence = self._calculate_confidence(ai_response, query)
                 
-                return {
+                payload = {
                     "response": ai_response,
                     "confidence_score": confidence,
                 }
+                if cache_key:
+                    await self._store_image_response(cache_key, query, image.dhash, payload)
+                return payload
             else:
                 return {
                     "response": "I apologize, but I couldn't generate a complete analysis. Please ensure the image is clear and try again, or consult a healthcare professional.",
@@ -323,3 +634,52 @@ Provide your analysis in a clear, structured, professional medical format with s
                 "response": f"I encountered an error while analyzing the image: {str(e)}. Please try again or consult a radiologist for professional evaluation.",
                 "confidence_score": 0.0,
             }
+
+    async def stream_medical_image_analysis(
+        self,
+        query: str,
+        image: Optional[ImageInput] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a medical imaging analysis chunk by chunk.
+
+        Emits the same ``token``/``complete`` events as ``stream_response``; the
+        ``complete`` payload matches what ``analyze_medical_image`` returns, and
+        shares its cache.
+        """
+        cache_key = self._image_cache_key(query, image)
+        if cache_key:
+            cached = await self._lookup_image_cached(cache_key, query, image.dhash)
+            if cached:
+                logger.debug("Streaming cached image analysis for query: %s", query)
+                yield {"event": "token", "data": cached.get("response", "")}
+                yield {"event": "complete", "data": cached}
+                return
+
+        model = self._vision_model()
+
+        chunks = []
+        try:
+            async def vision_chunks():
+                response = await model.generate_content_async(self._vision_contents(query, image), stream=True)
+                async for chunk in response:
+                    yield chunk
+
+            async for chunk in get_circuit_breaker("gemini", self.settings).stream(vision_chunks):
+                text = getattr(chunk, "text", "")
+                if not text:
+                    continue
+                chunks.append(text)
+                yield {"event": "token", "data": text}
+        except Exception as exc:  # pragma: no cover - external API
+            logger.error("Streaming medical image analysis failed: %s", exc)
+            raise
+
+        ai_response = "".join(chunks)
+        payload = {
+            "response": ai_response,
+            "confidence_score": self._calculate_confidence(ai_response, query) if ai_response else 0.0,
+        }
+        if cache_key and ai_response:
+            await self._store_image_response(cache_key, query, image.dhash, payload)
+        yield {"event": "complete", "data": payload}
@@ -0,0 +1,170 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set
+
+from app.services.semantic_cache import normalize_query
+
+NO_CONTEXT = "No additional context available"
+
+# Sentence ends followed by whitespace, or explicit line breaks
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\s*\n+\s*")
+_ELLIPSIS = re.compile(r"(?:\.\.\.|…)$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token for English)."""
+
+    return (len(text or "") + 3) // 4
+
+
+def shingles(tokens: Sequence[str], size: int = 4) -> Set[int]:
+    """Hashes of every run of ``size`` consecutive tokens."""
+
+    if len(tokens) <= size:
+        return {hash(tuple(tokens))} if tokens else set()
+    return {hash(tuple(tokens[i : i + size])) for i in range(len(tokens) - size + 1)}
+
+
+def containment(left: Set[int], right: Set[int]) -> float:
+    """Share of the smaller shingle set found in the other; 1.0 when one text quotes the other."""
+
+    if not left or not right:
+        return 0.0
+    return len(left & right) / min(len(left), len(right))
+
+
+@dataclass
+class _Sentence:
+    source: int
+    position: int
+    text: str
+    terms: List[str]
+    tokens: int
+    score: float = 0.0
+
+
+class ContextBuilder:
+    """Assemble the search context for a prompt within a token budget.
+
+    Tavily returns up to ``MAX_SEARCH_RESULTS`` long snippets, often with the
+    same syndicated paragraph under several domains. Rather than pasting the
+    first few snippets whole, the builder:
+
+    1. drops passages that mostly repeat a higher-scored one (shingle containment),
+    2. splits the rest into sentences and drops sentences already seen,
+    3. ranks sentences with BM25 against the query, weighted by the source score,
+    4. packs the best sentences into the mode's token budget and prints them
+       grouped by source, in their original order.
+    """
+
+    def __init__(
+        self,
+        token_budgets: Optional[Mapping[str, int]] = None,
+        default_budget: int = 800,
+        dedup_threshold: float = 0.6,
+        shingle_size: int = 4,
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_sentence_chars: int = 600,
+    ) -> None:
+        self.token_budgets = dict(token_budgets or {})
+        self.default_budget = default_budget
+        self.dedup_threshold = dedup_threshold
+        self.shingle_size = shingle_size
+        self.k1 = k1
+        self.b = b
+        self.max_sentence_chars = max_sentence_chars
+
+    def budget_for(self, mode: str) -> int:
+        return self.token_budgets.get(mode, self.default_budget)
+
+    def build(self, query: str, results: Iterable[Dict[str, Any]], mode: str = "quick") -> str:
+        sources = self._distinct_sources(results)
+        sentences = self._sentences(sources)
+        if not sentences:
+            return NO_CONTEXT
+
+        self._score(query, sentences, [float(source.get("score") or 0) for source in sources])
+        chosen = self._pack(sentences, sources, self.budget_for(mode))
+        if not chosen:
+            return NO_CONTEXT
+
+        blocks = []
+        for index, source in enumerate(sources):
+            picked = sorted((s for s in chosen if s.source == index), key=lambda s: s.position)
+            if picked:
+                blocks.append(f"Source: {source.get('title')}\n" + " ".join(s.text for s in picked))
+        return "\n\n".join(blocks)
+
+    def _distinct_sources(self, results: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ranked = sorted(
+            (r for r in results if r.get("content")),
+            key=lambda r: float(r.get("score") or 0),
+            reverse=True,
+        )
+        kept: List[Dict[str, Any]] = []
+        kept_shingles: List[Set[int]] = []
+        for result in ranked:
+            current = shingles(normalize_query(result["content"]), self.shingle_size)
+            if any(containment(current, seen) >= self.dedup_threshold for seen in kept_shingles):
+                continue
+            kept.append(result)
+            kept_shingles.append(current)
+        return kept
+
+    def _sentences(self, sources: List[Dict[str, Any]]) -> List[_Sentence]:
+        sentences: List[_Sentence] = []
+        seen: Set[int] = set()
+        for index, source in enumerate(sources):
+            fragments = _SENTENCE_BREAK.split(source["content"].strip())
+            # Tavily cuts snippets mid-sentence and marks the cut with an ellipsis
+            if len(fragments) > 1 and _ELLIPSIS.search(fragments[-1]):
+                fragments.pop()
+            for position, text in enumerate(fragments):
+                text = text.strip()
+                if not text:
+                    continue
+                terms = normalize_query(text)
+                if len(terms) < 3:
+                    continue
+                fingerprint = hash(tuple(terms))
+                if fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+                if len(text) > self.max_sentence_chars:
+                    text = text[: self.max_sentence_chars].rsplit(" ", 1)[0] + "..."
+                sentences.append(_Sentence(index, position, text, terms, estimate_tokens(text) + 1))
+        return sentences
+
+    def _score(self, query: str, sentences: List[_Sentence], source_scores: List[float]) -> None:
+        query_terms = set(normalize_query(query))
+        count = len(sentences)
+        average_length = sum(len(s.terms) for s in sentences) / count
+        frequency = Counter(term for s in sentences for term in set(s.terms) if term in query_terms)
+        idf = {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in frequency.items()
+        }
+
+        for sentence in sentences:
+            counts = Counter(term for term in sentence.terms if term in idf)
+            norm = self.k1 * (1 - self.b + self.b * len(sentence.terms) / average_length)
+            bm25 = sum(idf[term] * tf * (self.k1 + 1) / (tf + norm) for term, tf in counts.items())
+            # The source score breaks ties and keeps off-topic queries ordered by relevance
+            sentence.score = bm25 * (0.5 + source_scores[sentence.source]) + 0.01 * source_scores[sentence.source]
+
+    def _pack(self, sentences: List[_Sentence], sources: List[Dict[str, Any]], budget: int) -> List[_Sentence]:
+        chosen: List[_Sentence] = []
+        used = 0
+        headed: Set[int] = set()
+        for sentence in sorted(sentences, key=lambda s: (-s.score, s.source, s.position)):
+            cost = sentence.tokens
+            if sentence.source not in headed:
+                cost += estimate_tokens(f"Source: {sources[sentence.source].get('title')}\n") + 1
+            if used + cost > budget:
+                continue
+            chosen.append(sentence)
+            used += cost
+            headed.add(sentence.source)
+        return chosen
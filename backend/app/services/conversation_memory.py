@@ -0,0 +1,169 @@
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, List, Optional
+
+from app.services.context_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+# Write the new session state only if nobody changed it since it was read, so
+# concurrent turns (on any worker) retry instead of overwriting each other
+_COMPARE_AND_SET = """
+local current = redis.call('get', KEYS[1])
+if (current or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('setex', KEYS[1], ARGV[2], ARGV[3])
+return 1
+"""
+# Attempts before a turn is given up under heavy contention on one session
+_APPEND_ATTEMPTS = 5
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4
+    text = " ".join((text or "").split())
+    return text if len(text) <= max_chars else text[: max_chars - 3].rstrip() + "..."
+
+
+@dataclass
+class SessionState:
+    summary: List[str] = field(default_factory=list)
+    turns: List[List[str]] = field(default_factory=list)  # [query, response] pairs
+    updated_at: float = field(default_factory=time.time)
+
+
+class ConversationStore:
+    """Per-session chat history with a fixed token budget.
+
+    Each session keeps its most recent turns verbatim. When they no longer fit in
+    ``history_token_budget``, the oldest turns are rolled into a short extractive
+    summary (the question plus the opening sentence of the answer), which is itself
+    capped at ``summary_token_budget``. Prompt size therefore stays flat however
+    long a conversation or a worker runs.
+
+    Sessions live in a bounded in-process LRU by default; pass a Redis client to
+    share them across workers. With Redis, each turn (and the summary it rolls
+    over) is written with a compare-and-set script and retried on a conflict, so
+    concurrent requests in one conversation never drop a turn. Calls without a
+    session id are stateless.
+    """
+
+    def __init__(
+        self,
+        history_token_budget: int = 1500,
+        summary_token_budget: int = 300,
+        max_sessions: int = 10_000,
+        ttl_seconds: int = 3600,
+        redis_client: Optional[Any] = None,
+        namespace: str = "medical_ai",
+    ) -> None:
+        self.history_token_budget = history_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis_client
+        self._namespace = namespace
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._compare_and_set = redis_client.register_script(_COMPARE_AND_SET) if redis_client else None
+
+    async def load_history(self, session_id: Optional[str]) -> str:
+        """Return the formatted chat history for ``session_id`` ("" when there is none)."""
+
+        if not session_id:
+            return ""
+        state = await self._load(session_id)
+        return self.format_history(state) if state else ""
+
+    async def append(self, session_id: Optional[str], query: str, response: str) -> None:
+        """Record a completed turn and roll older turns into the summary if over budget."""
+
+        if not session_id:
+            return
+        if self._redis:
+            await self._append_shared(session_id, query, response)
+            return
+        state = await self._load(session_id) or SessionState()
+        self._add_turn(state, query, response)
+        await self._save(session_id, state)
+
+    async def clear(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        if self._redis:
+            try:
+                await self._redis.delete(self._key(session_id))
+            except Exception as exc:  # pragma: no cover - external service
+                logger.debug("Conversation delete failed: %s", exc)
+
+    @staticmethod
+    def format_history(state: SessionState) -> str:
+        lines = []
+        if state.summary:
+            lines.append("Summary of earlier conversation: " + " ".join(state.summary))
+        for query, response in state.turns:
+            lines.append(f"User: {query}")
+            lines.append(f"Assistant: {response}")
+        return "\n".join(lines)
+
+    def _add_turn(self, state: SessionState, query: str, response: str) -> None:
+        # A single long answer must not crowd out the rest of the window
+        per_turn_budget = max(1, self.history_token_budget // 2)
+        state.turns.append([_clip(query, per_turn_budget // 4), _clip(response, per_turn_budget)])
+        self._enforce_budget(state)
+        state.updated_at = time.time()
+
+    async def _append_shared(self, session_id: str, query: str, response: str) -> None:
+        key = self._key(session_id)
+        try:
+            for _ in range(_APPEND_ATTEMPTS):
+                raw = await self._redis.get(key)
+                state = SessionState(**json.loads(raw)) if raw else SessionState()
+                self._add_turn(state, query, response)
+                updated = json.dumps(asdict(state))
+                if await self._compare_and_set(keys=[key], args=[raw or "", self.ttl_seconds, updated]):
+                    return
+            logger.warning("Dropped a conversation turn after %d conflicting updates", _APPEND_ATTEMPTS)
+        except Exception as exc:  # pragma: no cover - external service
+            logger.debug("Conversation persist failed: %s", exc)
+
+    def _enforce_budget(self, state: SessionState) -> None:
+        while len(state.turns) > 1 and estimate_tokens(self.format_history(state)) > self.history_token_budget:
+            query, response = state.turns.pop(0)
+            opening = _SENTENCE_END.split(response, 1)[0]
+            state.summary.append(f"Asked about {_clip(query, 40)}; answered: {_clip(opening, 60)}")
+
+        while len(state.summary) > 1 and estimate_tokens(" ".join(state.summary)) > self.summary_token_budget:
+            state.summary.pop(0)
+
+    async def _load(self, session_id: str) -> Optional[SessionState]:
+        if self._redis:
+            try:
+                raw = await self._redis.get(self._key(session_id))
+                return SessionState(**json.loads(raw)) if raw else None
+            except Exception as exc:  # pragma: no cover - external service
+                logger.debug("Conversation fetch failed: %s", exc)
+                return None
+
+        state = self._sessions.get(session_id)
+        if state is None:
+            return None
+        if time.time() - state.updated_at > self.ttl_seconds:
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return state
+
+    async def _save(self, session_id: str, state: SessionState) -> None:
+        self._sessions[session_id] = state
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def _key(self, session_id: str) -> str:
+        return f"{self._namespace}:session:{session_id}"
@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.services.semantic_cache import normalize_query
+from prometheus_client import Counter, Histogram
+
+IMAGE_CACHE_LOOKUPS = Counter(
+    "image_cache_lookups_total",
+    "Image analysis cache lookups by result (exact, near, miss)",
+    ["result"],
+)
+IMAGE_CACHE_LOOKUP_SECONDS = Histogram(
+    "image_cache_lookup_seconds",
+    "Time spent looking up a cached image analysis",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+HASH_BITS = 64
+# Each substring must stay wide enough to be selective
+_MAX_CHUNKS = 16
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return (left ^ right).bit_count()
+
+
+@dataclass(frozen=True)
+class ImageMatch:
+    cache_key: str
+    distance: int
+
+
+class ImageResultCache:
+    """Find cached analyses of visually near-identical images for the same question.
+
+    Entries are grouped by the normalized clinical query and indexed by their
+    64-bit image dHash using multi-index hashing: the hash is cut into
+    ``max_distance + 1`` substrings, and by the pigeonhole principle any hash
+    within ``max_distance`` bits agrees with the probe on at least one of them.
+    A lookup therefore probes a handful of exact-match tables and verifies the
+    few candidates, instead of scanning every entry. Recompressed, resized or
+    slightly re-cropped copies of a scan reuse the earlier answer.
+
+    The index only stores hashes and a pointer (``cache_key``) into the regular
+    response cache, and forgets the oldest entries past ``max_entries``.
+
+    Near-match reuse is opt-in (``IMAGE_CACHE_MAX_DISTANCE`` above 0): the index
+    is shared by every user, and scans of the same view from different patients
+    can hash within a few bits of each other.
+    """
+
+    def __init__(self, max_distance: int = 6, max_entries: int = 100_000) -> None:
+        if not 0 <= max_distance < _MAX_CHUNKS:
+            raise ValueError(f"max_distance must be between 0 and {_MAX_CHUNKS - 1}")
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._chunks = _chunk_layout(max_distance + 1)
+        self._tables: Dict[str, List[Dict[int, List[str]]]] = {}
+        # Plain dicts keep insertion order, which is all the eviction needs
+        self._entries: Dict[str, Tuple[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def scope(query: str) -> str:
+        return " ".join(normalize_query(query))
+
+    def lookup(self, query: str, image_hash: int) -> Optional[ImageMatch]:
+        """Return the closest cached analysis of a similar image for ``query``."""
+
+        tables = self._tables.get(self.scope(query))
+        if tables is None:
+            return None
+
+        best: Optional[ImageMatch] = None
+        seen = set()
+        for table, (shift, mask) in zip(tables, self._chunks):
+            for cache_key in table.get((image_hash >> shift) & mask, ()):
+                if cache_key in seen:
+                    continue
+                seen.add(cache_key)
+                distance = hamming_distance(image_hash, self._entries[cache_key][1])
+                if distance <= self.max_distance and (best is None or distance < best.distance):
+                    best = ImageMatch(cache_key=cache_key, distance=distance)
+        return best
+
+    def add(self, query: str, image_hash: int, cache_key: str) -> None:
+        """Index ``image_hash`` for ``query`` as answered under ``cache_key``."""
+
+        if cache_key in self._entries:
+            return
+        scope = self.scope(query)
+        self._entries[cache_key] = (scope, image_hash)
+        tables = self._tables.setdefault(scope, [{} for _ in self._chunks])
+        for table, (shift, mask) in zip(tables, self._chunks):
+            table.setdefault((image_hash >> shift) & mask, []).append(cache_key)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, cache_key: str) -> None:
+        """Forget the entry pointing at ``cache_key`` (e.g. after it expired)."""
+
+        if cache_key in self._entries:
+            self._remove(cache_key)
+
+    def _remove(self, cache_key: str) -> None:
+        scope, image_hash = self._entries.pop(cache_key)
+        tables = self._tables[scope]
+        for table, (shift, mask) in zip(tables, self._chunks):
+            chunk = (image_hash >> shift) & mask
+            members = table[chunk]
+            members.remove(cache_key)
+            if not members:
+                del table[chunk]
+        if not tables[0]:
+            del self._tables[scope]
+
+
+def _chunk_layout(num_chunks: int) -> List[Tuple[int, int]]:
+    """Split 64 bits into ``num_chunks`` near-equal ``(shift, mask)`` substrings."""
+
+    layout = []
+    shift = 0
+    for index in range(num_chunks):
+        width = (HASH_BITS - shift) // (num_chunks - index)
+        layout.append((shift, (1 << width) - 1))
+        shift += width
+    return layout
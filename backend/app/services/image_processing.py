@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import mmap
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple, Union
+
+from PIL import Image, ImageChops
+
+logger = logging.getLogger(__name__)
+
+# Qualities tried in order until the encoded image fits the byte budget
+JPEG_QUALITY_LADDER = (80, 70, 60, 50, 40)
+# Channel spread below which an RGB scan is treated as grayscale (JPEG chroma noise)
+_GRAYSCALE_TOLERANCE = 8
+_MIN_DIMENSION = 256
+# Images with at most this many distinct colours are diagrams/screenshots, kept lossless
+_FLAT_COLOR_LIMIT = 64
+
+
+class ImagePoolSaturated(Exception):
+    """Raised when too many images are already waiting for preprocessing."""
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    """Encoded image ready to hand to a vision model without further decoding."""
+
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    dhash: Optional[int] = None  # 64-bit perceptual hash of the picture, see ``image_dhash``
+
+    def as_blob(self) -> Dict[str, Any]:
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+ImageInput = Union[PreparedImage, bytes, bytearray, memoryview, Image.Image]
+# Encoded image bytes, or the path of a file holding them (see ``image_upload``)
+ImageSource = Union[bytes, str]
+
+
+def to_vision_part(image: ImageInput) -> Any:
+    """Convert an image handle into a content part for the vision model.
+
+    Encoded bytes are passed through as an inline blob, so the model client does
+    not decode and re-encode them. Decoded PIL images are handed over as-is and
+    encoded exactly once by the client.
+    """
+
+    if isinstance(image, PreparedImage):
+        return image.as_blob()
+    if isinstance(image, Image.Image):
+        return image
+    data = bytes(image)  # no copy for bytes; memoryview/bytearray need one for protobuf
+    with Image.open(BytesIO(data)) as img:
+        mime_type = Image.MIME.get(img.format, "application/octet-stream")
+    return {"mime_type": mime_type, "data": data}
+
+
+def image_dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a tiny grayscale copy.
+
+    Recompression, rescaling and small crops flip only a few of the 64 bits, so
+    copies of the same scan stay within a small Hamming distance of each other.
+    """
+
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+@contextmanager
+def _open_source(source: ImageSource) -> Iterator[Tuple[BinaryIO, int]]:
+    """A seekable view of the encoded image and its size in bytes.
+
+    Files are memory-mapped, so an upload on disk is decoded from the page cache
+    without being copied onto the heap first.
+    """
+
+    if isinstance(source, str):
+        with open(source, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view, len(view)
+    else:
+        yield BytesIO(source), len(source)
+
+
+def is_model_ready(data: ImageSource, max_size: int = 1024, max_bytes: int = 1_048_576) -> bool:
+    """Whether ``data`` is already a JPEG the model can take as-is.
+
+    Only the header is parsed, so this is cheap enough to run on the event loop.
+    """
+
+    with _open_source(data) as (encoded, size), Image.open(encoded) as img:
+        return _fits(img, size, max_size, max_bytes)
+
+
+def _fits(img: Image.Image, size: int, max_size: int, max_bytes: int) -> bool:
+    return (
+        img.format == "JPEG"
+        and img.mode in ("RGB", "L")
+        and max(img.size) <= max_size
+        and size <= max_bytes
+        and not _has_metadata(img)
+    )
+
+
+def _has_metadata(img: Image.Image) -> bool:
+    """Whether a JPEG carries segments beyond the JFIF/Adobe headers needed to decode it.
+
+    EXIF, XMP, ICC, comments and vendor APPn segments can hold GPS positions,
+    device serials and the patient or institution fields scanners write, so
+    such files are re-encoded (which drops them) rather than passed through.
+    """
+
+    return any(
+        not (marker == "APP0" and payload.startswith(b"JFIF\0"))
+        and not (marker == "APP14" and payload.startswith(b"Adobe"))
+        for marker, payload in getattr(img, "applist", ())
+    )
+
+
+def preprocess_image(data: ImageSource, max_size: int = 1024, max_bytes: int = 1_048_576) -> PreparedImage:
+    """Decode, downscale and re-encode an image to fit ``max_size`` and ``max_bytes``.
+
+    Runs inside the worker pool, so it must stay a picklable top-level function;
+    uploads are passed by path, not by value. JPEGs are decoded at reduced
+    resolution via ``Image.draft``, which lets libjpeg skip most of the work for
+    multi-megapixel scans. Uploads that already fit and carry no metadata are
+    returned byte-for-byte; they are only decoded at a fraction of their
+    resolution to compute the perceptual hash.
+    """
+
+    with _open_source(data) as (encoded, size), Image.open(encoded) as img:
+        if _fits(img, size, max_size, max_bytes):
+            width, height = img.size
+            # DCT-domain downscale: the hash only needs a few dozen pixels
+            img.draft("L", (64, 64))
+            image_hash = image_dhash(img)
+            if not isinstance(data, bytes):
+                encoded.seek(0)
+                data = encoded.read()
+            return PreparedImage(data, "image/jpeg", width, height, dhash=image_hash)
+        return _reencode(img, max_size, max_bytes)
+
+
+def _reencode(img: Image.Image, max_size: int, max_bytes: int) -> PreparedImage:
+    if img.format == "JPEG":
+        img.draft("RGB", (max_size, max_size))
+
+    img = _normalize_mode(img)
+    if img.mode == "RGB" and _is_grayscale(img):
+        # Most X-rays, CTs and MRIs arrive as RGB; one channel is a third of the
+        # resize work and of the encoded bytes
+        img = img.convert("L")
+
+    # Resize if too large (max 1024x1024 for API efficiency). reducing_gap box-filters
+    # down to ~2x the target first, so LANCZOS only runs over a small image.
+    if img.width > max_size or img.height > max_size:
+        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    image_hash = image_dhash(img)
+    encoded, mime_type = _encode_within_budget(img, max_bytes)
+    with Image.open(BytesIO(encoded)) as final:
+        width, height = final.size
+    return PreparedImage(data=encoded, mime_type=mime_type, width=width, height=height, dhash=image_hash)
+
+
+def _normalize_mode(img: Image.Image) -> Image.Image:
+    if img.mode in ("RGB", "L"):
+        return img
+    if img.mode in ("LA", "I", "I;16", "I;16B", "F"):
+        return img.convert("L")
+    return img.convert("RGB")
+
+
+def _is_grayscale(img: Image.Image) -> bool:
+    red, green, blue = img.split()
+    return all(
+        ImageChops.difference(a, b).getextrema()[1] <= _GRAYSCALE_TOLERANCE
+        for a, b in ((red, green), (green, blue))
+    )
+
+
+def _save(img: Image.Image, fmt: str, **params: Any) -> bytes:
+    buffered = BytesIO()
+    img.save(buffered, format=fmt, **params)
+    return buffered.getvalue()
+
+
+def _encode_within_budget(img: Image.Image, max_bytes: int) -> Tuple[bytes, str]:
+    """Pick the format and quality that keep the image under ``max_bytes``.
+
+    Flat-colour images (annotated diagrams, screenshots) stay lossless as PNG when
+    that fits; everything else walks down the JPEG quality ladder, and as a last
+    resort the image is shrunk further.
+    """
+
+    if img.getcolors(_FLAT_COLOR_LIMIT) is not None:
+        encoded = _save(img, "PNG")
+        if len(encoded) <= max_bytes:
+            return encoded, "image/png"
+
+    while True:
+        for quality in JPEG_QUALITY_LADDER:
+            encoded = _save(img, "JPEG", quality=quality)
+            if len(encoded) <= max_bytes:
+                return encoded, "image/jpeg"
+        if max(img.size) <= _MIN_DIMENSION:
+            logger.warning("Image still %d bytes at minimum size; sending over budget", len(encoded))
+            return encoded, "image/jpeg"
+        img = img.resize((max(1, img.width * 3 // 4), max(1, img.height * 3 // 4)), Image.Resampling.LANCZOS)
+
+
+class ImageProcessor:
+    """Run image preprocessing off the event loop on a bounded process pool.
+
+    At most ``max_pending`` images may be queued or in progress; further requests
+    fail fast with ``ImagePoolSaturated`` instead of piling up behind a backlog.
+    Uploads that are already model-ready skip the pool and are only hashed. With
+    ``max_workers=0`` work runs on the default thread pool instead, for platforms
+    where worker processes are unavailable.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pending: int = 8,
+        max_size: int = 1024,
+        max_bytes: int = 1_048_576,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def preprocess(self, data: ImageSource) -> PreparedImage:
+        loop = asyncio.get_running_loop()
+        if is_model_ready(data, self.max_size, self.max_bytes):
+            # Only a reduced-size decode for the hash is left; a thread avoids pickling the upload
+            return await loop.run_in_executor(None, preprocess_image, data, self.max_size, self.max_bytes)
+
+        if self._pending >= self.max_pending:
+            raise ImagePoolSaturated(f"{self._pending} images already queued for preprocessing")
+
+        self._pending += 1
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(), preprocess_image, data, self.max_size, self.max_bytes
+            )
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.max_workers <= 0:
+            return None
+        if self._executor is None:
+            # Spawned workers do not inherit the server's event loop or sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
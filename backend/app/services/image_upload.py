@@ -0,0 +1,131 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from typing import IO, Any, Optional
+
+# Size of each read from the request's spooled upload
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+# Leading bytes of the formats Pillow decodes for the vision pipeline
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload is over the byte limit for its mode."""
+
+    def __init__(self, max_bytes: int) -> None:
+        super().__init__(f"Upload is larger than {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class UnsupportedImage(ValueError):
+    """Raised when an upload's leading bytes are not a supported image format."""
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """The MIME type for the image format ``head`` starts with, from its magic bytes."""
+
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return None
+
+
+class IngestedUpload:
+    """An upload that is on disk and can be read by path.
+
+    The image pipeline gets ``path`` rather than the bytes, so worker processes
+    open (and memory-map) the file themselves and nothing holds the upload on
+    the heap. Usually ``path`` names Starlette's own spooled file, which the
+    request closes; ``close()`` only removes the copy made when the spooled file
+    cannot be reopened by path.
+    """
+
+    def __init__(self, file: IO[bytes], path: str, size: int, mime_type: str, owned: bool = False) -> None:
+        # Holding ``file`` keeps its descriptor, and so a ``/proc`` fd path, valid
+        self.file = file
+        self.path = path
+        self.size = size
+        self.mime_type = mime_type
+        self._owned = owned
+
+    def close(self) -> None:
+        if self._owned:
+            self.file.close()
+
+    def __enter__(self) -> "IngestedUpload":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+async def ingest_upload(upload: Any, max_bytes: int, chunk_bytes: int = UPLOAD_CHUNK_BYTES) -> IngestedUpload:
+    """Check an uploaded file's size and image type and expose it by path, without copying it.
+
+    ``upload`` is a Starlette ``UploadFile``, already spooled by the form parser.
+    The size is checked before anything is read and the format is sniffed from
+    the first chunk; the spooled file is then rolled over to disk (a no-op for
+    uploads past the parser's in-memory threshold) and handed on as it is.
+    Raises ``UploadTooLarge`` or ``UnsupportedImage``.
+    """
+
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+    # Blocking file I/O, so it runs on a worker thread
+    return await asyncio.to_thread(_spool_upload, upload.file, max_bytes, chunk_bytes)
+
+
+def _spool_upload(source: IO[bytes], max_bytes: int, chunk_bytes: int) -> IngestedUpload:
+    size = source.seek(0, os.SEEK_END)
+    if size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+    source.seek(0)
+    mime_type = sniff_image_type(source.read(chunk_bytes))
+    if mime_type is None:
+        raise UnsupportedImage("Upload is not a JPEG, PNG, WebP, GIF, BMP or TIFF image")
+
+    if hasattr(source, "rollover"):
+        source.rollover()
+    source.flush()
+    path = _reopenable_path(source)
+    if path is not None:
+        return IngestedUpload(source, path, size, mime_type)
+    return _copy_upload(source, size, mime_type, chunk_bytes)
+
+
+def _reopenable_path(file: IO[bytes]) -> Optional[str]:
+    """A path other processes can open ``file`` by, if there is one.
+
+    Rolled-over spooled files are anonymous; on Linux they are still reachable
+    through this process's ``/proc`` fd links.
+    """
+
+    name = getattr(file, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name
+    fd_path = f"/proc/{os.getpid()}/fd/{file.fileno()}"
+    return fd_path if os.path.exists(fd_path) else None
+
+
+def _copy_upload(source: IO[bytes], size: int, mime_type: str, chunk_bytes: int) -> IngestedUpload:
+    target = tempfile.NamedTemporaryFile(prefix="mediverse-upload-")
+    try:
+        source.seek(0)
+        shutil.copyfileobj(source, target, chunk_bytes)
+        target.flush()
+    except BaseException:
+        target.close()
+        raise
+    return IngestedUpload(target, target.name, size, mime_type, owned=True)
@@ -1,9 +1,79 @@
 import logging
 import re
-from typing import Dict, List
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Pattern
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_KEYWORDS_FILE = Path(__file__).parent / "data" / "emergency_keywords.txt"
+
+# Typographic apostrophes and dashes that NFKC leaves alone
+_APOSTROPHES = {"‘", "’", "‛", "ʼ", "ʹ", "′", "`"}
+_DASHES = {"-", "‐", "‑", "‒", "–", "—", "―", "−", "﹣"}
+_FOLD = str.maketrans({**{c: "'" for c in _APOSTROPHES}, **{c: " " for c in _DASHES}})
+
+_MEDICATION_PATTERN = re.compile(r"\b[A-Z][a-z]+(?:in|ol|am|ine|ate|ide)\b")
+
+
+def normalize_text(text: str) -> str:
+    """Fold ``text`` so spelling variants of a phrase compare equal.
+
+    NFKC maps full-width and compatibility characters to their plain forms,
+    casefolding handles case (including non-ASCII), curly apostrophes become
+    ``'``, hyphens and dashes become spaces, and whitespace runs collapse.
+    """
+
+    text = text or ""
+    if text.isascii():
+        # Fast path for the common case: NFKC and the fold table only touch two ASCII characters
+        text = text.replace("-", " ").replace("`", "'").lower()
+    else:
+        text = unicodedata.normalize("NFKC", text).translate(_FOLD).casefold()
+    return " ".join(text.split())
+
+
+def load_keywords(path: Path) -> List[str]:
+    """Read one phrase per line, skipping blank lines and ``#`` comments."""
+
+    with open(path, encoding="utf-8") as handle:
+        return [line.strip() for line in handle if line.strip() and not line.lstrip().startswith("#")]
+
+
+def compile_phrases(phrases: Iterable[str]) -> Optional[Pattern[str]]:
+    """Compile phrases into one regex shaped like a trie of their characters.
+
+    A flat ``a|b|c`` alternation retries every phrase at every position; here
+    phrases sharing a prefix share one branch, so each position of the text
+    costs at most the length of the longest phrase, however many phrases there
+    are. A phrase that extends another one can never be the only match, so the
+    trie is cut at the shorter phrase.
+    """
+
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        phrase = normalize_text(phrase)
+        if not phrase:
+            continue
+        node = trie
+        for char in phrase:
+            if "" in node:
+                break
+            node = node.setdefault(char, {})
+        else:
+            node.clear()
+            node[""] = {}
+    if not trie:
+        return None
+    return re.compile(_trie_pattern(trie))
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    if "" in node:
+        return ""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items())]
+    return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
 
 class MedicalValidator:
     """Validate incoming medical questions and wrap responses with safety guidance."""
@@ -13,19 +83,11 @@ class MedicalValidator:
         "or visit the nearest emergency department immediately."
     )
 
-    def __init__(self) -> None:
-        self.dangerous_keywords = {
-            "suicide",
-            "self-harm",
-            "overdose",
-            "emergency",
-            "chest pain",
-            "stroke",
-            "heart attack",
-            "unconscious",
-            "bleeding heavily",
-            "can't breathe",
-        }
+    def __init__(self, keywords: Optional[Iterable[str]] = None, keywords_file: Optional[str] = None) -> None:
+        if keywords is None:
+            keywords = load_keywords(Path(keywords_file) if keywords_file else DEFAULT_KEYWORDS_FILE)
+        self.dangerous_keywords = frozenset(normalize_text(keyword) for keyword in keywords) - {""}
+        self._emergency_pattern = compile_phrases(self.dangerous_keywords)
         self.disclaimer = (
             "⚠️ MEDICAL DISCLAIMER: This information is for educational purposes only and should not replace "
             "professional medical advice, diagnosis, or treatment. Always consult with a qualified healthcare "
@@ -42,15 +104,14 @@ class MedicalValidator:
                 "message": "A medical query is required."
             }
 
-        normalized = query.lower()
-        for keyword in self.dangerous_keywords:
-            if keyword in normalized:
-                logger.warning("Emergency keyword detected in query.")
-                return {
-                    "valid": False,
-                    "reason": "emergency",
-                    "message": self.EMERGENCY_MESSAGE,
-                }
+        normalized = normalize_text(query)
+        if self._emergency_pattern is not None and self._emergency_pattern.search(normalized):
+            logger.warning("Emergency keyword detected in query.")
+            return {
+                "valid": False,
+                "reason": "emergency",
+                "message": self.EMERGENCY_MESSAGE,
+            }
 
         if len(normalized) < 10:
             return {
@@ -61,6 +122,11 @@ class MedicalValidator:
 
         return {"valid": True}
 
+    def validate_many(self, queries: Iterable[str]) -> List[Dict[str, object]]:
+        """Validate a batch of queries; results are in the same order."""
+
+        return [self.validate_query(query) for query in queries]
+
     def add_safety_wrapper(self, response: str) -> str:
         """Return response without appending disclaimer (handled in frontend)."""
         # Disclaimer removed to prevent repetitive warnings - shown once in UI
@@ -69,8 +135,7 @@ class MedicalValidator:
     def detect_medication_mentions(self, text: str) -> List[str]:
         """Return medication-like terms to support downstream moderation."""
 
-        medication_pattern = r"\b[A-Z][a-z]+(?:in|ol|am|ine|ate|ide)\b"
-        medications = re.findall(medication_pattern, text or "")
+        medications = _MEDICATION_PATTERN.findall(text or "")
         unique_medications = sorted(set(medications))
         if unique_medications:
             logger.debug("Detected medications: %s", unique_medications)
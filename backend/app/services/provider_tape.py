@@ -0,0 +1,499 @@
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.services.context_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TAPE_MODES = ("off", "record", "replay")
+LATENCY_MODELS = ("none", "recorded", "sampled")
+
+# Streams recorded as one piece are replayed in chunks of about this many tokens
+REPLAY_CHUNK_TOKENS = 8
+
+_CLOSE = object()
+
+
+class TapeMiss(LookupError):
+    """Raised in replay when no recorded call matches and misses are not sampled."""
+
+
+@dataclass
+class TapeEntry:
+    """One provider call: what was asked, what came back and how long it took."""
+
+    kind: str  # "llm", "vision" or "search"
+    provider: str  # "gemini", "openrouter" or "tavily"
+    model: str
+    key: str  # digest of the request, the replay lookup key
+    request: Dict[str, Any]
+    response: Any  # answer text, or Tavily's JSON payload
+    chunks: List[str] = field(default_factory=list)  # streamed pieces; empty for unary calls
+    first_token_ms: float = 0.0  # until the first chunk, or the whole response for unary calls
+    total_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    recorded_at: float = 0.0
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        generating = (self.total_ms - self.first_token_ms) / 1000
+        if not self.chunks or generating <= 0 or not self.completion_tokens:
+            return None
+        return self.completion_tokens / generating
+
+
+def request_key(kind: str, provider: str, model: str, request: Dict[str, Any]) -> str:
+    payload = json.dumps({"kind": kind, "provider": provider, "model": model, "request": request}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ProviderTape:
+    """An on-disk corpus of provider calls, appended to when recording and served from when replaying.
+
+    The tape is JSON lines, gzip-compressed when the path ends in ``.gz``. Each
+    line is a ``TapeEntry``; recording appends one per completed call, so a tape
+    can be grown across runs. Appends only queue the line: a background thread
+    keeps the file open and writes (and flushes) them off the event loop, and
+    ``close`` finishes the file. A tape cut short by a crash still loads up to
+    its last flushed entry.
+
+    Replay looks a request up by its key. Repeats of a recorded request cycle
+    through its recordings in order, so runs are deterministic. A request that
+    was never recorded (new queries in a capacity test, say) gets a recorded
+    call of the same kind and provider picked by the seeded ``rng``, unless
+    ``on_miss="error"``, which raises ``TapeMiss``.
+
+    Latency follows ``latency``:
+    * ``none`` answers at once.
+    * ``recorded`` waits the entry's own first-token time and spreads its chunks
+      over the rest of its recorded duration.
+    * ``sampled`` draws the first-token time and the token rate independently
+      from all recordings of the same kind and provider, then paces chunks by
+      their token counts. This gives realistic spread even with few distinct
+      prompts.
+
+    ``latency_scale`` multiplies every wait, e.g. 2.0 for a provider twice as slow.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        latency: str = "recorded",
+        latency_scale: float = 1.0,
+        on_miss: str = "sample",
+        seed: Optional[int] = None,
+    ) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Tape mode must be 'record' or 'replay', not {mode!r}")
+        if latency not in LATENCY_MODELS:
+            raise ValueError(f"Replay latency must be one of {', '.join(LATENCY_MODELS)}, not {latency!r}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.on_miss = on_miss
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._lines: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._by_key: Dict[str, List[TapeEntry]] = defaultdict(list)
+        self._by_provider: Dict[Tuple[str, str], List[TapeEntry]] = defaultdict(list)
+        self._replayed: Dict[str, int] = defaultdict(int)
+        if mode == "replay":
+            for entry in self.load():
+                self._by_key[entry.key].append(entry)
+                self._by_provider[(entry.kind, entry.provider)].append(entry)
+            logger.info("Replaying %d recorded provider calls from %s", len(self), self.path)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._by_key.values())
+
+    def _open(self, mode: str) -> Any:
+        if self.path.suffix == ".gz":
+            return gzip.open(self.path, mode, encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def load(self) -> List[TapeEntry]:
+        self.close()  # entries this tape is still writing
+        if not self.path.exists():
+            return []
+        entries = []
+        with self._open("rt") as handle:
+            try:
+                for line in handle:
+                    if line.strip():
+                        entries.append(TapeEntry(**json.loads(line)))
+            except EOFError:
+                logger.warning("Tape %s ends mid-write; loaded the %d entries before that", self.path, len(entries))
+        return entries
+
+    def append(self, entry: TapeEntry) -> None:
+        """Queue ``entry`` for the background writer; never waits on the disk."""
+
+        line = json.dumps(asdict(entry), separators=(",", ":"), ensure_ascii=False) + "\n"
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_lines, name="provider-tape", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+            self._lines.put(line)
+
+    def close(self) -> None:
+        """Write out everything queued and close the file; a later append reopens it."""
+
+        with self._write_lock:
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                self._lines.put(_CLOSE)
+                writer.join()
+
+    def _write_lines(self) -> None:
+        handle = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # One gzip member per writer: reopened tapes stay readable as a single stream
+            handle = self._open("at")
+        except OSError as exc:
+            logger.warning("Could not open tape %s for recording: %s", self.path, exc)
+
+        while True:
+            line = self._lines.get()
+            if line is _CLOSE:
+                break
+            if handle is None:
+                continue
+            try:
+                handle.write(line)
+                if self._lines.empty():
+                    handle.flush()
+            except OSError as exc:  # recording must never fail the request it observes
+                logger.warning("Could not record to %s: %s", self.path, exc)
+
+        if handle is not None:
+            handle.close()
+
+    def record(
+        self,
+        kind: str,
+        provider: str,
+        model: str,
+        request: Dict[str, Any],
+        response: Any,
+        started: float,
+        first_token_at: float,
+        chunks: Optional[List[str]] = None,
+    ) -> None:
+        """Append a completed call; ``started`` and ``first_token_at`` are ``time.perf_counter()`` readings."""
+
+        now = time.perf_counter()
+        text = response if isinstance(response, str) else json.dumps(response)
+        self.append(
+            TapeEntry(
+                kind=kind,
+                provider=provider,
+                model=model,
+                key=request_key(kind, provider, model, request),
+                request=request,
+                response=response,
+                chunks=chunks or [],
+                first_token_ms=round((first_token_at - started) * 1000, 1),
+                total_ms=round((now - started) * 1000, 1),
+                prompt_tokens=estimate_tokens(request.get("prompt") or request.get("query") or ""),
+                completion_tokens=estimate_tokens(text),
+                recorded_at=round(time.time(), 3),
+            )
+        )
+
+    def lookup(self, kind: str, provider: str, model: str, request: Dict[str, Any]) -> TapeEntry:
+        key = request_key(kind, provider, model, request)
+        with self._lock:
+            recorded = self._by_key.get(key)
+            if recorded:
+                entry = recorded[self._replayed[key] % len(recorded)]
+                self._replayed[key] += 1
+                return entry
+            if self.on_miss == "sample":
+                candidates = self._by_provider.get((kind, provider)) or [
+                    entry for (entry_kind, _), entries in self._by_provider.items() if entry_kind == kind
+                    for entry in entries
+                ]
+                if candidates:
+                    return self.rng.choice(candidates)
+        raise TapeMiss(f"No recorded {kind} call to {provider} matches this request")
+
+    def _pacing(self, entry: TapeEntry, chunks: List[str]) -> Tuple[float, List[float]]:
+        """Seconds until the first chunk, and before each following chunk."""
+
+        if self.latency == "none":
+            return 0.0, [0.0] * (len(chunks) - 1)
+        if self.latency == "recorded":
+            first = entry.first_token_ms / 1000
+            rest = max(entry.total_ms - entry.first_token_ms, 0.0) / 1000
+            gap = rest / (len(chunks) - 1) if len(chunks) > 1 else 0.0
+            return first * self.latency_scale, [gap * self.latency_scale] * (len(chunks) - 1)
+
+        with self._lock:
+            population = self._by_provider.get((entry.kind, entry.provider)) or [entry]
+            first = self.rng.choice(population).first_token_ms / 1000
+            rates = [rate for rate in (other.tokens_per_second for other in population) if rate]
+            rate = self.rng.choice(rates) if rates else None
+        if rate is None:
+            # No streamed recordings to take a token rate from: keep this entry's own duration
+            gap = max(entry.total_ms - entry.first_token_ms, 0.0) / 1000 / max(len(chunks) - 1, 1)
+            gaps = [gap] * (len(chunks) - 1)
+        else:
+            gaps = [estimate_tokens(chunk) / rate for chunk in chunks[1:]]
+        return first * self.latency_scale, [gap * self.latency_scale for gap in gaps]
+
+    async def replay_unary(self, entry: TapeEntry) -> Any:
+        first, gaps = self._pacing(entry, replay_chunks(entry))
+        await asyncio.sleep(first + sum(gaps))
+        return entry.response
+
+    async def replay_stream(self, entry: TapeEntry) -> AsyncIterator[str]:
+        chunks = replay_chunks(entry)
+        first, gaps = self._pacing(entry, chunks)
+        await asyncio.sleep(first)
+        for index, chunk in enumerate(chunks):
+            if index:
+                await asyncio.sleep(gaps[index - 1])
+            yield chunk
+
+
+def replay_chunks(entry: TapeEntry) -> List[str]:
+    """The entry's streamed chunks, or its text split into chunks of a few tokens."""
+
+    if entry.chunks:
+        return entry.chunks
+    text = entry.response if isinstance(entry.response, str) else ""
+    if not text:
+        return [text]
+    words = text.split(" ")
+    chunks, current = [], []
+    for word in words:
+        current.append(word)
+        if estimate_tokens(" ".join(current)) >= REPLAY_CHUNK_TOKENS:
+            chunks.append(" ".join(current) + " ")
+            current = []
+    if current:
+        chunks.append(" ".join(current))
+    else:
+        chunks[-1] = chunks[-1][:-1]
+    return chunks
+
+
+class TapedChatModel:
+    """A LangChain chat model whose ``ainvoke``/``astream`` are recorded to, or replayed from, a tape.
+
+    Anything else (``model``, ``model_name``, ...) is read from the wrapped model.
+    """
+
+    def __init__(self, llm: Any, tape: ProviderTape, provider: str) -> None:
+        self._llm = llm
+        self._tape = tape
+        self._provider = provider
+        self._model = str(getattr(llm, "model", None) or getattr(llm, "model_name", "unknown"))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._llm, name)
+
+    async def ainvoke(self, prompt: str) -> Any:
+        request = {"prompt": prompt}
+        if self._tape.mode == "replay":
+            entry = self._tape.lookup("llm", self._provider, self._model, request)
+            return await self._tape.replay_unary(entry)
+
+        started = time.perf_counter()
+        message = await self._llm.ainvoke(prompt)
+        self._tape.record(
+            "llm", self._provider, self._model, request, getattr(message, "content", message), started, time.perf_counter()
+        )
+        return message
+
+    async def astream(self, prompt: str) -> AsyncIterator[Any]:
+        request = {"prompt": prompt}
+        if self._tape.mode == "replay":
+            entry = self._tape.lookup("llm", self._provider, self._model, request)
+            async for chunk in self._tape.replay_stream(entry):
+                yield chunk
+            return
+
+        started = time.perf_counter()
+        first_token_at: Optional[float] = None
+        chunks: List[str] = []
+        async for chunk in self._llm.astream(prompt):
+            text = getattr(chunk, "content", chunk)
+            if text:
+                first_token_at = first_token_at or time.perf_counter()
+                chunks.append(text)
+            yield chunk
+        self._tape.record(
+            "llm", self._provider, self._model, request, "".join(chunks), started, first_token_at or started, chunks
+        )
+
+
+class _ReplayedResponse:
+    """Stands in for a Gemini response or stream chunk: only ``text`` is read."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class _ReplayedStream:
+    def __init__(self, chunks: AsyncIterator[str]) -> None:
+        self._chunks = chunks
+
+    async def __aiter__(self) -> AsyncIterator[_ReplayedResponse]:
+        async for chunk in self._chunks:
+            yield _ReplayedResponse(chunk)
+
+
+class _RecordingStream:
+    def __init__(self, response: Any, record: Any) -> None:
+        self._response = response
+        self._record = record
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        first_token_at: Optional[float] = None
+        chunks: List[str] = []
+        async for chunk in self._response:
+            text = getattr(chunk, "text", "")
+            if text:
+                first_token_at = first_token_at or time.perf_counter()
+                chunks.append(text)
+            yield chunk
+        self._record(chunks, first_token_at)
+
+
+def vision_request(contents: Any) -> Dict[str, Any]:
+    """The recorded form of vision contents: prompt text plus image digests, never the image."""
+
+    parts = contents if isinstance(contents, list) else [contents]
+    prompt, images = [], []
+    for part in parts:
+        if isinstance(part, str):
+            prompt.append(part)
+        elif isinstance(part, dict) and "data" in part:
+            images.append(hashlib.sha256(bytes(part["data"])).hexdigest())
+        elif hasattr(part, "tobytes"):  # a decoded PIL image
+            images.append(hashlib.sha256(part.tobytes()).hexdigest())
+    return {"prompt": "\n".join(prompt), "images": images}
+
+
+class TapedVisionModel:
+    """A Gemini ``GenerativeModel`` whose ``generate_content_async`` is recorded or replayed."""
+
+    def __init__(self, model: Any, tape: ProviderTape, provider: str = "gemini") -> None:
+        self._model = model
+        self._tape = tape
+        self._provider = provider
+        self._model_name = str(getattr(model, "model_name", "unknown"))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._model, name)
+
+    async def generate_content_async(self, contents: Any, stream: bool = False, **kwargs: Any) -> Any:
+        request = vision_request(contents)
+        if self._tape.mode == "replay":
+            entry = self._tape.lookup("vision", self._provider, self._model_name, request)
+            if stream:
+                return _ReplayedStream(self._tape.replay_stream(entry))
+            return _ReplayedResponse(await self._tape.replay_unary(entry))
+
+        started = time.perf_counter()
+        if stream:
+            response = await self._model.generate_content_async(contents, stream=True, **kwargs)
+
+            def record(chunks: List[str], first_token_at: Optional[float]) -> None:
+                self._tape.record(
+                    "vision", self._provider, self._model_name, request, "".join(chunks), started,
+                    first_token_at or started, chunks,
+                )
+
+            return _RecordingStream(response, record)
+
+        response = await self._model.generate_content_async(contents, **kwargs)
+        try:
+            text = response.text
+        except ValueError:  # blocked or empty: nothing worth replaying
+            return response
+        self._tape.record("vision", self._provider, self._model_name, request, text, started, time.perf_counter())
+        return response
+
+
+class TapedSearchClient:
+    """A Tavily client whose ``search`` is recorded to, or replayed from, a tape."""
+
+    def __init__(self, client: Any, tape: ProviderTape) -> None:
+        self._client = client
+        self._tape = tape
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    async def search(self, query: str, timeout: Optional[float] = None, **kwargs: Any) -> Dict[str, Any]:
+        # The per-call timeout shapes how long we wait, not what is asked
+        request = {"query": query, **kwargs}
+        if self._tape.mode == "replay":
+            entry = self._tape.lookup("search", "tavily", "search", request)
+            return await self._tape.replay_unary(entry)
+
+        started = time.perf_counter()
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        response = await self._client.search(query, **kwargs)
+        self._tape.record("search", "tavily", "search", request, response, started, time.perf_counter())
+        return response
+
+    async def aclose(self) -> None:
+        close = getattr(self._client, "aclose", None)
+        if close is not None:
+            await close()
+
+
+_TAPES: Dict[Tuple[Any, ...], ProviderTape] = {}
+
+
+def get_provider_tape(settings: Any) -> Optional[ProviderTape]:
+    """The process-wide tape for ``settings``, or ``None`` when recording and replay are off.
+
+    The AI and search services share one tape, so a replay run loads the corpus once.
+    """
+
+    mode = (settings.PROVIDER_TAPE_MODE or "off").lower()
+    if mode == "off":
+        return None
+    if mode not in TAPE_MODES:
+        raise ValueError(f"PROVIDER_TAPE_MODE must be one of {', '.join(TAPE_MODES)}, not {mode!r}")
+    config = (
+        settings.PROVIDER_TAPE_PATH,
+        mode,
+        settings.PROVIDER_TAPE_LATENCY,
+        settings.PROVIDER_TAPE_LATENCY_SCALE,
+        settings.PROVIDER_TAPE_ON_MISS,
+        settings.PROVIDER_TAPE_SEED,
+    )
+    tape = _TAPES.get(config)
+    if tape is None:
+        if mode == "replay":
+            # Finish any recording of the same file in this process before reading it
+            for other in _TAPES.values():
+                if other.mode == "record" and other.path == Path(config[0]):
+                    other.close()
+        tape = _TAPES[config] = ProviderTape(*config)
+    return tape
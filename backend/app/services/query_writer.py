@@ -0,0 +1,221 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models.database import MedicalQuery, response_preview
+from prometheus_client import Counter, Histogram
+from sqlalchemy import insert
+
+logger = logging.getLogger(__name__)
+
+QUERY_WRITER_ROWS = Counter(
+    "query_writer_rows_total",
+    "Medical query rows handled by the write-behind writer by outcome",
+    ["outcome"],
+)
+QUERY_WRITER_BATCH_SIZE = Histogram(
+    "query_writer_batch_size",
+    "Rows per bulk insert issued by the write-behind writer",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+_STOP = object()
+# How often an idle writer checks for a shutdown that could not queue ``_STOP``
+_STOP_POLL_SECONDS = 0.1
+
+
+class QueryWriter:
+    """Write-behind persistence for ``MedicalQuery`` rows.
+
+    ``submit`` only enqueues the row; a single background thread collects rows
+    into batches and writes each batch with one bulk ``INSERT`` and one commit.
+    A batch is flushed once it reaches ``batch_size`` rows or its oldest row has
+    waited ``flush_interval_seconds``, whichever comes first.
+
+    The queue is bounded: when the database falls behind, ``submit`` blocks for
+    up to ``put_timeout_seconds`` (callers run it from the threadpool, never on
+    the event loop) and then drops the row rather than growing without limit.
+    ``close`` waits for in-flight ``submit`` calls, then drains everything still
+    queued before returning; rows submitted after that are written directly.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        batch_size: int = 200,
+        flush_interval_seconds: float = 0.5,
+        max_queue: int = 10_000,
+        put_timeout_seconds: float = 2.0,
+        max_retries: int = 3,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.put_timeout_seconds = put_timeout_seconds
+        self.max_retries = max_retries
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._submitting = 0
+        self._closed = False
+        self._stopping = threading.Event()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(
+        self,
+        query: str,
+        response: str,
+        confidence: float,
+        sources: str,
+        mode: Optional[str] = None,
+        user_id: Optional[int] = None,
+    ) -> bool:
+        """Queue a row for persistence; returns ``False`` if it had to be dropped."""
+
+        row = {
+            "user_id": user_id,
+            "mode": mode,
+            "query": query,
+            "response": response,
+            "response_preview": response_preview(response),
+            "confidence_score": confidence,
+            "sources": sources,
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._submitting += 1
+        if closed:
+            # Late writes after shutdown go straight to the database
+            logger.info("Query writer closed; writing history row directly")
+            self._write([row])
+            return True
+
+        try:
+            self._ensure_started()
+            self._queue.put(row, timeout=self.put_timeout_seconds)
+        except queue.Full:
+            QUERY_WRITER_ROWS.labels("dropped").inc()
+            logger.warning("Query writer queue full; dropping history row")
+            return False
+        finally:
+            with self._idle:
+                self._submitting -= 1
+                self._idle.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued row has been written; returns ``False`` on timeout."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop accepting queued writes and drain the backlog."""
+
+        with self._idle:
+            if self._closed:
+                return
+            self._closed = True
+            # Rows already being queued must land before the final drain
+            self._idle.wait_for(lambda: self._submitting == 0, timeout)
+            thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=self.put_timeout_seconds)
+        except queue.Full:
+            # The worker notices the flag after its current batch
+            self._stopping.set()
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error("Query writer did not drain within %.1fs; %d rows pending", timeout, self.pending)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-writer", daemon=True)
+                self._thread.start()
+                # Covers processes that exit without running the app lifespan
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=_STOP_POLL_SECONDS)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+            if item is _STOP:
+                self._queue.task_done()
+                break
+
+            batch: List[Dict[str, Any]] = [item]
+            deadline = time.monotonic() + self.flush_interval_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            stopping = stopping or self._stopping.is_set()
+
+        # Anything queued behind the stop marker still gets written
+        leftovers = []
+        while True:
+            try:
+                leftovers.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        rows = [row for row in leftovers if row is not _STOP]
+        for start in range(0, len(rows), self.batch_size):
+            self._write(rows[start : start + self.batch_size])
+        for _ in leftovers:
+            self._queue.task_done()
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        for attempt in range(1, self.max_retries + 1):
+            session = self.session_factory()
+            try:
+                session.execute(insert(MedicalQuery), rows)
+                session.commit()
+                QUERY_WRITER_ROWS.labels("written").inc(len(rows))
+                QUERY_WRITER_BATCH_SIZE.observe(len(rows))
+                return
+            except Exception as exc:  # pragma: no cover - defensive logging
+                session.rollback()
+                logger.warning("Bulk insert of %d rows failed (attempt %d): %s", len(rows), attempt, exc)
+                time.sleep(min(0.1 * 2**attempt, 2.0))
+            finally:
+                session.close()
+
+        QUERY_WRITER_ROWS.labels("dropped").inc(len(rows))
+        logger.error("Failed to persist %d medical queries", len(rows))
@@ -1,11 +1,16 @@
-import asyncio
 import hashlib
 import json
 import logging
 from typing import Any, Dict, Optional
 
 from app.config import get_settings
-from tavily import TavilyClient
+from app.services.context_builder import ContextBuilder
+from app.services.provider_tape import TapedSearchClient, get_provider_tape
+from app.utils.cache import L1Cache
+from app.utils.circuit_breaker import (CircuitBreakingRedis, CircuitOpenError,
+                                       get_circuit_breaker)
+from app.utils.lazy import lazy_imports
+from app.utils.singleflight import SingleFlight
 
 try:
     import redis.asyncio as redis
@@ -14,28 +19,65 @@ except ImportError:  # pragma: no cover - redis is in requirements but keep defe
 
 logger = logging.getLogger(__name__)
 
+# httpx loads with the first search service, not whenever this module is imported
+__getattr__ = _lazy = lazy_imports(globals(), {"AsyncTavilyClient": ("app.services.tavily_client", "AsyncTavilyClient")})
+
 
 class MedicalSearchService:
     """Proxy around Tavily that enriches prompts with trusted medical sources."""
 
     def __init__(self) -> None:
         self.settings = get_settings()
-        self.client = TavilyClient(api_key=self.settings.TAVILY_API_KEY)
+        self.client = _lazy("AsyncTavilyClient")(
+            api_key=self.settings.TAVILY_API_KEY,
+            base_url=self.settings.TAVILY_BASE_URL,
+            timeout_seconds=self.settings.TAVILY_TIMEOUT_SECONDS,
+            connect_timeout_seconds=self.settings.TAVILY_CONNECT_TIMEOUT_SECONDS,
+            max_connections=self.settings.TAVILY_MAX_CONNECTIONS,
+            max_keepalive_connections=self.settings.TAVILY_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry_seconds=self.settings.TAVILY_KEEPALIVE_EXPIRY_SECONDS,
+            http2=self.settings.TAVILY_HTTP2,
+        )
+        tape = get_provider_tape(self.settings)
+        if tape is not None:
+            self.client = TapedSearchClient(self.client, tape)
+        self._tavily_breaker = get_circuit_breaker("tavily", self.settings)
         self._redis = self._create_redis_client()
+        self._l1 = L1Cache(
+            "search",
+            max_bytes=self.settings.L1_CACHE_MAX_BYTES,
+            ttl_seconds=min(self.settings.L1_CACHE_TTL_SECONDS, self.settings.CACHE_TTL_SECONDS),
+        )
+        self._single_flight = SingleFlight(
+            redis_client=self._redis if self.settings.SINGLE_FLIGHT_REDIS_LOCK else None,
+            lock_ttl_seconds=self.settings.SINGLE_FLIGHT_LOCK_TTL_SECONDS,
+            poll_interval_seconds=self.settings.SINGLE_FLIGHT_POLL_INTERVAL_SECONDS,
+        )
+        self.context_builder = ContextBuilder(
+            token_budgets=self.settings.SEARCH_CONTEXT_TOKEN_BUDGETS,
+            dedup_threshold=self.settings.SEARCH_CONTEXT_DEDUP_THRESHOLD,
+        )
 
     def _create_redis_client(self) -> Optional[Any]:
         if not redis:
             logger.warning("redis-py not available; disabling caching.")
             return None
         try:
-            return redis.from_url(self.settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+            client = redis.from_url(self.settings.REDIS_URL, encoding="utf-8", decode_responses=True)
         except Exception as exc:  # pragma: no cover - only hit when Redis down
             logger.error("Unable to connect to Redis: %s", exc)
             return None
+        return CircuitBreakingRedis(client, get_circuit_breaker("redis", self.settings))
+
+    async def search_medical_info(
+        self, query: str, max_results: int = None, mode: str = "quick"
+    ) -> Dict[str, object]:
+        """Search for medical context, falling back gracefully on errors.
+
+        Results are cached per query without a context; the prompt context is
+        cut from them for ``mode``'s token budget once per call.
+        """
 
-    async def search_medical_info(self, query: str, max_results: int = None) -> Dict[str, object]:
-        """Search for medical context, falling back gracefully on errors."""
-        
         # Use config default if not specified
         if max_results is None:
             max_results = self.settings.MAX_SEARCH_RESULTS
@@ -44,12 +86,20 @@ class MedicalSearchService:
         cached = await self._fetch_cache(cache_key)
         if cached:
             logger.debug("Returning cached search results for query: %s", query)
-            return cached
+            return self._with_context(cached, query, mode)
+
+        # Identical concurrent misses share one Tavily call
+        payload = await self._single_flight.do(
+            cache_key,
+            lambda: self._search_uncached(cache_key, query, max_results),
+            fetch_shared=lambda: self._fetch_cache(cache_key),
+        )
+        return self._with_context(payload, query, mode)
 
+    async def _search_uncached(self, cache_key: str, query: str, max_results: int) -> Dict[str, object]:
         medical_query = f"medical information {query}"
         try:
-            response = await asyncio.to_thread(
-                self.client.search,
+            response = await self._tavily_breaker.call(lambda: self.client.search(
                 medical_query,
                 search_depth=self.settings.SEARCH_DEPTH,  # Use config setting
                 max_results=max_results,
@@ -66,16 +116,23 @@ class MedicalSearchService:
                     "uptodate.com",
                 ],
                 exclude_domains=["wikipedia.org"],
-            )
+            ))
         except Exception as exc:  # pragma: no cover - external dependency
             logger.error("Tavily search failed: %s", exc)
             return {"results": [], "context": "", "query": query, "error": str(exc)}
 
-        formatted = self._format_search_results(response)
+        # The context depends on the mode, so _with_context builds it for each caller
+        formatted = self._result_payload(response)
         await self._persist_cache(cache_key, formatted)
         return formatted
 
-    def _format_search_results(self, response: Dict[str, object]) -> Dict[str, object]:
+    def _format_search_results(
+        self, response: Dict[str, object], query: Optional[str] = None, mode: str = "quick"
+    ) -> Dict[str, object]:
+        payload = self._result_payload(response)
+        return self._with_context(payload, query or payload["query"], mode)
+
+    def _result_payload(self, response: Dict[str, object]) -> Dict[str, object]:
         results = []
         for result in response.get("results", []):
             results.append(
@@ -87,17 +144,15 @@ class MedicalSearchService:
                 }
             )
 
-        # Increased context length for more detailed medical information
-        snippets = []
-        for formatted in results[:5]:  # Use top 5 results instead of 3
-            content = (formatted.get("content") or "")[:1000]  # Increased from 500 to 1000 chars
-            snippets.append(f"Source: {formatted.get('title')}\n{content}...")
+        return {"results": results, "query": response.get("query", "")}
+
+    def _with_context(self, payload: Dict[str, object], query: str, mode: str) -> Dict[str, object]:
+        if payload.get("error"):
+            return payload
+        return {**payload, "context": self.context_builder.build(query, payload.get("results", []), mode)}
 
-        return {
-            "results": results,
-            "context": "\n\n".join(snippets) if snippets else "No additional context available",
-            "query": response.get("query", ""),
-        }
+    async def aclose(self) -> None:
+        await self.client.aclose()
 
     def _cache_key(self, query: str, max_results: int) -> str:
         payload = json.dumps({"query": query, "max_results": max_results}, sort_keys=True)
@@ -105,20 +160,31 @@ class MedicalSearchService:
         return f"{self.settings.CACHE_NAMESPACE}:search:{digest}"
 
     async def _fetch_cache(self, key: str) -> Optional[Dict[str, object]]:
+        local = self._l1.get(key)
+        if local is not None:
+            return local
         if not self._redis:
             return None
         try:
             cached = await self._redis.get(key)
             if cached:
-                return json.loads(cached)
+                payload = json.loads(cached)
+                self._l1.set(key, payload, size=len(cached))
+                return payload
+        except CircuitOpenError:
+            pass  # Redis is known to be down; skip it without a warning per request
         except Exception as exc:  # pragma: no cover - external service
             logger.warning("Failed to read from Redis cache: %s", exc)
         return None
 
     async def _persist_cache(self, key: str, payload: Dict[str, object]) -> None:
+        serialized = json.dumps(payload)
+        self._l1.set(key, payload, size=len(serialized))
         if not self._redis:
             return
         try:
-            await self._redis.setex(key, self.settings.CACHE_TTL_SECONDS, json.dumps(payload))
+            await self._redis.setex(key, self.settings.CACHE_TTL_SECONDS, serialized)
+        except CircuitOpenError:
+            pass  # Redis is known to be down; skip it without a warning per request
         except Exception as exc:  # pragma: no cover - external service
             logger.warning("Failed to write to Redis cache: %s", exc)
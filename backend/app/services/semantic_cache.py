@@ -0,0 +1,252 @@
+import hashlib
+import re
+import sys
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from prometheus_client import Counter
+
+SEMANTIC_CACHE_LOOKUPS = Counter(
+    "semantic_cache_lookups_total",
+    "Near-duplicate query cache lookups by result",
+    ["result"],
+)
+
+# Function words that do not change what is being asked. Negations and
+# qualifiers ("not", "without", "after", ...) are deliberately kept: in a
+# medical question they flip or narrow the meaning.
+STOPWORDS = frozenset(
+    {
+        "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for", "by",
+        "is", "are", "was", "were", "be", "been", "am", "do", "does", "did",
+        "what", "whats", "which", "who", "how", "why", "when", "where",
+        "i", "me", "my", "we", "our", "you", "your", "it", "its", "this", "that",
+        "these", "those", "there", "can", "could", "would", "should", "will",
+        "please", "tell", "explain", "some", "any", "about", "common", "usual",
+    }
+)
+
+# Queries only match when they carry exactly the same negations, however
+# similar the rest of the wording is.
+NEGATIONS = frozenset({"no", "not", "never", "without", "cant", "cannot", "dont", "doesnt", "wont", "isnt", "nor"})
+
+# Doses, ages and disease types are scoped the same way: "400 mg" never matches
+# "800 mg", "5 year old" never matches "15 year old", "type 1" never "type 2".
+# Units are joined to the number before them; qualifiers to the word after them.
+UNITS = frozenset(
+    {
+        "mg", "mcg", "ug", "g", "kg", "ml", "l", "iu", "unit", "units", "tablet", "tablets", "pill", "puff",
+        "lb", "lbs", "year", "years", "yr", "yrs", "month", "months", "week", "weeks", "day", "days",
+        "hour", "hours", "hr", "hrs", "minute", "minutes", "min", "time", "times", "percent",
+    }
+)
+QUALIFIERS = frozenset({"type", "stage", "grade", "class", "phase", "level", "degree", "trimester"})
+
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'", "ʼ": "'"})
+_NON_WORD = re.compile(r"[^\w\s]+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_query(query: str) -> List[str]:
+    """Casefold, strip punctuation and stopwords, and lightly stem ``query``."""
+
+    text = unicodedata.normalize("NFKC", query or "").translate(_APOSTROPHES).casefold()
+    text = _NON_WORD.sub(" ", text.replace("'", ""))
+    tokens = []
+    for token in text.split():
+        if token in STOPWORDS:
+            continue
+        # Fold simple plurals so "symptom"/"symptoms" match
+        if len(token) > 4 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _specifics(tokens: List[str]) -> set:
+    """Numbers (joined to a following unit) and qualifier/value pairs in ``tokens``."""
+
+    found = set()
+    for index, token in enumerate(tokens):
+        following = tokens[index + 1] if index + 1 < len(tokens) else ""
+        if any(char.isdigit() for char in token):
+            found.add(token + following if following in UNITS else token)
+        elif token in QUALIFIERS and following:
+            found.add(f"{token}:{following}")
+    return found
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _jaccard(left: array, right: array) -> float:
+    a, b = set(left), set(right)
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+@dataclass(frozen=True)
+class SemanticMatch:
+    cache_key: str
+    similarity: float
+
+
+class _Entry:
+    __slots__ = ("scope", "cache_key", "tokens")
+
+    def __init__(self, scope: str, cache_key: str, tokens: array) -> None:
+        self.scope = scope
+        self.cache_key = cache_key
+        self.tokens = tokens
+
+
+class SemanticQueryCache:
+    """Map near-duplicate queries onto an already cached answer, fully offline.
+
+    Queries are normalized into token sets, MinHash-signed and bucketed with LSH
+    banding, so a lookup only compares against a handful of candidates no matter
+    how many entries the index holds. Candidates are confirmed with an exact
+    Jaccard similarity over the stored token hashes and must reach ``threshold``.
+    Matches are scoped to the same mode, the same negation words and the same
+    numbers (with their units) and type/stage qualifiers.
+
+    The index only stores token hashes and a pointer (``cache_key``) into the
+    regular response cache, well under a kilobyte per entry, and forgets the
+    oldest entries past ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_bands: int = 4,
+        rows_per_band: int = 2,
+        max_entries: int = 1_000_000,
+    ) -> None:
+        self.threshold = threshold
+        self.num_bands = num_bands
+        self.rows_per_band = rows_per_band
+        self.max_entries = max_entries
+        num_perm = num_bands * rows_per_band
+        # Fixed seeds keep signatures stable across processes
+        seed = hashlib.sha256(b"mediverse-minhash").digest()
+        self._perms: List[Tuple[int, int]] = []
+        for i in range(num_perm):
+            block = hashlib.sha256(seed + i.to_bytes(4, "big")).digest()
+            a = int.from_bytes(block[:8], "big") % _MERSENNE_PRIME or 1
+            b = int.from_bytes(block[8:16], "big") % _MERSENNE_PRIME
+            self._perms.append((a, b))
+        # Plain dicts keep insertion order, which is all the eviction needs
+        self._entries: Dict[int, _Entry] = {}
+        self._by_cache_key: Dict[str, int] = {}
+        # Most buckets hold a single entry, stored as a bare id to save a list per band
+        self._buckets: Dict[int, Union[int, List[int]]] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, query: str, mode: str) -> Optional[SemanticMatch]:
+        """Return the most similar cached query for ``mode`` above the threshold."""
+
+        scope, tokens = self._scoped_tokens(query, mode)
+        if not tokens:
+            SEMANTIC_CACHE_LOOKUPS.labels("miss").inc()
+            return None
+
+        best: Optional[SemanticMatch] = None
+        seen = set()
+        for bucket in self._band_keys(scope, tokens):
+            members = self._buckets.get(bucket, ())
+            for entry_id in (members,) if isinstance(members, int) else members:
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                entry = self._entries[entry_id]
+                if entry.scope != scope:
+                    continue
+                similarity = _jaccard(tokens, entry.tokens)
+                if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                    best = SemanticMatch(cache_key=entry.cache_key, similarity=similarity)
+
+        SEMANTIC_CACHE_LOOKUPS.labels("hit" if best else "miss").inc()
+        return best
+
+    def add(self, query: str, mode: str, cache_key: str) -> None:
+        """Index ``query`` as answered by the response cached under ``cache_key``."""
+
+        scope, tokens = self._scoped_tokens(query, mode)
+        if not tokens or cache_key in self._by_cache_key:
+            return
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = _Entry(scope, cache_key, tokens)
+        self._by_cache_key[cache_key] = entry_id
+        for bucket in self._band_keys(scope, tokens):
+            members = self._buckets.get(bucket)
+            if members is None:
+                self._buckets[bucket] = entry_id
+            elif isinstance(members, int):
+                self._buckets[bucket] = [members, entry_id]
+            else:
+                members.append(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            oldest_id = next(iter(self._entries))
+            self._remove(oldest_id)
+
+    def invalidate(self, cache_key: str) -> None:
+        """Forget the entry pointing at ``cache_key`` (e.g. after it expired)."""
+
+        entry_id = self._by_cache_key.get(cache_key)
+        if entry_id is not None:
+            self._remove(entry_id)
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        self._by_cache_key.pop(entry.cache_key, None)
+        for bucket in self._band_keys(entry.scope, entry.tokens):
+            members = self._buckets.get(bucket)
+            if members is None:
+                continue
+            if isinstance(members, int):
+                if members == entry_id:
+                    del self._buckets[bucket]
+                continue
+            members.remove(entry_id)
+            if len(members) == 1:
+                self._buckets[bucket] = members[0]
+
+    def _scoped_tokens(self, query: str, mode: str) -> Tuple[str, array]:
+        tokens = normalize_query(query)
+        negations = sorted(NEGATIONS.intersection(tokens))
+        specifics = " ".join(sorted(_specifics(tokens)))
+        scope = sys.intern(f"{mode}|{' '.join(negations)}|{specifics}")
+        return scope, array("Q", sorted({_token_hash(token) for token in tokens}))
+
+    def _signature(self, tokens: Iterable[int]) -> List[int]:
+        tokens = list(tokens)
+        return [
+            min(((a * token + b) % _MERSENNE_PRIME) & _MAX_HASH for token in tokens)
+            for a, b in self._perms
+        ]
+
+    def _band_keys(self, scope: str, tokens: array) -> List[int]:
+        # A digest rather than hash(), which is salted per process for strings
+        signature = self._signature(tokens)
+        rows = self.rows_per_band
+        prefix = scope.encode("utf-8") + b"\0"
+        return [
+            int.from_bytes(
+                hashlib.blake2b(
+                    prefix + band.to_bytes(2, "big") + array("Q", signature[band * rows:(band + 1) * rows]).tobytes(),
+                    digest_size=8,
+                ).digest(),
+                "big",
+            )
+            for band in range(self.num_bands)
+        ]
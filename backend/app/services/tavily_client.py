@@ -0,0 +1,102 @@
+import asyncio
+import importlib.util
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+TAVILY_BASE_URL = "https://api.tavily.com"
+
+
+class AsyncTavilyClient:
+    """Async drop-in for ``TavilyClient.search`` on one shared, pooled ``httpx.AsyncClient``.
+
+    The synchronous SDK posts through ``requests`` without a session, so every
+    search opens a fresh TLS connection, and ``asyncio.to_thread`` parks a
+    default-executor thread for the whole round trip; with a handful of threads
+    concurrent searches queue behind each other. Here searches are plain
+    coroutines sharing keep-alive connections (multiplexed over HTTP/2 when the
+    ``h2`` package is installed), bounded by ``max_connections``.
+
+    The HTTP client is created on first use and re-created if the event loop
+    changes, since pooled connections belong to the loop that opened them.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = TAVILY_BASE_URL,
+        timeout_seconds: float = 15.0,
+        connect_timeout_seconds: float = 3.0,
+        max_connections: int = 50,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry_seconds: float = 30.0,
+        http2: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry_seconds,
+        )
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested for Tavily but the h2 package is missing; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def search(
+        self,
+        query: str,
+        search_depth: str = "basic",
+        max_results: int = 5,
+        include_domains: Optional[List[str]] = None,
+        exclude_domains: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Run a search; ``timeout`` overrides the client's total timeout for this call.
+
+        Raises ``httpx.HTTPError`` on transport errors, timeouts and non-2xx responses.
+        """
+
+        payload = {
+            "api_key": self.api_key,
+            "query": query,
+            "search_depth": search_depth,
+            "max_results": max_results,
+            "include_domains": include_domains or None,
+            "exclude_domains": exclude_domains or None,
+            **kwargs,
+        }
+        request_timeout = self.timeout if timeout is None else httpx.Timeout(timeout, connect=self.timeout.connect)
+        response = await self._get_client().post("/search", json=payload, timeout=request_timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # Connections from a previous loop cannot be reused; drop them unclosed
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self._transport,
+                headers={"Content-Type": "application/json"},
+            )
+            self._loop = loop
+        return self._client
@@ -0,0 +1,174 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional
+
+from prometheus_client import Counter, Gauge
+
+L1_CACHE_REQUESTS = Counter(
+    "l1_cache_requests_total",
+    "In-process cache lookups by result",
+    ["cache", "result"],
+)
+L1_CACHE_EVICTIONS = Counter(
+    "l1_cache_evictions_total",
+    "In-process cache entries evicted to stay under the memory ceiling",
+    ["cache"],
+)
+L1_CACHE_BYTES = Gauge(
+    "l1_cache_bytes",
+    "Approximate payload bytes held by the in-process cache",
+    ["cache"],
+)
+
+
+class FrequencySketch:
+    """Count-min sketch of recent key popularity with periodic aging (TinyLFU)."""
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, width: int = 4096) -> None:
+        # Power-of-two width so the top bits of a 64-bit product form an index
+        bits = max(4, (width - 1).bit_length())
+        self.width = 1 << bits
+        self._shift = 64 - bits
+        self._rows = [[0] * self.width for _ in range(self.DEPTH)]
+        # Odd multipliers; the top bits of each product index an independent row
+        self._seeds = [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93]
+        self._additions = 0
+        self._reset_at = self.width * 10
+
+    def _indexes(self, key: Hashable):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        for seed in self._seeds:
+            yield ((h * seed) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+
+    def increment(self, key: Hashable) -> None:
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < self.MAX_COUNT:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self._reset_at:
+            self._age()
+
+    def frequency(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def _age(self) -> None:
+        # Halve every counter so popularity reflects recent traffic
+        for row in self._rows:
+            for i, value in enumerate(row):
+                row[i] = value >> 1
+        self._additions //= 2
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+
+
+class L1Cache:
+    """Bounded in-process cache that sits in front of Redis.
+
+    Entries expire after a TTL and the cache keeps its total (approximate) payload
+    size under ``max_bytes``. Eviction is LRU, guarded by a TinyLFU admission
+    filter: a new entry only displaces the LRU victim if it has been requested
+    more often recently, so one-off queries cannot flush hot answers.
+
+    Values are returned by reference and must be treated as read-only. The cache
+    is not thread-safe; it is meant to be used from the event loop. A
+    ``max_bytes`` of 0 disables it.
+    """
+
+    def __init__(self, name: str, max_bytes: int, ttl_seconds: float) -> None:
+        self.name = name
+        self.max_bytes = max(0, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._sketch = FrequencySketch(width=max(16, self.max_bytes // 2048))
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.max_bytes:
+            return None
+
+        self._sketch.increment(key)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            L1_CACHE_REQUESTS.labels(self.name, "miss").inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        L1_CACHE_REQUESTS.labels(self.name, "hit").inc()
+        return entry.value
+
+    def set(self, key: str, value: Any, size: int, ttl_seconds: Optional[float] = None) -> bool:
+        """Store ``value`` (``size`` approximate bytes); return False if not admitted."""
+
+        if size > self.max_bytes:
+            self.rejections += 1
+            return False
+
+        if key in self._entries:
+            self._remove(key)
+
+        while self.current_bytes + size > self.max_bytes:
+            victim_key = next(iter(self._entries))
+            victim = self._entries[victim_key]
+            if victim.expires_at > time.monotonic() and (
+                self._sketch.frequency(key) <= self._sketch.frequency(victim_key)
+            ):
+                self.rejections += 1
+                return False
+            self._remove(victim_key)
+            self.evictions += 1
+            L1_CACHE_EVICTIONS.labels(self.name).inc()
+
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = _Entry(value=value, size=size, expires_at=time.monotonic() + ttl)
+        self.current_bytes += size
+        L1_CACHE_BYTES.labels(self.name).set(self.current_bytes)
+        return True
+
+    def delete(self, key: str) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+        L1_CACHE_BYTES.labels(self.name).set(0)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+        L1_CACHE_BYTES.labels(self.name).set(self.current_bytes)
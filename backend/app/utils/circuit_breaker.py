@@ -0,0 +1,356 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from app.utils.deadline import DeadlineExceeded, current_deadline
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit state per upstream dependency (0 closed, 1 half-open, 2 open)",
+    ["dependency"],
+)
+CIRCUIT_CALLS = Counter(
+    "circuit_breaker_calls_total",
+    "Upstream calls through a circuit breaker, by outcome",
+    ["dependency", "outcome"],
+)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Redis commands the services issue; anything else passes straight through
+_REDIS_COMMANDS = frozenset(
+    {"get", "set", "setex", "delete", "exists", "expire", "pexpire", "eval", "evalsha", "hget", "hset", "hmget", "ping"}
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+    def __init__(self, dependency: str, retry_after: float) -> None:
+        super().__init__(f"{dependency} is unavailable (circuit open, retry in {retry_after:.1f}s)")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fail fast on an upstream dependency that keeps failing.
+
+    Outcomes of the last ``window_seconds`` are kept in a rolling window. Once at
+    least ``min_calls`` are recorded and ``failure_rate`` of them failed (errors
+    and timeouts alike), the circuit opens and calls are rejected immediately with
+    ``CircuitOpenError``. After ``open_seconds`` it turns half-open and lets
+    ``half_open_max_calls`` probes through: a successful probe closes it again,
+    a failed one reopens it.
+
+    ``timeout()`` adapts each call's time limit to the dependency: the
+    ``timeout_quantile`` of recent successful latencies times
+    ``timeout_multiplier``, clamped to ``[min_timeout, max_timeout]`` (and
+    ``max_timeout`` until ``min_latency_samples`` are seen).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 10,
+        window_seconds: float = 30.0,
+        open_seconds: float = 15.0,
+        half_open_max_calls: int = 1,
+        timeout_quantile: float = 0.99,
+        timeout_multiplier: float = 3.0,
+        min_timeout: float = 0.05,
+        max_timeout: float = 30.0,
+        latency_window: int = 200,
+        min_latency_samples: int = 20,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.timeout_quantile = timeout_quantile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_latency_samples = min_latency_samples
+        self.enabled = enabled
+        self._clock = clock
+        self._outcomes: "deque[tuple]" = deque()  # (timestamp, failed)
+        self._failures = 0
+        self._latencies: "deque[float]" = deque(maxlen=latency_window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        CIRCUIT_STATE.labels(name).set(0)
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being rejected without a probe."""
+
+        return self.enabled and self.state == OPEN
+
+    def retry_after(self) -> float:
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+
+    def timeout(self) -> float:
+        if len(self._latencies) < self.min_latency_samples:
+            return self.max_timeout
+        ordered = sorted(self._latencies)
+        observed = ordered[min(len(ordered) - 1, int(self.timeout_quantile * len(ordered)))]
+        return min(self.max_timeout, max(self.min_timeout, observed * self.timeout_multiplier))
+
+    def allow(self) -> bool:
+        """Claim permission for one call; every ``True`` must be followed by a
+        ``record_success``, ``record_failure`` or ``release``."""
+
+        if not self.enabled:
+            return True
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        CIRCUIT_CALLS.labels(self.name, "rejected").inc()
+        return False
+
+    def record_success(self, seconds: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        CIRCUIT_CALLS.labels(self.name, "success").inc()
+        if seconds is not None:
+            self._latencies.append(seconds)
+        if self._state == HALF_OPEN:
+            self._transition(CLOSED)
+            return
+        self._add_outcome(False)
+
+    def record_failure(self, outcome: str = "failure") -> None:
+        if not self.enabled:
+            return
+        CIRCUIT_CALLS.labels(self.name, outcome).inc()
+        if self._state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        if self._state == OPEN:
+            return
+        self._add_outcome(True)
+        calls = len(self._outcomes)
+        if calls >= self.min_calls and self._failures >= self.failure_rate * calls:
+            self._transition(OPEN)
+
+    def release(self) -> None:
+        """Give back a permit whose call ended without an outcome (e.g. cancelled)."""
+
+        if self._state == HALF_OPEN and self._probes:
+            self._probes -= 1
+
+    async def call(self, fn: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """Await ``fn()`` within the adaptive (or given) timeout, unless the circuit is open.
+
+        The timeout is further capped by the current request deadline; running
+        out of that raises ``DeadlineExceeded`` and says nothing about the
+        dependency's health, so it is not counted as a failure.
+        """
+
+        limit, by_deadline = self._limit(timeout)
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+        started = self._clock()
+        try:
+            try:
+                result = await asyncio.wait_for(fn(), limit)
+            except asyncio.TimeoutError:
+                if by_deadline:
+                    raise DeadlineExceeded(f"request deadline reached while calling {self.name}") from None
+                raise
+        except DeadlineExceeded:
+            self._cut_by_deadline()
+            raise
+        except asyncio.TimeoutError:
+            self.record_failure("timeout")
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success(self._clock() - started)
+        return result
+
+    async def stream(self, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Iterate ``factory()`` under the breaker.
+
+        The adaptive timeout (capped by the request deadline) bounds the wait
+        for each chunk rather than the whole stream; a stream that is closed or
+        cancelled early records no outcome.
+        """
+
+        self._limit(None)  # no permit is taken when the deadline has already passed
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+        started = self._clock()
+        chunks = factory()
+        try:
+            while True:
+                limit, by_deadline = self._limit(None)
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), limit)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    if by_deadline:
+                        raise DeadlineExceeded(f"request deadline reached while streaming from {self.name}") from None
+                    raise
+                yield chunk
+        except DeadlineExceeded:
+            self._cut_by_deadline()
+            raise
+        except asyncio.TimeoutError:
+            self.record_failure("timeout")
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        self.record_success(self._clock() - started)
+
+    def _limit(self, timeout: Optional[float]) -> Tuple[Optional[float], bool]:
+        """Time allowed for the next call or chunk, and whether the request deadline set it."""
+
+        limit = timeout if timeout is not None else (self.timeout() if self.enabled else None)
+        deadline = current_deadline()
+        if deadline is None:
+            return limit, False
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            CIRCUIT_CALLS.labels(self.name, "deadline").inc()
+            raise DeadlineExceeded(f"request deadline reached before calling {self.name}")
+        if limit is None or remaining < limit:
+            return remaining, True
+        return limit, False
+
+    def _cut_by_deadline(self) -> None:
+        CIRCUIT_CALLS.labels(self.name, "deadline").inc()
+        self.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"state": self.state, "timeout_seconds": round(self.timeout(), 3)}
+
+    def _add_outcome(self, failed: bool) -> None:
+        now = self._clock()
+        self._outcomes.append((now, failed))
+        self._failures += failed
+        horizon = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < horizon:
+            self._failures -= self._outcomes.popleft()[1]
+
+    def _transition(self, state: str) -> None:
+        if state == OPEN:
+            self._opened_at = self._clock()
+            logger.warning("Circuit for %s opened for %.0fs", self.name, self.open_seconds)
+        elif state == CLOSED:
+            logger.info("Circuit for %s closed", self.name)
+        self._state = state
+        self._probes = 0
+        self._outcomes.clear()
+        self._failures = 0
+        CIRCUIT_STATE.labels(self.name).set(_STATE_VALUES[state])
+
+
+class CircuitBreakingRedis:
+    """Route a redis.asyncio client's commands through a circuit breaker.
+
+    Commands fail with ``CircuitOpenError`` instantly while the circuit is open,
+    which the callers' existing ``except Exception`` fallbacks already handle.
+    """
+
+    def __init__(self, client: Any, breaker: CircuitBreaker) -> None:
+        self._client = client
+        self.breaker = breaker
+
+    def register_script(self, script: str) -> Callable[..., Awaitable[Any]]:
+        inner = self._client.register_script(script)
+
+        async def run(keys: Any = None, args: Any = None, client: Any = None) -> Any:
+            return await self.breaker.call(lambda: inner(keys=keys, args=args, client=client))
+
+        return run
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name not in _REDIS_COMMANDS:
+            return attr
+
+        async def command(*args: Any, **kwargs: Any) -> Any:
+            return await self.breaker.call(lambda: attr(*args, **kwargs))
+
+        return command
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str, settings: Any = None) -> CircuitBreaker:
+    """Return the process-wide breaker for dependency ``name``, creating it on first use."""
+
+    breaker = _BREAKERS.get(name)
+    if breaker is not None:
+        return breaker
+    if settings is None:
+        from app.config import get_settings
+
+        settings = get_settings()
+    min_timeout, max_timeout = settings.UPSTREAM_TIMEOUT_BOUNDS.get(name, (0.05, 30.0))
+    breaker = CircuitBreaker(
+        name,
+        failure_rate=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+        min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+        window_seconds=settings.CIRCUIT_BREAKER_WINDOW_SECONDS,
+        open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+        timeout_quantile=settings.UPSTREAM_TIMEOUT_QUANTILE,
+        timeout_multiplier=settings.UPSTREAM_TIMEOUT_MULTIPLIER,
+        min_timeout=min_timeout,
+        max_timeout=max_timeout,
+        enabled=settings.CIRCUIT_BREAKER_ENABLED,
+    )
+    _BREAKERS[name] = breaker
+    return breaker
+
+
+def circuit_states() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.snapshot() for name, breaker in sorted(_BREAKERS.items())}
+
+
+def reset_circuit_breakers() -> None:
+    """Forget every breaker (tests, or after reconfiguring settings)."""
+
+    _BREAKERS.clear()
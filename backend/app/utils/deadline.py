@@ -0,0 +1,53 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+# Deadline of the request being handled; upstream calls cap their timeouts by it
+deadline_var: ContextVar[Optional["Deadline"]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before an upstream call could finish."""
+
+
+class Deadline:
+    """A fixed point in time by which the current request must be answered."""
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.seconds = seconds
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cap(self, timeout: Optional[float]) -> float:
+        """``timeout`` shortened to what is left of the deadline."""
+
+        remaining = self.remaining()
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return deadline_var.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Make ``deadline`` the current one for the code (and tasks) started inside."""
+
+    token = deadline_var.set(deadline)
+    try:
+        yield deadline
+    finally:
+        try:
+            deadline_var.reset(token)
+        except ValueError:
+            # A streaming generator finalized from another task; the context
+            # that holds the deadline is discarded along with the request
+            pass
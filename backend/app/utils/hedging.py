@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+HEDGE_DECISIONS = Counter(
+    "llm_hedge_decisions_total",
+    "Requests whose primary was slower than the hedge delay, by whether a hedge was fired",
+    ["outcome"],
+)
+HEDGE_WINNERS = Counter(
+    "llm_hedge_winner_total",
+    "Provider that produced the first token of a hedged request",
+    ["provider"],
+)
+FIRST_TOKEN_SECONDS = Histogram(
+    "llm_first_token_seconds",
+    "Time from starting a generation until its first token, by provider",
+    ["provider"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0),
+)
+
+StreamFactory = Callable[[], AsyncIterator[Any]]
+
+_EXHAUSTED = object()
+
+
+class Hedger:
+    """Race a backup generation against a slow primary, first token wins.
+
+    The primary stream starts immediately. If it has not produced its first
+    chunk after the hedge delay, the same request is started on the secondary;
+    whichever yields a chunk first is returned and the other is cancelled.
+
+    The delay is the ``quantile`` of recently observed primary first-token
+    latencies (clamped to ``[min_delay, max_delay]``; ``max_delay`` until
+    ``min_samples`` are seen), unless a fixed ``delay`` is configured. Hedges
+    draw on a budget that grows by ``max_ratio`` per request, so at most that
+    share of requests hits the secondary even when the primary is slow across
+    the board.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        delay: Optional[float] = None,
+        min_delay: float = 0.5,
+        max_delay: float = 10.0,
+        max_ratio: float = 0.1,
+        window: int = 500,
+        min_samples: int = 20,
+    ) -> None:
+        self.quantile = quantile
+        self.fixed_delay = delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self._latencies: "deque[float]" = deque(maxlen=window)
+        self._budget = 1.0
+        # Room for a burst of slow requests arriving together
+        self._budget_cap = max(1.0, max_ratio * 100)
+
+    def delay(self) -> float:
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        if len(self._latencies) < self.min_samples:
+            return self.max_delay
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.quantile * len(ordered)))
+        return min(self.max_delay, max(self.min_delay, ordered[index]))
+
+    def observe(self, seconds: float) -> None:
+        """Record a primary first-token latency."""
+
+        self._latencies.append(seconds)
+
+    async def race(
+        self,
+        primary: StreamFactory,
+        secondary: StreamFactory,
+        primary_name: str = "primary",
+        secondary_name: str = "secondary",
+    ) -> Tuple[str, AsyncIterator[Any]]:
+        """Return the winning provider's name and its full stream of chunks.
+
+        Errors from the primary before the hedge fires are raised unchanged; once
+        both are running, a failure of one leaves the other to finish, and only
+        if both fail is the primary's error raised.
+        """
+
+        self._budget = min(self._budget_cap, self._budget + self.max_ratio)
+        started = time.monotonic()
+        primary_stream = primary()
+        primary_first = asyncio.ensure_future(_first_chunk(primary_stream))
+        try:
+            done, _ = await asyncio.wait({primary_first}, timeout=self.delay())
+            if not done and self._budget < 1:
+                HEDGE_DECISIONS.labels("budget_exhausted").inc()
+                await asyncio.wait({primary_first})
+                done = {primary_first}
+        except BaseException:
+            await _discard(primary_first, primary_stream)
+            raise
+
+        if done:
+            first = primary_first.result()
+            elapsed = time.monotonic() - started
+            self.observe(elapsed)
+            FIRST_TOKEN_SECONDS.labels(primary_name).observe(elapsed)
+            return primary_name, _resume(first, primary_stream)
+
+        self._budget -= 1
+        HEDGE_DECISIONS.labels("fired").inc()
+        secondary_stream = secondary()
+        secondary_first = asyncio.ensure_future(_first_chunk(secondary_stream))
+        contenders = {
+            primary_first: (primary_name, primary_stream),
+            secondary_first: (secondary_name, secondary_stream),
+        }
+        pending = set(contenders)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    # Prefer the primary if both arrived in the same tick
+                    winner = primary_first if primary_first in winners else winners[0]
+                    break
+            else:
+                raise primary_first.exception()
+        except BaseException:
+            for task, (_, stream) in contenders.items():
+                await _discard(task, stream)
+            raise
+
+        for task, (_, stream) in contenders.items():
+            if task is not winner:
+                await _discard(task, stream)
+
+        name, stream = contenders[winner]
+        elapsed = time.monotonic() - started
+        # When the backup wins this is only a lower bound for the primary, but
+        # dropping it would bias the quantile towards the fast requests
+        self.observe(elapsed)
+        HEDGE_WINNERS.labels(name).inc()
+        FIRST_TOKEN_SECONDS.labels(name).observe(elapsed)
+        logger.debug("Hedged request won by %s after %.2fs", name, elapsed)
+        return name, _resume(winner.result(), stream)
+
+
+async def _first_chunk(stream: AsyncIterator[Any]) -> Any:
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return _EXHAUSTED
+
+
+async def _resume(first: Any, stream: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    if first is _EXHAUSTED:
+        return
+    yield first
+    async for chunk in stream:
+        yield chunk
+
+
+async def _discard(task: "asyncio.Future[Any]", stream: AsyncIterator[Any]) -> None:
+    task.cancel()
+    await asyncio.wait({task})
+    if not task.cancelled():
+        task.exception()  # the loser's own error is expected; mark it retrieved
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.debug("Closing a cancelled LLM stream failed: %s", exc)
@@ -0,0 +1,75 @@
+import importlib
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+
+def lazy_imports(namespace: Dict[str, Any], names: Dict[str, Tuple[str, str]]) -> Callable[[str], Any]:
+    """Defer heavy imports until a name is first used.
+
+    ``names`` maps a module-level name to ``(module, attribute)``. Returns a
+    loader for use as the module's PEP 562 ``__getattr__``, which code inside
+    the module also calls to resolve a name; each import happens once and the
+    result is cached in ``namespace`` (so monkeypatching the name still works).
+    """
+
+    def load(name: str) -> Any:
+        if name in namespace:
+            return namespace[name]
+        try:
+            module, attribute = names[name]
+        except KeyError:
+            raise AttributeError(f"module {namespace.get('__name__')!r} has no attribute {name!r}") from None
+        value = getattr(importlib.import_module(module), attribute)
+        namespace[name] = value
+        return value
+
+    return load
+
+
+class LazyObject:
+    """Stand-in for an object that is only built on first use.
+
+    Attribute reads and writes go to the object ``factory()`` returns, which is
+    created once, under a lock, the first time anything touches the stand-in.
+    """
+
+    __slots__ = ("_factory", "_instance", "_lock")
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(resolve(self), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(resolve(self), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(resolve(self), name)
+
+    def __repr__(self) -> str:
+        instance = object.__getattribute__(self, "_instance")
+        return f"<LazyObject {instance!r}>" if instance is not None else "<LazyObject (not built)>"
+
+
+def resolve(lazy: Any) -> Any:
+    """The object behind ``lazy``, building it if needed (other objects are returned as is)."""
+
+    if not isinstance(lazy, LazyObject):
+        return lazy
+    instance = object.__getattribute__(lazy, "_instance")
+    if instance is None:
+        with object.__getattribute__(lazy, "_lock"):
+            instance = object.__getattribute__(lazy, "_instance")
+            if instance is None:
+                instance = object.__getattribute__(lazy, "_factory")()
+                object.__setattr__(lazy, "_instance", instance)
+    return instance
+
+
+def is_built(lazy: Any) -> bool:
+    """Whether ``lazy``'s object exists yet; for shutdown code that should not build it."""
+
+    return not isinstance(lazy, LazyObject) or object.__getattribute__(lazy, "_instance") is not None
@@ -1,8 +1,18 @@
 import logging
+from contextvars import ContextVar
 from logging.config import dictConfig
 
 from app.config import get_settings
 
+# Set per request by RequestIDMiddleware; "-" outside of a request
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+class RequestIDFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
 
 def setup_logging() -> None:
     settings = get_settings()
@@ -14,13 +24,17 @@ def setup_logging() -> None:
             "disable_existing_loggers": False,
             "formatters": {
                 "default": {
-                    "format": "%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+                    "format": "%(asctime)s [%(levelname)s] [%(request_id)s] %(name)s - %(message)s",
                 }
             },
+            "filters": {
+                "request_id": {"()": RequestIDFilter},
+            },
             "handlers": {
                 "console": {
                     "class": "logging.StreamHandler",
                     "formatter": "default",
+                    "filters": ["request_id"],
                     "level": level,
                 }
             },
@@ -0,0 +1,203 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from app.utils.circuit_breaker import CircuitBreakingRedis, get_circuit_breaker
+from prometheus_client import Counter
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total",
+    "Rate limiter decisions by backend and outcome",
+    ["backend", "outcome"],
+)
+
+# Refill, check and debit one bucket atomically on the Redis server. Uses the
+# server clock so every worker agrees on elapsed time.
+# KEYS[1] bucket hash; ARGV: rate per second, burst, cost, idle ttl (ms)
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    remaining: float
+    retry_after: float  # seconds until ``cost`` tokens are available; 0 when allowed
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucketLimiter:
+    """In-process token buckets keyed by client, with idle-key eviction.
+
+    Each key holds up to ``burst`` tokens and regains ``rate_per_second`` of them
+    continuously; a request of weight ``cost`` passes if that many tokens are
+    available. ``acquire`` never awaits, so on the event loop every check-and-debit
+    is atomic without a lock, and requests for different clients never contend.
+
+    Buckets are kept in least-recently-used order: each call evicts buckets idle
+    for longer than ``idle_ttl_seconds`` (by then they would be full again, so
+    forgetting them changes nothing) and the table never exceeds ``max_keys``.
+    """
+
+    backend = "memory"
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        burst: float,
+        idle_ttl_seconds: float = 600.0,
+        max_keys: int = 100_000,
+    ) -> None:
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.idle_ttl_seconds = max(idle_ttl_seconds, burst / rate_per_second)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._allowed = RATE_LIMIT_DECISIONS.labels(self.backend, "allowed")
+        self._limited = RATE_LIMIT_DECISIONS.labels(self.backend, "limited")
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def acquire(self, key: str, cost: float = 1.0) -> RateLimitResult:
+        return self.try_acquire(key, cost)
+
+    def try_acquire(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> RateLimitResult:
+        now = time.monotonic() if now is None else now
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = [self.burst, now]
+            self._evict(now)
+        else:
+            buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_second)
+            bucket[1] = now
+
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            self._allowed.inc()
+            return RateLimitResult(True, bucket[0], 0.0)
+
+        self._limited.inc()
+        return RateLimitResult(False, bucket[0], (cost - bucket[0]) / self.rate_per_second)
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+        # Oldest first, so stop at the first bucket that is still active
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if now - oldest[1] <= self.idle_ttl_seconds:
+                break
+            buckets.popitem(last=False)
+
+
+class RedisTokenBucketLimiter:
+    """Token buckets shared by every worker through Redis.
+
+    One ``EVALSHA`` per request refills, checks and debits the bucket atomically,
+    so N workers together enforce the configured rate rather than N times it.
+    Buckets expire on their own once idle. If Redis is unreachable, decisions fall
+    back to a per-process ``TokenBucketLimiter`` instead of failing requests.
+    """
+
+    backend = "redis"
+
+    def __init__(
+        self,
+        redis_client: Any,
+        rate_per_second: float,
+        burst: float,
+        idle_ttl_seconds: float = 600.0,
+        namespace: str = "medical_ai",
+        fallback: Optional[TokenBucketLimiter] = None,
+    ) -> None:
+        self._redis = redis_client
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.idle_ttl_ms = int(max(idle_ttl_seconds, burst / rate_per_second) * 1000)
+        self._namespace = namespace
+        self._script = redis_client.register_script(_TOKEN_BUCKET_SCRIPT)
+        if fallback is None:
+            fallback = TokenBucketLimiter(rate_per_second, burst, idle_ttl_seconds)
+        self._fallback = fallback
+
+    async def acquire(self, key: str, cost: float = 1.0) -> RateLimitResult:
+        try:
+            allowed, remaining, retry_after = await self._script(
+                keys=[f"{self._namespace}:ratelimit:{key}"],
+                args=[self.rate_per_second, self.burst, cost, self.idle_ttl_ms],
+            )
+        except Exception as exc:  # pragma: no cover - external service
+            logger.debug("Redis rate limit check failed, using local buckets: %s", exc)
+            return self._fallback.try_acquire(key, cost)
+
+        RATE_LIMIT_DECISIONS.labels(self.backend, "allowed" if allowed else "limited").inc()
+        return RateLimitResult(bool(allowed), float(remaining), float(retry_after))
+
+
+def build_rate_limiter(settings: Any):
+    """Create the limiter selected by ``RATE_LIMIT_BACKEND`` (``memory`` or ``redis``)."""
+
+    rate = settings.RATE_LIMIT_PER_MINUTE / 60.0
+    burst = settings.RATE_LIMIT_BURST or settings.RATE_LIMIT_PER_MINUTE
+    local = TokenBucketLimiter(
+        rate,
+        burst,
+        idle_ttl_seconds=settings.RATE_LIMIT_IDLE_TTL_SECONDS,
+        max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    )
+    if settings.RATE_LIMIT_BACKEND != "redis" or not redis:
+        return local
+
+    try:
+        client = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+    except Exception as exc:  # pragma: no cover
+        logger.warning("Could not initialize Redis for rate limiting: %s", exc)
+        return local
+    return RedisTokenBucketLimiter(
+        CircuitBreakingRedis(client, get_circuit_breaker("redis", settings)),
+        rate,
+        burst,
+        idle_ttl_seconds=settings.RATE_LIMIT_IDLE_TTL_SECONDS,
+        namespace=settings.CACHE_NAMESPACE,
+        fallback=local,
+    )
@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.utils.deadline import DeadlineExceeded, current_deadline, deadline_var
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Delete the lock only if we still own it, so a slow leader cannot release a
+# lock that already expired and was taken over by another worker.
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _without_deadline() -> contextvars.Context:
+    context = contextvars.copy_context()
+    context.run(deadline_var.set, None)
+    return context
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single upstream call.
+
+    Within a process, the first caller for a key (the leader) starts the upstream
+    call as a task and every concurrent caller with the same key awaits that task.
+    The task is shielded, so a leader whose client disconnects does not cancel the
+    work its followers are waiting on.
+
+    The shared task runs without a request deadline, since it belongs to no single
+    caller; each caller instead stops waiting when its own deadline passes, so one
+    client's short ``X-Request-Timeout`` never fails the others.
+
+    When a Redis client is supplied, the leader also takes a short-lived Redis lock
+    so that other workers wait for the shared cache entry (via ``fetch_shared``)
+    instead of issuing their own upstream call.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[Any] = None,
+        lock_ttl_seconds: float = 30.0,
+        poll_interval_seconds: float = 0.1,
+    ) -> None:
+        self._redis = redis_client
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        fetch_shared: Optional[Callable[[], Awaitable[Optional[T]]]] = None,
+    ) -> T:
+        """Return ``fn()``'s result, sharing one in-flight call per ``key``."""
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._lead(key, fn, fetch_shared), context=_without_deadline())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        deadline = current_deadline()
+        if deadline is None:
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline.remaining())
+        except asyncio.TimeoutError:
+            if task.done():
+                raise  # the shared call itself timed out
+            raise DeadlineExceeded(f"request deadline reached while waiting for {key}") from None
+
+    def inflight(self) -> int:
+        """Number of keys with an upstream call currently in flight."""
+
+        return len(self._inflight)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away.
+            task.exception()
+
+    async def _lead(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        fetch_shared: Optional[Callable[[], Awaitable[Optional[T]]]],
+    ) -> T:
+        if not self._redis or fetch_shared is None:
+            return await fn()
+
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self._redis.set(lock_key, token, nx=True, px=int(self.lock_ttl_seconds * 1000))
+        except Exception as exc:  # pragma: no cover - external service
+            logger.debug("Single-flight lock unavailable for %s: %s", key, exc)
+            return await fn()
+
+        if acquired:
+            try:
+                return await fn()
+            finally:
+                await self._release(lock_key, token)
+
+        shared = await self._await_remote_leader(lock_key, fetch_shared)
+        if shared is not None:
+            return shared
+        return await fn()
+
+    async def _await_remote_leader(
+        self,
+        lock_key: str,
+        fetch_shared: Callable[[], Awaitable[Optional[T]]],
+    ) -> Optional[T]:
+        """Poll for another worker's result until its lock is released or expires."""
+
+        deadline = time.monotonic() + self.lock_ttl_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval_seconds)
+            shared = await fetch_shared()
+            if shared is not None:
+                return shared
+            try:
+                if not await self._redis.exists(lock_key):
+                    # The leader finished (or failed) without a shareable result.
+                    return await fetch_shared()
+            except Exception as exc:  # pragma: no cover - external service
+                logger.debug("Single-flight lock check failed for %s: %s", lock_key, exc)
+                return None
+        return None
+
+    async def _release(self, lock_key: str, token: str) -> None:
+        try:
+            await self._redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+        except Exception as exc:  # pragma: no cover - external service
+            logger.debug("Single-flight lock release failed for %s: %s", lock_key, exc)
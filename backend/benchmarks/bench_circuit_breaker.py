@@ -0,0 +1,113 @@
+"""Measure what a Redis outage costs each request, without and with the circuit breaker.
+
+A stand-in Redis client hangs for ``--hang-ms`` on every command and then fails,
+like a socket timeout against an unreachable Redis Cloud endpoint. Each
+simulated request does what a search cache miss does (one ``GET`` that misses,
+one ``SETEX`` after the upstream call) through ``MedicalSearchService``'s
+cache helpers, first against the raw client and then through
+``CircuitBreakingRedis`` with the default breaker settings. The report gives
+the per-request cache overhead and how many commands actually reached Redis.
+
+Usage:
+    python benchmarks/bench_circuit_breaker.py
+    python benchmarks/bench_circuit_breaker.py --requests 500 --hang-ms 1000 --concurrency 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.services.search_service import MedicalSearchService  # noqa: E402  (import after sys.path setup)
+from app.utils.circuit_breaker import CircuitBreaker, CircuitBreakingRedis  # noqa: E402
+
+
+class UnreachableRedis:
+    def __init__(self, hang_seconds: float) -> None:
+        self.hang_seconds = hang_seconds
+        self.commands = 0
+
+    async def _fail(self):
+        self.commands += 1
+        await asyncio.sleep(self.hang_seconds)
+        raise ConnectionError("Timeout reading from socket")
+
+    async def get(self, key: str):
+        await self._fail()
+
+    async def setex(self, key: str, ttl: int, value: str):
+        await self._fail()
+
+
+async def run(service: MedicalSearchService, requests: int, concurrency: int) -> dict:
+    latencies = []
+
+    async def one(i: int) -> None:
+        started = time.perf_counter()
+        key = f"bench:{i}"
+        await service._fetch_cache(key)
+        await service._persist_cache(key, {"results": [], "context": "", "query": key})
+        latencies.append((time.perf_counter() - started) * 1e3)
+
+    for offset in range(0, requests, concurrency):
+        await asyncio.gather(*(one(i) for i in range(offset, min(requests, offset + concurrency))))
+    latencies.sort()
+    return {
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+    }
+
+
+async def main_async(args) -> dict:
+    service = MedicalSearchService()
+    service._l1.get = lambda key: None  # measure the Redis path only
+    hang = args.hang_ms / 1000
+
+    raw = UnreachableRedis(hang)
+    service._redis = raw
+    without = await run(service, args.requests, args.concurrency)
+    without["redis_commands"] = raw.commands
+
+    guarded = UnreachableRedis(hang)
+    breaker = CircuitBreaker("redis", min_timeout=0.05, max_timeout=args.max_timeout_ms / 1000)
+    service._redis = CircuitBreakingRedis(guarded, breaker)
+    with_breaker = await run(service, args.requests, args.concurrency)
+    with_breaker["redis_commands"] = guarded.commands
+    with_breaker["final_state"] = breaker.state
+
+    await service.aclose()
+    return {
+        "requests": args.requests,
+        "hang_ms": args.hang_ms,
+        "without_breaker": without,
+        "with_breaker": with_breaker,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--hang-ms", type=float, default=500, help="how long each Redis command hangs before failing")
+    parser.add_argument("--max-timeout-ms", type=float, default=2000, help="upper bound of the adaptive Redis timeout")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Simulate deep_search wall time against a serverless time limit, without and with deadlines.
+
+Search and LLM latencies are drawn from lognormal distributions, with a
+``--search-tail-share`` of searches stalling for ``--search-tail-seconds``. Each
+simulated request runs search then generation:
+
+* without a deadline, the two simply run back to back;
+* with one, search goes through ``_search_within_deadline`` under a
+  ``Deadline`` of ``--deadline`` seconds, so an overrunning search is cut at
+  ``SEARCH_DEADLINE_SHARE`` of the budget and the answer is generated without
+  its context (a degraded response).
+
+The report gives p50/p99 wall time, how many requests would have been killed
+by the platform at ``--platform-limit`` seconds, and how many were degraded.
+
+Usage:
+    python benchmarks/bench_deadline.py
+    python benchmarks/bench_deadline.py --requests 2000 --search-tail-share 0.1 --deadline 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.api import endpoints  # noqa: E402  (import after sys.path setup)
+from app.utils.deadline import Deadline, deadline_scope  # noqa: E402
+
+
+def summarize(samples, limit: float) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_s": round(ordered[len(ordered) // 2], 2),
+        "p99_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 2),
+        "killed_by_platform": sum(1 for s in ordered if s > limit),
+    }
+
+
+async def main_async(args) -> dict:
+    rng = random.Random(args.seed)
+    scale = args.time_scale
+    plans = []
+    for _ in range(args.requests):
+        search = rng.lognormvariate(0, 0.4) * args.search_median
+        if rng.random() < args.search_tail_share:
+            search += args.search_tail_seconds
+        plans.append((search, rng.lognormvariate(0, 0.3) * args.llm_median))
+
+    async def fake_search(query: str, mode: str = "quick"):
+        await asyncio.sleep(current[query][0] * scale)
+        return {"results": [], "context": "context", "query": query}
+
+    endpoints.search_service.search_medical_info = fake_search
+    current = {}
+
+    async def one(i: int, use_deadline: bool):
+        query = f"q{i}"
+        current[query] = plans[i]
+        started = time.monotonic()
+        if use_deadline:
+            with deadline_scope(Deadline(args.deadline * scale)):
+                _, degraded = await endpoints._search_within_deadline(query, mode="deep_search")
+        else:
+            await fake_search(query)
+            degraded = False
+        await asyncio.sleep(plans[i][1] * scale)
+        return (time.monotonic() - started) / scale, degraded
+
+    report = {"requests": args.requests, "deadline_s": args.deadline, "platform_limit_s": args.platform_limit}
+    for label, use_deadline in (("without_deadline", False), ("with_deadline", True)):
+        outcomes = []
+        for offset in range(0, args.requests, args.concurrency):
+            batch = range(offset, min(args.requests, offset + args.concurrency))
+            outcomes += await asyncio.gather(*(one(i, use_deadline) for i in batch))
+        report[label] = summarize([seconds for seconds, _ in outcomes], args.platform_limit)
+        report[label]["degraded"] = sum(1 for _, degraded in outcomes if degraded)
+    await endpoints.search_service.aclose()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--search-median", type=float, default=3.0, help="seconds")
+    parser.add_argument("--search-tail-share", type=float, default=0.05)
+    parser.add_argument("--search-tail-seconds", type=float, default=40.0)
+    parser.add_argument("--llm-median", type=float, default=12.0, help="seconds")
+    parser.add_argument("--deadline", type=float, default=50.0, help="deep_search deadline, seconds")
+    parser.add_argument("--platform-limit", type=float, default=60.0, help="seconds before the platform kills a request")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="compress simulated time by this factor")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Simulate hedged LLM requests against a primary provider with a slow tail.
+
+Both providers are fakes whose first-token latency is drawn from a lognormal
+distribution; a ``--tail-share`` of primary requests additionally stall for
+``--tail-seconds``. Requests run through ``Hedger`` with the quantile-derived
+delay and hedge budget used by ``MedicalAIService``, and the report compares
+first-token p50/p95/p99 without and with hedging, plus how many requests hedged
+and which provider won.
+
+Usage:
+    python benchmarks/bench_hedging.py
+    python benchmarks/bench_hedging.py --requests 2000 --tail-share 0.05 --max-ratio 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.utils.hedging import Hedger  # noqa: E402  (import after sys.path setup)
+
+
+def percentiles(samples) -> dict:
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e3, 1)
+
+    return {"p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99), "mean_ms": round(statistics.mean(ordered) * 1e3, 1)}
+
+
+async def main_async(args) -> dict:
+    rng = random.Random(args.seed)
+    scale = args.time_scale
+
+    def primary_delay() -> float:
+        delay = rng.lognormvariate(0, 0.3) * args.primary_median
+        if rng.random() < args.tail_share:
+            delay += args.tail_seconds
+        return delay * scale
+
+    def secondary_delay() -> float:
+        return rng.lognormvariate(0, 0.3) * args.secondary_median * scale
+
+    def stream(delay: float):
+        async def generate():
+            await asyncio.sleep(delay)
+            yield "token"
+
+        return generate()
+
+    # Without hedging: the first token arrives whenever the primary produces it
+    baseline = [primary_delay() for _ in range(args.requests)]
+
+    hedger = Hedger(quantile=args.quantile, min_delay=0.05 * scale, max_delay=5 * scale, max_ratio=args.max_ratio)
+    winners = {"primary": 0, "secondary": 0}
+    hedged = []
+
+    async def one(delay: float) -> None:
+        started = time.monotonic()
+        name, chunks = await hedger.race(lambda: stream(delay), lambda: stream(secondary_delay()))
+        async for _ in chunks:
+            break
+        hedged.append((time.monotonic() - started) / scale)
+        winners[name] += 1
+
+    for offset in range(0, args.requests, args.concurrency):
+        await asyncio.gather(*(one(d) for d in baseline[offset : offset + args.concurrency]))
+
+    return {
+        "requests": args.requests,
+        "tail_share": args.tail_share,
+        "max_ratio": args.max_ratio,
+        "without_hedging": percentiles([d / scale for d in baseline]),
+        "with_hedging": percentiles(hedged),
+        "hedge_delay_ms": round(hedger.delay() / scale * 1e3, 1),
+        "winners": winners,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--primary-median", type=float, default=0.8, help="seconds")
+    parser.add_argument("--secondary-median", type=float, default=1.2, help="seconds")
+    parser.add_argument("--tail-share", type=float, default=0.04)
+    parser.add_argument("--tail-seconds", type=float, default=6.0)
+    parser.add_argument("--quantile", type=float, default=0.95)
+    parser.add_argument("--max-ratio", type=float, default=0.1)
+    parser.add_argument("--time-scale", type=float, default=0.1, help="compress simulated time by this factor")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
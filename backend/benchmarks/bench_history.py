@@ -0,0 +1,142 @@
+"""Measure /history page latency against a large ``medical_queries`` table.
+
+Seeds a scratch database with ``--rows`` history rows, then times
+``get_query_history`` for the first page, a page deep into the history (reached
+through its keyset cursor) and mode/user-filtered pages. An OFFSET query over the
+same ordering is timed alongside to show what deep pages used to cost.
+
+Defaults to a temporary SQLite file; pass ``--database-url`` to use a scratch
+Postgres database instead (rows are inserted into ``medical_queries``).
+
+Usage:
+    python benchmarks/bench_history.py
+    python benchmarks/bench_history.py --rows 10000000 --database-url postgresql://...
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# app.config needs these before the app is imported; the app's own engine is
+# never used here, so keep it on an in-memory database
+for _name in ("GEMINI_API_KEY", "TAVILY_API_KEY", "SECRET_KEY"):
+    os.environ.setdefault(_name, "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.api.endpoints import (_encode_history_cursor,  # noqa: E402  (import after sys.path setup)
+                               get_query_history)
+from app.models.database import Base, MedicalQuery, response_preview  # noqa: E402
+from fastapi import Response  # noqa: E402
+
+MODES = ("quick", "deep_search", "expert", "image")
+RESPONSE = "Influenza is usually self-limiting; rest, fluids and antipyretics help. " * 30
+
+
+def seed(factory, rows: int, batch: int = 20_000) -> None:
+    rng = random.Random(11)
+    started = datetime(2023, 1, 1)
+    preview = response_preview(RESPONSE)
+    with factory() as session:
+        for offset in range(0, rows, batch):
+            session.execute(
+                insert(MedicalQuery),
+                [
+                    {
+                        "user_id": rng.randint(1, 1000),
+                        "mode": MODES[i % 4],
+                        "query": f"question {i}",
+                        "response": RESPONSE,
+                        "response_preview": preview,
+                        "confidence_score": 0.7,
+                        "sources": "[]",
+                        "created_at": started + timedelta(seconds=i),
+                    }
+                    for i in range(offset, min(offset + batch, rows))
+                ],
+            )
+            session.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        url = args.database_url or f"sqlite:///{Path(scratch) / 'history.db'}"
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        engine = create_engine(url, future=True, connect_args=connect_args)
+        Base.metadata.create_all(bind=engine, tables=[MedicalQuery.__table__])
+        factory = sessionmaker(bind=engine, future=True)
+
+        seed_started = time.perf_counter()
+        seed(factory, args.rows)
+        seed_seconds = time.perf_counter() - seed_started
+
+        with factory() as db:
+            deep = db.execute(
+                select(MedicalQuery.created_at, MedicalQuery.id)
+                .order_by(MedicalQuery.created_at.desc(), MedicalQuery.id.desc())
+                .offset(args.rows - args.limit * 2)
+                .limit(1)
+            ).one()
+            deep_cursor = _encode_history_cursor(deep.created_at, deep.id)
+
+            def page(**params):
+                return lambda: get_query_history(Response(), limit=args.limit, db=db, **params)
+
+            def offset_page():
+                db.execute(
+                    select(MedicalQuery.id, MedicalQuery.query)
+                    .order_by(MedicalQuery.created_at.desc(), MedicalQuery.id.desc())
+                    .offset(args.rows - args.limit * 2)
+                    .limit(args.limit)
+                ).all()
+
+            report = {
+                "database": engine.dialect.name,
+                "rows": args.rows,
+                "seed_seconds": round(seed_seconds, 1),
+                "median_ms": {
+                    "first_page": timed(page(cursor=None, mode=None, user_id=None), args.repeat),
+                    "deep_page_keyset": timed(page(cursor=deep_cursor, mode=None, user_id=None), args.repeat),
+                    "deep_page_offset": timed(offset_page, args.repeat),
+                    "mode_filtered": timed(page(cursor=None, mode="expert", user_id=None), args.repeat),
+                    "user_filtered": timed(page(cursor=None, mode=None, user_id=42), args.repeat),
+                },
+            }
+        engine.dispose()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
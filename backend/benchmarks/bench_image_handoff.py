@@ -0,0 +1,120 @@
+"""Compare the old base64 image handoff with the direct ``PreparedImage`` blob.
+
+For each image size class, a synthetic scan is pushed through both paths from
+upload bytes to the payload the Gemini client sends:
+
+* ``legacy``: resize + JPEG encode, base64 encode, base64 decode, ``Image.open``,
+  then the client's own JPEG re-encode of the PIL image.
+* ``handoff``: ``preprocess_image`` (passthrough or one adaptive encode) and the
+  encoded bytes handed over as an inline blob.
+
+Reports median wall time, peak traced Python allocations (Pillow's pixel buffers
+live in its C heap and are not included) and payload size per class.
+
+Usage:
+    python benchmarks/bench_image_handoff.py
+    python benchmarks/bench_image_handoff.py --repeat 10 --max-bytes 524288
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageFilter
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.image_processing import preprocess_image, to_vision_part  # noqa: E402  (import after sys.path setup)
+
+SIZE_CLASSES = {
+    "small_0.3mp": (640, 480),
+    "medium_2mp": (1600, 1200),
+    "large_12mp": (4000, 3000),
+    "xlarge_40mp": (7300, 5500),
+}
+
+
+def make_scan(size) -> bytes:
+    """Smooth grayscale texture saved as an RGB JPEG, like most exported X-rays."""
+    small = Image.effect_noise((size[0] // 8, size[1] // 8), 80).filter(ImageFilter.GaussianBlur(2))
+    gray = small.resize(size, Image.Resampling.BILINEAR)
+    buffer = BytesIO()
+    Image.merge("RGB", (gray, gray, gray)).save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def legacy_handoff(upload: bytes, max_size: int) -> bytes:
+    img = Image.open(BytesIO(upload))
+    if img.format == "JPEG":
+        img.draft("RGB", (max_size, max_size))
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if img.width > max_size or img.height > max_size:
+        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    buffered = BytesIO()
+    img.save(buffered, format="JPEG")
+    encoded = base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+    # ai_service: decode base64, reopen, then the client re-encodes the PIL image
+    reopened = Image.open(BytesIO(base64.b64decode(encoded)))
+    payload = BytesIO()
+    reopened.save(payload, format="JPEG")
+    return payload.getvalue()
+
+
+def new_handoff(upload: bytes, max_size: int, max_bytes: int) -> bytes:
+    return to_vision_part(preprocess_image(upload, max_size, max_bytes))["data"]
+
+
+def measure(fn, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(timings), 2),
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "payload_bytes": len(payload),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-size", type=int, default=1024)
+    parser.add_argument("--max-bytes", type=int, default=1_048_576)
+    args = parser.parse_args()
+
+    report = {}
+    for label, size in SIZE_CLASSES.items():
+        upload = make_scan(size)
+        legacy = measure(lambda: legacy_handoff(upload, args.max_size), args.repeat)
+        handoff = measure(lambda: new_handoff(upload, args.max_size, args.max_bytes), args.repeat)
+        report[label] = {
+            "upload_bytes": len(upload),
+            "legacy": legacy,
+            "handoff": handoff,
+            "speedup": round(legacy["median_ms"] / max(handoff["median_ms"], 1e-3), 2),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Measure event-loop lag while large images are being preprocessed.
+
+A ticker coroutine sleeps for a fixed interval and records how late it wakes up.
+The same batch of large JPEGs is then preprocessed concurrently, first inline on
+the event loop (the old behaviour) and then through ``ImageProcessor``. With the
+pool, lag should stay close to zero however large the images are.
+
+Usage:
+    python benchmarks/bench_image_pool.py
+    python benchmarks/bench_image_pool.py --images 16 --megapixels 40 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.image_processing import ImageProcessor, preprocess_image  # noqa: E402  (import after sys.path setup)
+
+TICK_SECONDS = 0.005
+
+
+def make_jpeg(megapixels: float) -> bytes:
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    img = Image.merge("RGB", (gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT), gradient))
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def measure(label: str, images, preprocess) -> dict:
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append((time.perf_counter() - start - TICK_SECONDS) * 1000)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK_SECONDS * 4)
+    started = time.perf_counter()
+    await asyncio.gather(*(preprocess(data) for data in images))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker_task
+
+    lags.sort()
+    return {
+        "mode": label,
+        "wall_seconds": round(elapsed, 3),
+        "lag_p50_ms": round(statistics.median(lags), 2),
+        "lag_p99_ms": round(lags[max(0, int(len(lags) * 0.99) - 1)], 2),
+        "lag_max_ms": round(lags[-1], 2),
+    }
+
+
+async def run(args) -> dict:
+    images = [make_jpeg(args.megapixels)] * args.images
+
+    async def inline(data: bytes) -> bytes:
+        await asyncio.sleep(0)
+        return preprocess_image(data, args.max_size)
+
+    processor = ImageProcessor(max_workers=args.workers, max_pending=args.images, max_size=args.max_size)
+    # Spawn the workers before timing so start-up cost is not counted as lag
+    await processor.preprocess(images[0])
+    try:
+        results = [
+            await measure("inline", images, inline),
+            await measure(f"pool[{args.workers}]", images, processor.preprocess),
+        ]
+    finally:
+        processor.shutdown()
+
+    return {
+        "images": args.images,
+        "megapixels": args.megapixels,
+        "input_bytes": len(images[0]),
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--megapixels", type=float, default=24)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""Load-test the backend and the api/ entry points offline, against stand-in services.
+
+Each target is booted in a child process with Gemini, OpenRouter, Tavily and
+Redis pointed at the stand-ins in ``standins.py`` (no network, no API keys).
+After its health check answers, ``--concurrency`` closed-loop clients send a
+weighted mix of quick / deep_search / expert / image requests for
+``--duration`` seconds (after ``--warmup`` seconds that are not recorded).
+Queries are numbered, so response caches see realistic misses.
+
+Targets:
+* ``backend``: ``uvicorn app.main:app``, ``POST /api/v1/analyze``
+* ``index_full``: ``uvicorn index_full:app`` in ``api/``, ``POST /v1/analyze`` (needs mangum)
+* ``index``: ``api/index.py``'s handler on a ``ThreadingHTTPServer``, ``POST /api/v1/analyze``
+
+The JSON report has, per target and per mode, requests, errors (with their
+statuses), throughput and p50/p95/p99 latency of successful requests, plus
+the calls each stand-in received and the first body seen for each kind of
+error. A target that cannot start is reported with the reason and the tail
+of its log instead.
+
+Usage:
+    python benchmarks/bench_load.py
+    python benchmarks/bench_load.py --targets backend --duration 60 --concurrency 32
+    python benchmarks/bench_load.py --mix quick=4,deep_search=2,expert=1,image=1 --llm-tokens-per-second 40
+    python benchmarks/bench_load.py --output load-report.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+API_DIR = PROJECT_ROOT.parent / "api"
+
+import httpx  # noqa: E402  (import after sys.path setup)
+from standins import add_profile_arguments, standins_from_args  # noqa: E402
+
+HOST = "127.0.0.1"
+MODES = ("quick", "deep_search", "expert", "image")
+QUERIES = {
+    "quick": "What can I take for a tension headache and when should I see a doctor? (case {n})",
+    "deep_search": "What does current evidence say about first-line treatment of type 2 diabetes? (case {n})",
+    "expert": "How should persistent fatigue with mild anaemia be worked up in a 58-year-old? (case {n})",
+    "image": "Please review this chest X-ray for signs of pneumonia (case {n})",
+}
+# Serves api/index.py the way Vercel's runtime calls it: one handler class per request
+_INDEX_SERVER = (
+    "import sys; from http.server import ThreadingHTTPServer; import index; "
+    "ThreadingHTTPServer(('127.0.0.1', int(sys.argv[1])), index.handler).serve_forever()"
+)
+
+
+@dataclass(frozen=True)
+class Target:
+    name: str
+    cwd: Path
+    health_path: str
+    analyze_path: str
+    json_text: bool = False  # posts text-only queries as JSON rather than a form
+    requires: Tuple[str, ...] = ()
+
+    def command(self, port: int) -> List[str]:
+        if self.name == "index":
+            return [sys.executable, "-c", _INDEX_SERVER, str(port)]
+        app = "app.main:app" if self.name == "backend" else "index_full:app"
+        return [
+            sys.executable, "-m", "uvicorn", app,
+            "--host", HOST, "--port", str(port), "--log-level", "warning", "--no-access-log",
+        ]
+
+
+TARGETS = {
+    "backend": Target("backend", PROJECT_ROOT, "/health", "/api/v1/analyze"),
+    "index_full": Target("index_full", API_DIR, "/health", "/v1/analyze", requires=("mangum", "PIL")),
+    "index": Target("index", API_DIR, "/api/health", "/api/v1/analyze", json_text=True),
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for item in text.split(","):
+        mode, _, weight = item.partition("=")
+        if mode.strip() not in MODES:
+            raise argparse.ArgumentTypeError(f"unknown mode {mode!r}; expected one of {', '.join(MODES)}")
+        mix[mode.strip()] = float(weight or 1)
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def sample_image(size: Tuple[int, int] = (1600, 1200)) -> bytes:
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.effect_noise(size, 48).convert("RGB").save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def percentile(ordered: List[float], share: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * share))] * 1000, 1)
+
+
+def summarize(samples: List[Tuple[float, bool, str]], seconds: float) -> Dict[str, Any]:
+    latencies = sorted(latency for latency, ok, _ in samples if ok)
+    errors = Counter(status for _, ok, status in samples if not ok)
+    return {
+        "requests": len(samples),
+        "errors": sum(errors.values()),
+        "error_statuses": dict(errors),
+        "throughput_rps": round(len(latencies) / seconds, 2),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def app_env(standins: Any, workdir: Path) -> Dict[str, str]:
+    return {
+        **os.environ,
+        **standins.env(),
+        "SECRET_KEY": "load-test",
+        "DATABASE_URL": f"sqlite:///{workdir / 'load.db'}",
+        "SUPABASE_DB_URL": "",
+        "RATE_LIMIT_PER_MINUTE": "1000000",
+        "LOG_LEVEL": "WARNING",
+        "PYTHONUNBUFFERED": "1",
+    }
+
+
+class Booted:
+    """A target's child process, started and waited on until its health check answers."""
+
+    def __init__(self, target: Target, env: Dict[str, str], workdir: Path, timeout: float) -> None:
+        self.target = target
+        self.port = free_port()
+        self.base_url = f"http://{HOST}:{self.port}"
+        self.log_path = workdir / f"{target.name}.log"
+        self.env = env
+        self.timeout = timeout
+        self.process: Optional[subprocess.Popen] = None
+
+    async def __aenter__(self) -> "Booted":
+        if self.target.name == "backend":
+            # The app relies on migrations for its schema; a scratch SQLite file needs it created
+            subprocess.run(
+                [sys.executable, "-c", "from app.models.database import Base, engine; Base.metadata.create_all(engine)"],
+                cwd=self.target.cwd, env=self.env, check=True, capture_output=True,
+            )
+        log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(
+            self.target.command(self.port), cwd=self.target.cwd, env=self.env, stdout=log, stderr=subprocess.STDOUT
+        )
+        log.close()
+        deadline = time.monotonic() + self.timeout
+        async with httpx.AsyncClient(base_url=self.base_url) as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"{self.target.name} exited with code {self.process.returncode}")
+                try:
+                    if (await client.get(self.target.health_path, timeout=1)).status_code == 200:
+                        return self
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.2)
+        await self.__aexit__()
+        raise RuntimeError(f"{self.target.name} did not become healthy within {self.timeout:.0f}s")
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def log_tail(self, lines: int = 20) -> List[str]:
+        try:
+            return self.log_path.read_text(errors="replace").splitlines()[-lines:]
+        except OSError:
+            return []
+
+
+async def drive(booted: Booted, args: argparse.Namespace, image: bytes) -> Dict[str, Any]:
+    modes, weights = zip(*args.mix.items())
+    rng = random.Random(args.seed)
+    results: Dict[str, List[Tuple[float, bool, str]]] = defaultdict(list)
+    error_samples: Dict[str, str] = {}  # first response body seen per error label
+    counter = iter(range(10**9))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async def one(client: httpx.AsyncClient, mode: str) -> Tuple[float, bool, str]:
+        fields = {"query": QUERIES[mode].format(n=next(counter)), "mode": mode}
+        if mode == "image":
+            body = {"data": fields, "files": {"image": ("chest-xray.jpg", image, "image/jpeg")}}
+        else:
+            body = {"json": fields} if booted.target.json_text else {"data": fields}
+        started = time.perf_counter()
+        try:
+            response = await client.post(booted.target.analyze_path, timeout=args.timeout, **body)
+        except httpx.HTTPError as exc:
+            error_samples.setdefault(type(exc).__name__, repr(exc))
+            return time.perf_counter() - started, False, type(exc).__name__
+        elapsed = time.perf_counter() - started
+        label = str(response.status_code)
+        # api/index.py reports upstream failures as 200 with "status": "error"
+        if response.status_code == 200 and response.json().get("status") == "error":
+            label = "200 status=error"
+        elif response.status_code == 200:
+            return elapsed, True, label
+        error_samples.setdefault(label, response.text[:300])
+        return elapsed, False, label
+
+    async def client_loop(client: httpx.AsyncClient, stop_at: float, record: bool) -> None:
+        while time.monotonic() < stop_at:
+            mode = rng.choices(modes, weights)[0]
+            sample = await one(client, mode)
+            if record:
+                results[mode].append(sample)
+
+    async with httpx.AsyncClient(base_url=booted.base_url, limits=limits) as client:
+        if args.warmup > 0:
+            stop_at = time.monotonic() + args.warmup
+            await asyncio.gather(*(client_loop(client, stop_at, False) for _ in range(args.concurrency)))
+        started = time.monotonic()
+        stop_at = started + args.duration
+        await asyncio.gather(*(client_loop(client, stop_at, True) for _ in range(args.concurrency)))
+        seconds = time.monotonic() - started
+
+    report = {mode: summarize(samples, seconds) for mode, samples in sorted(results.items())}
+    report["all"] = summarize([sample for samples in results.values() for sample in samples], seconds)
+    report["seconds"] = round(seconds, 2)
+    report["error_samples"] = error_samples
+    return report
+
+
+async def run_target(target: Target, args: argparse.Namespace, standins: Any, image: bytes) -> Dict[str, Any]:
+    missing = [name for name in target.requires if importlib.util.find_spec(name) is None]
+    if missing:
+        return {"skipped": f"missing modules: {', '.join(missing)}"}
+
+    with tempfile.TemporaryDirectory(prefix=f"mediverse-load-{target.name}-") as workdir:
+        booted = Booted(target, app_env(standins, Path(workdir)), Path(workdir), args.boot_timeout)
+        calls_before = Counter(standins.calls)
+        try:
+            async with booted:
+                report = await drive(booted, args, image)
+        except RuntimeError as exc:
+            return {"error": str(exc), "log": booted.log_tail()}
+        report["upstream_calls"] = dict(Counter(standins.calls) - calls_before)
+        return report
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    standins = standins_from_args(args).start_in_thread()
+    image = sample_image()
+    try:
+        report: Dict[str, Any] = {
+            "config": {
+                "duration_s": args.duration,
+                "concurrency": args.concurrency,
+                "mix": args.mix,
+                "llm": vars(standins.profile),
+                "search_ms": args.search_ms,
+            },
+            "targets": {},
+        }
+        for name in args.targets:
+            report["targets"][name] = await run_target(TARGETS[name], args, standins, image)
+        return report
+    finally:
+        standins.stop_thread()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=sorted(TARGETS), default=["backend", "index_full", "index"])
+    parser.add_argument("--duration", type=float, default=20.0, help="recorded seconds per target")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unrecorded seconds before measuring")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed-loop clients")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("quick=5,deep_search=2,expert=2,image=1"))
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout, seconds")
+    parser.add_argument("--boot-timeout", type=float, default=60.0, help="seconds to wait for a health check")
+    parser.add_argument("--output", type=Path, help="also write the report to this file")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    report = json.dumps(asyncio.run(main_async(args)), indent=2)
+    if args.output:
+        args.output.write_text(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Compare the middleware stack as pure ASGI apps vs ``BaseHTTPMiddleware``.
+
+Drives the real ``app.main`` application through ``httpx.ASGITransport`` (no
+sockets) and a copy of it whose rate-limit, timing and request-id middlewares are
+the equivalent ``BaseHTTPMiddleware`` subclasses, i.e. the way
+``RateLimitMiddleware`` used to be written. Search and the model are replaced by
+instant fakes, so the numbers are framework and middleware overhead only.
+
+Two routes are measured: ``GET /`` (small JSON) and ``POST /api/v1/query/stream``
+(an SSE stream of ``--tokens`` events).
+
+Usage:
+    python benchmarks/bench_middleware.py
+    python benchmarks/bench_middleware.py --requests 5000 --concurrency 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+for _name in ("GEMINI_API_KEY", "TAVILY_API_KEY", "SECRET_KEY"):
+    os.environ.setdefault(_name, "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# Measure overhead, not rejections
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "100000000")
+
+import httpx  # noqa: E402  (import after sys.path setup)
+from app.api import endpoints  # noqa: E402
+from app.api.middleware import (HTTP_REQUEST_SECONDS,  # noqa: E402
+                                rate_limited_response, scope_client_key)
+from app.main import app  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from starlette.middleware import Middleware  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+
+class BaseHTTPRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, limiter) -> None:
+        super().__init__(app)
+        self.limiter = limiter
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path.startswith(("/health", "/metrics")):
+            return await call_next(request)
+        result = await self.limiter.acquire(scope_client_key(request.scope))
+        if not result.allowed:
+            return rate_limited_response(result)
+        return await call_next(request)
+
+
+class BaseHTTPTimingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        response.headers["Server-Timing"] = f"app;dur={(time.perf_counter() - started) * 1000:.1f}"
+        endpoint = request.scope.get("endpoint")
+        HTTP_REQUEST_SECONDS.labels(request.method, getattr(endpoint, "__name__", "unmatched"), "200").observe(
+            time.perf_counter() - started
+        )
+        return response
+
+
+class BaseHTTPRequestIDMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+        request.state.request_id = request_id
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+
+def build_base_http_app() -> FastAPI:
+    cors = next(m for m in app.user_middleware if m.cls is CORSMiddleware)
+    return FastAPI(
+        routes=list(app.routes),
+        middleware=[
+            Middleware(BaseHTTPRequestIDMiddleware),
+            Middleware(BaseHTTPTimingMiddleware),
+            cors,
+            Middleware(BaseHTTPRateLimitMiddleware, limiter=endpoints.rate_limiter),
+        ],
+    )
+
+
+def install_fakes(tokens: int) -> None:
+    async def fake_search(query: str):
+        return {"results": [{"title": "Source", "content": "x", "url": "https://example.com", "score": 0.9}],
+                "context": "context", "query": query}
+
+    async def fake_stream_response(query, search_context=None, mode="quick", session_id=None):
+        for _ in range(tokens):
+            yield {"event": "token", "data": "word "}
+        yield {"event": "complete", "data": {"response": "word " * tokens, "confidence_score": 0.8}}
+
+    endpoints.search_service.search_medical_info = fake_search
+    endpoints.ai_service.stream_response = fake_stream_response
+    endpoints.save_query_to_db = lambda **kwargs: None
+
+
+async def drive(api: FastAPI, route: str, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=api, client=("10.0.0.1", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one() -> float:
+            start = time.perf_counter()
+            if route == "stream":
+                response = await client.post("/api/v1/query/stream", json={"query": "What helps with a cold?"})
+            else:
+                response = await client.get("/")
+            response.raise_for_status()
+            return (time.perf_counter() - start) * 1e3
+
+        for _ in range(concurrency):
+            await one()  # warm up
+
+        latencies = []
+        started = time.perf_counter()
+        for offset in range(0, requests, concurrency):
+            latencies += await asyncio.gather(*(one() for _ in range(min(concurrency, requests - offset))))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests_per_second": round(requests / elapsed),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--tokens", type=int, default=50, help="SSE token events per streamed answer")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    install_fakes(args.tokens)
+    variants = {"base_http_middleware": build_base_http_app(), "pure_asgi": app}
+    report = {"requests": args.requests, "concurrency": args.concurrency, "results": {}}
+    for route in ("json", "stream"):
+        report["results"][route] = {
+            name: asyncio.run(drive(api, route, args.requests, args.concurrency)) for name, api in variants.items()
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
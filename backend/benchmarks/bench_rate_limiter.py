@@ -0,0 +1,182 @@
+"""Measure rate-limit middleware overhead per request across many client IPs.
+
+Requests are driven straight through the ASGI interface (no network, no HTTP
+client) against a trivial FastAPI route, cycling over ``--ips`` distinct client
+addresses. Compares no middleware, the previous global-lock sliding-window
+middleware, and ``RateLimitMiddleware`` with the token-bucket limiter, and
+reports how many per-client entries each keeps afterwards.
+
+Usage:
+    python benchmarks/bench_rate_limiter.py
+    python benchmarks/bench_rate_limiter.py --ips 10000 --requests 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+for _name in ("GEMINI_API_KEY", "TAVILY_API_KEY", "SECRET_KEY"):
+    os.environ.setdefault(_name, "benchmark")
+
+from app.api.middleware import RateLimitMiddleware  # noqa: E402  (import after sys.path setup)
+from app.utils.rate_limiter import TokenBucketLimiter  # noqa: E402
+from fastapi import FastAPI, HTTPException, Request  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """The sliding-window middleware this benchmark replaces, kept for comparison."""
+
+    def __init__(self, app, calls: int = 20, period: int = 60) -> None:
+        super().__init__(app)
+        self.calls = calls
+        self.period = period
+        self._lock = asyncio.Lock()
+        self._requests = defaultdict(lambda: deque(maxlen=self.calls))
+
+    async def dispatch(self, request: Request, call_next):
+        client_ip = request.client.host if request.client else "anonymous"
+        now = time.time()
+        async with self._lock:
+            window = self._requests[client_ip]
+            while window and now - window[0] > self.period:
+                window.popleft()
+            if len(window) >= self.calls:
+                raise HTTPException(status_code=429, detail="Rate limit exceeded.")
+            window.append(now)
+        return await call_next(request)
+
+
+def build_app(middleware=None, **options) -> FastAPI:
+    api = FastAPI()
+
+    @api.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    if middleware:
+        api.add_middleware(middleware, **options)
+    return api
+
+
+async def drive(api: FastAPI, ips: int, requests: int, concurrency: int) -> dict:
+    async def send(message):
+        pass
+
+    async def one(i: int) -> float:
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            # Once the body is consumed the client is "gone", as after a real response
+            return messages.pop() if messages else {"type": "http.disconnect"}
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/ping",
+            "raw_path": b"/ping",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"bench")],
+            "client": (f"10.{(i % ips) // 65536}.{(i % ips) // 256 % 256}.{i % 256}", 50000),
+            "server": ("bench", 80),
+        }
+        start = time.perf_counter()
+        await api(scope, receive, send)
+        return (time.perf_counter() - start) * 1e6
+
+    # Warm up the middleware stack once
+    await one(0)
+    latencies = []
+    started = time.perf_counter()
+    for offset in range(0, requests, concurrency):
+        latencies += await asyncio.gather(*(one(i) for i in range(offset, min(offset + concurrency, requests))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests_per_second": round(requests / elapsed),
+        "p50_us": round(statistics.median(latencies), 1),
+        "p99_us": round(latencies[int(len(latencies) * 0.99) - 1], 1),
+    }
+
+
+async def decisions_per_second(ips: int, requests: int) -> dict:
+    """Time the check-and-debit alone, without the HTTP stack around it."""
+
+    keys = [f"10.0.{i // 256 % 256}.{i % 256}:{i}" for i in range(ips)]
+    lock = asyncio.Lock()
+    windows = defaultdict(lambda: deque(maxlen=requests))
+    started = time.perf_counter()
+    for i in range(requests):
+        now = time.time()
+        async with lock:
+            window = windows[keys[i % ips]]
+            while window and now - window[0] > 60:
+                window.popleft()
+            window.append(now)
+    legacy = requests / (time.perf_counter() - started)
+
+    limiter = TokenBucketLimiter(rate_per_second=1000, burst=requests)
+    started = time.perf_counter()
+    for i in range(requests):
+        await limiter.acquire(keys[i % ips])
+    bucket = requests / (time.perf_counter() - started)
+    return {"legacy_lock_window": round(legacy), "token_bucket": round(bucket)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ips", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    # Generous limits: this measures overhead, not rejections
+    per_ip = args.requests // args.ips + 10
+    limiter = TokenBucketLimiter(rate_per_second=per_ip / 60, burst=per_ip)
+    legacy = build_app(LegacyRateLimitMiddleware, calls=per_ip)
+    variants = {
+        "no_middleware": build_app(),
+        "legacy_lock_window": legacy,
+        "token_bucket": build_app(RateLimitMiddleware, limiter=limiter),
+    }
+
+    report = {"ips": args.ips, "requests": args.requests, "results": {}}
+    for name, api in variants.items():
+        report["results"][name] = asyncio.run(drive(api, args.ips, args.requests, args.concurrency))
+
+    legacy_stack = legacy.middleware_stack
+    while not isinstance(legacy_stack, LegacyRateLimitMiddleware):
+        legacy_stack = legacy_stack.app
+    report["tracked_clients"] = {"legacy_lock_window": len(legacy_stack._requests), "token_bucket": len(limiter)}
+    # Once every client has gone quiet, the next request sweeps their buckets away
+    limiter.try_acquire("late-client", now=time.monotonic() + limiter.idle_ttl_seconds + 1)
+    report["tracked_clients_after_idle"] = {
+        "legacy_lock_window": len(legacy_stack._requests),
+        "token_bucket": len(limiter),
+    }
+    report["decisions_per_second"] = asyncio.run(decisions_per_second(args.ips, args.requests * 5))
+    baseline = report["results"]["no_middleware"]["p50_us"]
+    for name in ("legacy_lock_window", "token_bucket"):
+        report["results"][name]["overhead_p50_us"] = round(report["results"][name]["p50_us"] - baseline, 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Replay a query log through the near-duplicate query cache.
+
+Reports the hit rate of exact (raw string) caching next to the semantic cache
+on the same log, then fills the index with synthetic entries to show lookup
+latency and memory at scale.
+
+The log is a text file of ``mode<TAB>query`` lines (``#`` starts a comment).
+
+Usage:
+    python benchmarks/bench_semantic_cache.py
+    python benchmarks/bench_semantic_cache.py --log my_queries.tsv --index-size 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.semantic_cache import SemanticQueryCache  # noqa: E402  (import after sys.path setup)
+
+DEFAULT_LOG = PROJECT_ROOT / "benchmarks" / "data" / "query_log.txt"
+
+
+def load_log(path: Path):
+    entries = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        mode, _, query = line.partition("\t")
+        entries.append((mode.strip(), query.strip()))
+    return entries
+
+
+def replay(entries, threshold: float) -> dict:
+    exact_seen = set()
+    exact_hits = 0
+    cache = SemanticQueryCache(threshold=threshold)
+    semantic_hits = 0
+
+    for index, (mode, query) in enumerate(entries):
+        if (mode, query) in exact_seen:
+            exact_hits += 1
+        exact_seen.add((mode, query))
+
+        if cache.lookup(query, mode):
+            semantic_hits += 1
+        else:
+            cache.add(query, mode, f"answer-{index}")
+
+    total = len(entries)
+    return {
+        "requests": total,
+        "exact_hit_rate": round(exact_hits / total, 3) if total else 0.0,
+        "semantic_hit_rate": round(semantic_hits / total, 3) if total else 0.0,
+        "threshold": threshold,
+    }
+
+
+def scale(index_size: int, lookups: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(20_000)]
+    cache = SemanticQueryCache(max_entries=index_size)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    queries = []
+    for i in range(index_size):
+        query = " ".join(rng.sample(vocabulary, rng.randint(3, 7)))
+        cache.add(query, "quick", f"answer-{i}")
+        if i % max(1, index_size // lookups) == 0:
+            queries.append(query)
+    build_seconds = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    hits = 0
+    for query in queries[:lookups]:
+        variant = query.upper() + "?"
+        start = time.perf_counter()
+        hits += cache.lookup(variant, "quick") is not None
+        timings.append((time.perf_counter() - start) * 1e6)
+
+    timings.sort()
+    return {
+        "index_size": index_size,
+        "build_seconds": round(build_seconds, 2),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+        "lookup_p50_us": round(statistics.median(timings), 1),
+        "lookup_p99_us": round(timings[int(len(timings) * 0.99) - 1], 1),
+        "variant_hit_rate": round(hits / len(timings), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", type=Path, default=DEFAULT_LOG)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--index-size", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    args = parser.parse_args()
+
+    report = {
+        "replay": replay(load_log(args.log), args.threshold),
+        "scale": scale(args.index_size, args.lookups),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
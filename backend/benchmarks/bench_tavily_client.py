@@ -0,0 +1,145 @@
+"""Compare Tavily search throughput: sync SDK in threads vs the pooled async client.
+
+Starts a local stand-in for the Tavily API (uvicorn in a child process) that
+answers ``POST /search`` after ``--latency-ms`` with a realistic payload, then
+issues batches of concurrent searches through
+
+* ``TavilyClient.search`` wrapped in ``asyncio.to_thread`` (the previous code
+  path: one default-executor thread and one new connection per search), and
+* ``AsyncTavilyClient`` (one shared keep-alive ``httpx.AsyncClient``).
+
+Reports searches/s and p50/p99 latency per concurrency level.
+
+Usage:
+    python benchmarks/bench_tavily_client.py
+    python benchmarks/bench_tavily_client.py --latency-ms 300 --concurrency 1 16 64 128
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import httpx  # noqa: E402  (import after sys.path setup)
+from app.services.tavily_client import AsyncTavilyClient  # noqa: E402
+from tavily import TavilyClient  # noqa: E402
+
+RESULT = {
+    "title": "Treating Flu with Antiviral Drugs | CDC",
+    "url": "https://www.cdc.gov/flu/treatment/antiviral-drugs.html",
+    "content": "Antiviral drugs are prescription medicines that fight against flu viruses in your body. " * 8,
+    "score": 0.97,
+    "raw_content": None,
+}
+
+
+def serve(port: int, latency: float) -> None:
+    import uvicorn
+
+    body = json.dumps({"query": "stand-in", "results": [RESULT] * 10, "response_time": latency}).encode()
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        while (await receive()).get("more_body"):
+            pass
+        await asyncio.sleep(latency)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="error", backlog=4096)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str) -> None:
+    for _ in range(100):
+        try:
+            httpx.post(f"{url}/search", json={}, timeout=5)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("stand-in server did not start")
+
+
+def summarize(latencies, elapsed: float) -> dict:
+    latencies.sort()
+    return {
+        "searches_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(latencies[max(0, int(len(latencies) * 0.99) - 1)], 1),
+    }
+
+
+async def run(search, concurrency: int, rounds: int) -> dict:
+    async def one(i: int) -> float:
+        start = time.perf_counter()
+        await search(f"influenza treatment {i}")
+        return (time.perf_counter() - start) * 1e3
+
+    await one(-1)  # warm up (connection, executor)
+    started = time.perf_counter()
+    latencies = []
+    for round_ in range(rounds):
+        latencies += await asyncio.gather(*(one(round_ * concurrency + i) for i in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def measure(url: str, concurrency: int, rounds: int) -> dict:
+    sync_client = TavilyClient(api_key="benchmark")
+    sync_client.base_url = f"{url}/search"
+
+    async def threaded(query: str):
+        return await asyncio.to_thread(sync_client.search, query, max_results=10)
+
+    async_client = AsyncTavilyClient("benchmark", base_url=url, max_connections=max(concurrency, 1))
+    try:
+        return {
+            "to_thread_sync_sdk": await run(threaded, concurrency, rounds),
+            "async_pooled": await run(lambda q: async_client.search(q, max_results=10), concurrency, rounds),
+        }
+    finally:
+        await async_client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(port, args.latency_ms / 1000), daemon=True
+    )
+    server.start()
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(url)
+        report = {"latency_ms": args.latency_ms, "results": {}}
+        for concurrency in args.concurrency:
+            report["results"][concurrency] = asyncio.run(measure(url, concurrency, args.rounds))
+    finally:
+        server.terminate()
+        server.join()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Measure emergency-keyword validation cost vs keyword count and query length.
+
+Compares the previous per-keyword ``keyword in query.lower()`` scan with the
+compiled trie regex used by ``MedicalValidator``. Keyword sets are the bundled
+list padded with synthetic multi-word phrases; queries are benign (no match), so
+every keyword has to be ruled out, which is the common and most expensive case.
+
+Usage:
+    python benchmarks/bench_validator.py
+    python benchmarks/bench_validator.py --keywords 10 1000 10000 --lengths 100 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.medical_validator import (DEFAULT_KEYWORDS_FILE,  # noqa: E402  (import after sys.path setup)
+                                            MedicalValidator,
+                                            load_keywords)
+
+VOCABULARY = (
+    "acute chronic severe sudden persistent pain swelling fever rash bleeding numbness weakness "
+    "dizziness fainting seizure vomiting confusion pressure tightness shortness breath vision loss "
+    "allergic reaction throat tongue lips chest abdomen head neck back arm leg infant child adult"
+).split()
+QUERY_WORDS = (
+    "what are the usual treatments for seasonal allergies and how long does recovery take "
+    "after a mild sprain should I see a doctor about recurring headaches in the morning"
+).split()
+
+
+def synthetic_phrases(count: int, rng: random.Random) -> list:
+    phrases = set(load_keywords(DEFAULT_KEYWORDS_FILE))
+    while len(phrases) < count:
+        phrases.add(" ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(2, 4))) + f" {len(phrases)}")
+    return sorted(phrases)
+
+
+def legacy_validate(keywords, query: str) -> bool:
+    normalized = query.lower()
+    for keyword in keywords:
+        if keyword in normalized:
+            return True
+    return False
+
+
+def time_per_call(fn, queries, min_seconds: float = 0.2) -> float:
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        for query in queries:
+            fn(query)
+        calls += len(queries)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return elapsed / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keywords", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[80, 500, 4000], help="query lengths in characters")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    for count in args.keywords:
+        phrases = synthetic_phrases(count, rng)
+        started = time.perf_counter()
+        validator = MedicalValidator(keywords=phrases)
+        build_ms = (time.perf_counter() - started) * 1e3
+        for length in args.lengths:
+            queries = []
+            for _ in range(20):
+                text = ""
+                while len(text) < length:
+                    text += rng.choice(QUERY_WORDS) + " "
+                queries.append(text[:length])
+            assert not any(validator.validate_query(q).get("reason") == "emergency" for q in queries)
+            results.append(
+                {
+                    "keywords": len(phrases),
+                    "query_chars": length,
+                    "legacy_us": round(time_per_call(lambda q: legacy_validate(phrases, q), queries), 2),
+                    "compiled_us": round(time_per_call(validator.validate_query, queries), 2),
+                    "compile_ms": round(build_ms, 1),
+                }
+            )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,507 @@
+"""Local stand-ins for the services Mediverse calls, for offline load tests.
+
+* Gemini: a gRPC server for ``google.ai.generativelanguage.v1beta.GenerativeService``
+  (``GenerateContent`` and ``StreamGenerateContent``). The SDK only speaks TLS,
+  so the server uses a throwaway self-signed certificate that clients trust
+  through ``GRPC_DEFAULT_SSL_ROOTS_FILE_PATH``.
+* OpenRouter: an OpenAI-compatible ``POST /v1/chat/completions``, streamed or not.
+* Tavily: ``POST /search``, answered after a lognormal delay.
+* Redis: a small RESP server with the string, hash and expiry commands the app
+  uses. ``EVAL``/``EVALSHA`` are not supported, so leave
+  ``RATE_LIMIT_BACKEND=memory`` and ``SINGLE_FLIGHT_REDIS_LOCK`` off.
+
+LLM replies wait a first-token delay drawn from a lognormal distribution
+(median ``--llm-first-token-ms``, shape ``--llm-sigma``), then produce
+``--llm-tokens`` tokens at ``--llm-tokens-per-second``. ``StandIns.env()`` holds
+the environment variables that point the backend and the ``api/`` entry points
+at the stand-ins; ``bench_load.py`` uses them to boot each app.
+
+Usage (serves until interrupted and prints that environment as JSON):
+    python benchmarks/standins.py
+    python benchmarks/standins.py --llm-tokens-per-second 40 --search-ms 800
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import json
+import random
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+_GEMINI_SERVICE = "google.ai.generativelanguage.v1beta.GenerativeService"
+_WORDS = (
+    "Rest, fluids and paracetamol usually ease symptoms within a few days; see a clinician "
+    "if fever persists beyond three days, breathing becomes difficult or symptoms worsen."
+).split()
+
+
+@dataclass
+class LatencyProfile:
+    """How long a stand-in LLM takes: a lognormal first-token delay, then a steady token rate."""
+
+    first_token_ms: float = 400.0
+    sigma: float = 0.5
+    tokens: int = 120
+    tokens_per_second: float = 200.0
+    chunk_tokens: int = 8  # tokens per streamed chunk
+
+    def first_token_delay(self, rng: random.Random) -> float:
+        return rng.lognormvariate(0, self.sigma) * self.first_token_ms / 1000
+
+    def chunks(self) -> List[str]:
+        words = [_WORDS[index % len(_WORDS)] for index in range(self.tokens)]
+        return [" ".join(words[start : start + self.chunk_tokens]) + " " for start in range(0, len(words), self.chunk_tokens)]
+
+    def chunk_delay(self) -> float:
+        return self.chunk_tokens / self.tokens_per_second
+
+
+def self_signed_certificate(directory: Path) -> Tuple[Path, bytes, bytes]:
+    """A certificate for localhost/127.0.0.1; returns (PEM path, certificate PEM, key PEM)."""
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    certificate_pem = certificate.public_bytes(serialization.Encoding.PEM)
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    path = directory / "standin-ca.pem"
+    path.write_bytes(certificate_pem)
+    return path, certificate_pem, key_pem
+
+
+class RespStore:
+    """The data behind the Redis stand-in: strings and hashes with optional expiry."""
+
+    def __init__(self, clock=time.monotonic) -> None:
+        self.clock = clock
+        self.data: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+
+    def _live(self, key: str) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= self.clock():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _expire(self, key: str, seconds: float) -> int:
+        if not self._live(key):
+            return 0
+        self.expires[key] = self.clock() + seconds
+        return 1
+
+    def execute(self, command: str, args: List[str]) -> Any:
+        """Run one command; returns the reply, or raises ``ValueError`` for an error reply."""
+
+        name = command.upper()
+        if name == "PING":
+            return ("simple", "PONG")
+        if name in ("CLIENT", "SELECT", "AUTH"):
+            return ("simple", "OK")
+        if name == "GET":
+            return self.data[args[0]] if self._live(args[0]) else None
+        if name == "SET":
+            return self._set(args)
+        if name in ("SETEX", "PSETEX"):
+            key, ttl, value = args
+            self.data[key] = value
+            self.expires[key] = self.clock() + float(ttl) / (1000 if name == "PSETEX" else 1)
+            return ("simple", "OK")
+        if name in ("DEL", "UNLINK"):
+            removed = sum(1 for key in args if self._live(key))
+            for key in args:
+                self.data.pop(key, None)
+                self.expires.pop(key, None)
+            return removed
+        if name == "EXISTS":
+            return sum(1 for key in args if self._live(key))
+        if name in ("EXPIRE", "PEXPIRE"):
+            return self._expire(args[0], float(args[1]) / (1000 if name == "PEXPIRE" else 1))
+        if name == "HSET":
+            self._live(args[0])  # drops an expired hash first
+            fields = self.data.setdefault(args[0], {})
+            added = 0
+            for field, value in zip(args[1::2], args[2::2]):
+                added += field not in fields
+                fields[field] = value
+            return added
+        if name == "HGET":
+            return self.data[args[0]].get(args[1]) if self._live(args[0]) else None
+        if name == "HMGET":
+            fields = self.data[args[0]] if self._live(args[0]) else {}
+            return [fields.get(field) for field in args[1:]]
+        if name == "FLUSHALL":
+            self.data.clear()
+            self.expires.clear()
+            return ("simple", "OK")
+        raise ValueError(f"ERR unknown or unsupported command '{command}' in the Redis stand-in")
+
+    def _set(self, args: List[str]) -> Any:
+        key, value, options = args[0], args[1], [option.upper() for option in args[2:]]
+        exists = self._live(key)
+        if ("NX" in options and exists) or ("XX" in options and not exists):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        for unit, scale in (("EX", 1), ("PX", 1000)):
+            if unit in options:
+                self.expires[key] = self.clock() + float(args[2 + options.index(unit) + 1]) / scale
+        return ("simple", "OK")
+
+
+def _encode_reply(reply: Any) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, tuple):
+        return f"+{reply[1]}\r\n".encode()
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, list):
+        return f"*{len(reply)}\r\n".encode() + b"".join(_encode_reply(item) for item in reply)
+    data = reply.encode() if isinstance(reply, str) else reply
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+class StandIns:
+    """Gemini, OpenRouter, Tavily and Redis stand-ins sharing one event loop.
+
+    Use ``async with StandIns(...)`` inside a loop, or ``start_in_thread()`` to
+    give them a loop of their own (so the load generator does not slow them down).
+    ``calls`` counts requests per service.
+    """
+
+    def __init__(
+        self,
+        profile: Optional[LatencyProfile] = None,
+        search_ms: float = 300.0,
+        search_sigma: float = 0.4,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+    ) -> None:
+        self.profile = profile or LatencyProfile()
+        self.search_ms = search_ms
+        self.search_sigma = search_sigma
+        self.host = host
+        self.rng = random.Random(seed)
+        self.calls: Counter = Counter()
+        self.store = RespStore()
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="mediverse-standins-")
+        self._grpc_server: Any = None
+        self._http_server: Any = None
+        self._http_task: Optional[asyncio.Task] = None
+        self._redis_server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.ca_path: Optional[Path] = None
+        self.grpc_port = self.http_port = self.redis_port = 0
+
+    def env(self) -> Dict[str, str]:
+        """Environment for an app process that should use these stand-ins."""
+
+        return {
+            "GEMINI_API_KEY": "stand-in",
+            "GEMINI_API_ENDPOINT": f"localhost:{self.grpc_port}",
+            "GRPC_DEFAULT_SSL_ROOTS_FILE_PATH": str(self.ca_path),
+            "OPENROUTER_API_KEY": "stand-in",
+            "OPENROUTER_BASE_URL": f"http://{self.host}:{self.http_port}/v1",
+            "TAVILY_API_KEY": "stand-in",
+            "TAVILY_BASE_URL": f"http://{self.host}:{self.http_port}",
+            "TAVILY_HTTP2": "false",
+            "REDIS_URL": f"redis://{self.host}:{self.redis_port}/0",
+        }
+
+    async def __aenter__(self) -> "StandIns":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        await self._start_gemini()
+        await self._start_http()
+        self._redis_server = await asyncio.start_server(self._serve_redis, self.host, 0)
+        self.redis_port = self._redis_server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._redis_server is not None:
+            self._redis_server.close()
+            await self._redis_server.wait_closed()
+        if self._http_server is not None:
+            self._http_server.should_exit = True
+            await self._http_task
+        if self._grpc_server is not None:
+            await self._grpc_server.stop(None)
+        self._tmpdir.cleanup()
+
+    def start_in_thread(self) -> "StandIns":
+        started = threading.Event()
+        failure: List[BaseException] = []
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.start())
+            except BaseException as exc:  # surfaced to the caller below
+                failure.append(exc)
+                started.set()
+                return
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="standins", daemon=True)
+        self._thread.start()
+        started.wait()
+        if failure:
+            raise failure[0]
+        return self
+
+    def stop_thread(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+
+    # Gemini (gRPC)
+
+    async def _start_gemini(self) -> None:
+        import google.ai.generativelanguage as glm
+        import grpc
+
+        self.ca_path, certificate_pem, key_pem = self_signed_certificate(Path(self._tmpdir.name))
+
+        def response(text: str, done: bool) -> Any:
+            return glm.GenerateContentResponse(
+                candidates=[
+                    glm.Candidate(
+                        content=glm.Content(parts=[glm.Part(text=text)], role="model"),
+                        finish_reason=glm.Candidate.FinishReason.STOP if done else None,
+                        index=0,
+                    )
+                ]
+            )
+
+        async def generate_content(request: Any, context: Any) -> Any:
+            self.calls["gemini"] += 1
+            chunks = self.profile.chunks()
+            await asyncio.sleep(self.profile.first_token_delay(self.rng) + len(chunks) * self.profile.chunk_delay())
+            return response("".join(chunks), done=True)
+
+        async def stream_generate_content(request: Any, context: Any):
+            self.calls["gemini_stream"] += 1
+            chunks = self.profile.chunks()
+            await asyncio.sleep(self.profile.first_token_delay(self.rng))
+            for index, chunk in enumerate(chunks):
+                yield response(chunk, done=index == len(chunks) - 1)
+                await asyncio.sleep(self.profile.chunk_delay())
+
+        codec = {
+            "request_deserializer": glm.GenerateContentRequest.deserialize,
+            "response_serializer": glm.GenerateContentResponse.serialize,
+        }
+        handler = grpc.method_handlers_generic_handler(
+            _GEMINI_SERVICE,
+            {
+                "GenerateContent": grpc.unary_unary_rpc_method_handler(generate_content, **codec),
+                "StreamGenerateContent": grpc.unary_stream_rpc_method_handler(stream_generate_content, **codec),
+            },
+        )
+        self._grpc_server = grpc.aio.server()
+        self._grpc_server.add_generic_rpc_handlers((handler,))
+        self.grpc_port = self._grpc_server.add_secure_port(
+            f"{self.host}:0", grpc.ssl_server_credentials([(key_pem, certificate_pem)])
+        )
+        await self._grpc_server.start()
+
+    # OpenRouter and Tavily (HTTP)
+
+    async def _start_http(self) -> None:
+        import uvicorn
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, 0))
+        self.http_port = sock.getsockname()[1]
+        config = uvicorn.Config(self._http_app, interface="asgi3", lifespan="off", log_level="warning", access_log=False)
+        self._http_server = uvicorn.Server(config)
+        self._http_task = asyncio.create_task(self._http_server.serve(sockets=[sock]))
+        while not self._http_server.started:
+            await asyncio.sleep(0.01)
+
+    async def _http_app(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        if scope["path"].endswith("/chat/completions"):
+            request = json.loads(body or b"{}")
+            if request.get("stream"):
+                await self._openai_stream(request, send)
+            else:
+                await self._openai_completion(request, send)
+        elif scope["path"] == "/search":
+            await self._tavily_search(json.loads(body or b"{}"), send)
+        else:
+            await _send_json(send, 404, {"error": f"no stand-in for {scope['path']}"})
+
+    async def _openai_completion(self, request: Dict[str, Any], send: Any) -> None:
+        self.calls["openrouter"] += 1
+        chunks = self.profile.chunks()
+        await asyncio.sleep(self.profile.first_token_delay(self.rng) + len(chunks) * self.profile.chunk_delay())
+        await _send_json(
+            send,
+            200,
+            {
+                "id": "chatcmpl-standin",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stand-in"),
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": "".join(chunks)}, "finish_reason": "stop"}
+                ],
+                "usage": {"prompt_tokens": 0, "completion_tokens": self.profile.tokens, "total_tokens": self.profile.tokens},
+            },
+        )
+
+    async def _openai_stream(self, request: Dict[str, Any], send: Any) -> None:
+        self.calls["openrouter_stream"] += 1
+        await asyncio.sleep(self.profile.first_token_delay(self.rng))
+        await send(
+            {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]}
+        )
+        base = {"id": "chatcmpl-standin", "object": "chat.completion.chunk", "created": int(time.time())}
+        base["model"] = request.get("model", "stand-in")
+        chunks = self.profile.chunks()
+        for index, chunk in enumerate(chunks):
+            finish = "stop" if index == len(chunks) - 1 else None
+            event = {**base, "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": finish}]}
+            await send({"type": "http.response.body", "body": f"data: {json.dumps(event)}\n\n".encode(), "more_body": True})
+            await asyncio.sleep(self.profile.chunk_delay())
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+    async def _tavily_search(self, request: Dict[str, Any], send: Any) -> None:
+        self.calls["tavily"] += 1
+        await asyncio.sleep(self.rng.lognormvariate(0, self.search_sigma) * self.search_ms / 1000)
+        query = request.get("query", "")
+        results = [
+            {
+                "title": f"Clinical guidance {index + 1} for {query[:40]}",
+                "url": f"https://guidelines.example.org/{index + 1}",
+                "content": "Evidence-based recommendations from a national guideline. " * 6,
+                "score": round(0.95 - index * 0.05, 2),
+                "raw_content": None,
+            }
+            for index in range(int(request.get("max_results") or 5))
+        ]
+        await _send_json(send, 200, {"query": query, "results": results, "response_time": 0.0})
+
+    # Redis (RESP)
+
+    async def _serve_redis(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                if not header.startswith(b"*"):
+                    command = header.decode().split()  # inline command, e.g. from redis-cli
+                else:
+                    command = []
+                    for _ in range(int(header[1:])):
+                        length = int((await reader.readline())[1:])
+                        command.append((await reader.readexactly(length + 2))[:-2].decode())
+                if not command:
+                    continue
+                self.calls["redis"] += 1
+                try:
+                    reply = _encode_reply(self.store.execute(command[0], command[1:]))
+                except (ValueError, IndexError) as exc:
+                    reply = f"-{exc or 'ERR wrong number of arguments'}\r\n".encode()
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _send_json(send: Any, status: int, payload: Dict[str, Any]) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """The stand-in latency options, shared with ``bench_load.py``."""
+
+    parser.add_argument("--llm-first-token-ms", type=float, default=400.0, help="median first-token delay")
+    parser.add_argument("--llm-sigma", type=float, default=0.5, help="lognormal shape of the first-token delay")
+    parser.add_argument("--llm-tokens", type=int, default=120, help="tokens per reply")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--search-ms", type=float, default=300.0, help="median Tavily latency")
+    parser.add_argument("--search-sigma", type=float, default=0.4)
+    parser.add_argument("--seed", type=int, default=7)
+
+
+def standins_from_args(args: argparse.Namespace) -> StandIns:
+    profile = LatencyProfile(
+        first_token_ms=args.llm_first_token_ms,
+        sigma=args.llm_sigma,
+        tokens=args.llm_tokens,
+        tokens_per_second=args.llm_tokens_per_second,
+    )
+    return StandIns(profile, search_ms=args.search_ms, search_sigma=args.search_sigma, seed=args.seed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    standins = standins_from_args(args).start_in_thread()
+    print(json.dumps(standins.env(), indent=2), flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standins.stop_thread()
+
+
+if __name__ == "__main__":
+    main()
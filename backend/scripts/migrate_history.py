@@ -0,0 +1,103 @@
+"""Upgrade an existing ``medical_queries`` table for the indexed /history endpoint.
+
+Adds the ``mode`` and ``response_preview`` columns and the ``(..., created_at, id)``
+indexes, then backfills older rows: the mode is parsed out of the legacy
+"[DEEP SEARCH] ..." query prefix (which is stripped), and the preview is cut from
+the stored response. Safe to re-run; rows are backfilled in batches.
+
+Usage (loads variables from .env):
+    python -m dotenv run -- python scripts/migrate_history.py
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+from pathlib import Path
+
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.exc import SQLAlchemyError
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.models.database import (  # noqa: E402  (import after sys.path setup)
+    RESPONSE_PREVIEW_LENGTH, MedicalQuery, engine, response_preview)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LEGACY_MODE_PREFIXES = {
+    "[QUICK CONSULT] ": "quick",
+    "[IMAGE ANALYSIS] ": "image",
+    "[DEEP SEARCH] ": "deep_search",
+    "[EXPERT MODE] ": "expert",
+}
+BATCH_SIZE = 1000
+
+
+def add_columns() -> None:
+    existing = {column["name"] for column in inspect(engine).get_columns(MedicalQuery.__tablename__)}
+    with engine.begin() as conn:
+        if "mode" not in existing:
+            conn.execute(text("ALTER TABLE medical_queries ADD COLUMN mode VARCHAR(32)"))
+        if "response_preview" not in existing:
+            conn.execute(
+                text(f"ALTER TABLE medical_queries ADD COLUMN response_preview VARCHAR({RESPONSE_PREVIEW_LENGTH + 3})")
+            )
+
+
+def create_indexes() -> None:
+    existing = {index["name"] for index in inspect(engine).get_indexes(MedicalQuery.__tablename__)}
+    if "ix_medical_queries_user_id" in existing:
+        # Superseded by the (user_id, created_at, id) index
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_medical_queries_user_id"))
+    for index in MedicalQuery.__table__.indexes:
+        if index.name not in existing:
+            logger.info("Creating index %s", index.name)
+            index.create(bind=engine)
+
+
+def backfill() -> int:
+    migrated = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(MedicalQuery.id, MedicalQuery.query, MedicalQuery.response)
+                .where(MedicalQuery.id > last_id, MedicalQuery.response_preview.is_(None))
+                .order_by(MedicalQuery.id)
+                .limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                return migrated
+
+            for row in rows:
+                values = {"response_preview": response_preview(row.response)}
+                for prefix, mode in LEGACY_MODE_PREFIXES.items():
+                    if row.query.startswith(prefix):
+                        values.update(mode=mode, query=row.query[len(prefix):])
+                        break
+                conn.execute(update(MedicalQuery).where(MedicalQuery.id == row.id).values(**values))
+            last_id = rows[-1].id
+            migrated += len(rows)
+            logger.info("Backfilled %d rows", migrated)
+
+
+def main() -> None:
+    logger.info("Migrating query history schema using %s", engine.url)
+    try:
+        add_columns()
+        create_indexes()
+        migrated = backfill()
+    except SQLAlchemyError as exc:
+        logger.exception("Failed to migrate query history: %s", exc)
+        raise SystemExit(1) from exc
+
+    logger.info("Query history migration complete (%d rows backfilled).", migrated)
+
+
+if __name__ == "__main__":
+    main()
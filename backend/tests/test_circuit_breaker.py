@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import pytest
+from app.utils.circuit_breaker import (CircuitBreaker, CircuitBreakingRedis,
+                                       CircuitOpenError)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _fail() -> None:
+    raise ConnectionError("upstream down")
+
+
+async def _ok() -> str:
+    return "ok"
+
+
+@pytest.mark.anyio
+async def test_opens_on_failure_rate_then_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker("dep", failure_rate=0.5, min_calls=4, open_seconds=10, clock=clock)
+    calls = []
+
+    async def tracked():
+        calls.append(1)
+        return await _ok()
+
+    await breaker.call(_ok)
+    await breaker.call(_ok)
+    for _ in range(2):
+        assert breaker.state == "closed"  # below min_calls
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+    assert breaker.state == "open"  # 2 of 4 failed
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        await breaker.call(tracked)
+    assert calls == [] and excinfo.value.retry_after == pytest.approx(10)
+
+    clock.now += 10
+    assert breaker.state == "half_open"
+    with pytest.raises(ConnectionError):
+        await breaker.call(_fail)  # failed probe reopens
+    assert breaker.state == "open"
+
+    clock.now += 10
+    assert await breaker.call(tracked) == "ok"
+    assert breaker.state == "closed" and calls == [1]
+
+
+@pytest.mark.anyio
+async def test_old_outcomes_leave_the_rolling_window():
+    clock = FakeClock()
+    breaker = CircuitBreaker("dep", failure_rate=0.5, min_calls=2, window_seconds=30, clock=clock)
+
+    with pytest.raises(ConnectionError):
+        await breaker.call(_fail)
+    clock.now += 31
+    await breaker.call(_ok)
+    await breaker.call(_ok)
+
+    assert breaker.state == "closed"
+
+
+@pytest.mark.anyio
+async def test_timeout_follows_latency_quantile_and_counts_as_failure():
+    breaker = CircuitBreaker(
+        "dep", min_calls=1, failure_rate=0.1, timeout_multiplier=2, min_timeout=0.01, max_timeout=5, min_latency_samples=5
+    )
+    assert breaker.timeout() == 5  # not enough samples yet
+    for seconds in (0.01, 0.01, 0.02, 0.02, 0.02):
+        breaker.record_success(seconds)
+    assert breaker.timeout() == pytest.approx(0.04)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await breaker.call(hang)
+
+    assert time.monotonic() - started < 1
+    assert breaker.state == "open"
+
+
+@pytest.mark.anyio
+async def test_stream_records_outcome_and_rejects_when_open():
+    breaker = CircuitBreaker("llm", min_calls=2, failure_rate=0.5)
+
+    async def tokens():
+        yield "a"
+        yield "b"
+
+    async def broken():
+        yield "a"
+        raise ConnectionError("reset")
+
+    assert [chunk async for chunk in breaker.stream(tokens)] == ["a", "b"]
+    with pytest.raises(ConnectionError):
+        [chunk async for chunk in breaker.stream(broken)]
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        [chunk async for chunk in breaker.stream(tokens)]
+
+
+class HangingRedis:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def get(self, key: str):
+        self.calls += 1
+        await asyncio.sleep(10)
+
+    async def setex(self, key: str, ttl: int, value: str):
+        self.calls += 1
+        await asyncio.sleep(10)
+
+
+@pytest.mark.anyio
+async def test_cache_lookups_are_skipped_while_redis_is_open(monkeypatch):
+    from app.services.search_service import MedicalSearchService
+
+    monkeypatch.setattr(MedicalSearchService, "_create_redis_client", lambda self: None)
+    service = MedicalSearchService()
+    redis = HangingRedis()
+    breaker = CircuitBreaker("redis", min_calls=2, failure_rate=0.5, max_timeout=0.05)
+    service._redis = CircuitBreakingRedis(redis, breaker)
+
+    assert await service._fetch_cache("k1") is None
+    await service._persist_cache("k2", {"results": []})
+    assert breaker.state == "open" and redis.calls == 2
+
+    started = time.monotonic()
+    for i in range(50):
+        assert await service._fetch_cache(f"miss-{i}") is None
+
+    assert redis.calls == 2
+    assert time.monotonic() - started < 0.05
+
+
+def test_open_circuit_maps_to_503(monkeypatch):
+    from app.api import endpoints
+    from app.main import app
+    from fastapi.testclient import TestClient
+
+    async def fake_search(query: str, mode: str = "quick"):
+        return {"results": [], "context": "", "query": query}
+
+    async def unavailable(*args, **kwargs):
+        raise CircuitOpenError("gemini", 7.2)
+
+    monkeypatch.setattr(endpoints.search_service, "search_medical_info", fake_search)
+    monkeypatch.setattr(endpoints.ai_service, "generate_response", unavailable)
+
+    response = TestClient(app).post("/api/v1/query", json={"query": "What helps with a sore throat?"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
@@ -0,0 +1,105 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from app.utils.lazy import LazyObject, is_built, lazy_imports, resolve
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+
+# Cumulative `python -X importtime` cost of importing the app, in milliseconds.
+# About 1s on a laptop; it was ~4.7s while langchain loaded at import time.
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", "2500"))
+
+# Only needed once a request (or the warmup hook) builds the services
+DEFERRED_MODULES = ("langchain", "langchain_openai", "langchain_google_genai", "google.generativeai", "tavily", "httpx")
+
+_IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)")
+
+
+def _import_times(module: str) -> dict:
+    env = {
+        **os.environ,
+        "GEMINI_API_KEY": "import-time-test",
+        "TAVILY_API_KEY": "import-time-test",
+        "SECRET_KEY": "import-time-test",
+        "DATABASE_URL": "sqlite://",
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {match.group(2): int(match.group(1)) for match in map(_IMPORT_LINE.match, result.stderr.splitlines()) if match}
+
+
+def test_app_import_stays_within_cold_start_budget():
+    times = _import_times("app.main")
+
+    assert not [name for name in DEFERRED_MODULES if name in times]
+    cumulative_ms = times["app.main"] / 1000
+    assert cumulative_ms <= IMPORT_TIME_BUDGET_MS, f"importing app.main took {cumulative_ms:.0f}ms"
+
+
+def test_lazy_object_builds_once_on_first_use():
+    built = []
+
+    class Service:
+        def __init__(self) -> None:
+            built.append(self)
+            self.name = "search"
+
+    lazy = LazyObject(Service)
+    assert not is_built(lazy) and built == []
+
+    assert lazy.name == "search"
+    lazy.name = "patched"
+
+    assert resolve(lazy) is built[0] and len(built) == 1
+    assert built[0].name == "patched"
+
+
+def test_lazy_imports_load_on_demand_and_respect_patches():
+    namespace = {"__name__": "fake_module"}
+    load = lazy_imports(namespace, {"dumps": ("json", "dumps")})
+
+    assert "dumps" not in namespace
+    assert load("dumps")({"a": 1}) == '{"a": 1}'
+    namespace["dumps"] = repr  # what monkeypatch.setattr does to a module global
+    assert load("dumps") is repr
+
+
+def test_startup_warmup_runs_off_the_event_loop(monkeypatch):
+    import asyncio
+    import threading
+    import time
+
+    from app import main
+    from fastapi.testclient import TestClient
+
+    warmed = threading.Event()
+    on_loop = []
+
+    def fake_warmup():
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        time.sleep(0.2)  # a slow build must not hold up requests
+        warmed.set()
+        return {}
+
+    monkeypatch.setattr(main.settings, "WARMUP_ON_STARTUP", True)
+    monkeypatch.setattr(main, "warmup", fake_warmup)
+
+    with TestClient(main.app) as client:
+        assert client.get("/health").status_code == 200
+        assert not warmed.is_set()
+        assert warmed.wait(5)
+
+    assert on_loop == [False]
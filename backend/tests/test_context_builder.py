@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+
+import pytest
+from app.services.context_builder import (NO_CONTEXT, ContextBuilder,
+                                          estimate_tokens)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "tavily"
+
+CASES = [
+    ("influenza_treatment.json", "How is seasonal influenza treated?"),
+    ("angina_types.json", "What is the difference between stable and unstable angina?"),
+]
+
+
+def _legacy_context(results):
+    # What MedicalSearchService used to send: the first five snippets, 1000 chars each
+    return "\n\n".join(f"Source: {r['title']}\n{r['content'][:1000]}..." for r in results[:5])
+
+
+@pytest.mark.parametrize("fixture, query", CASES)
+def test_context_fits_budget_and_shrinks_prompt(fixture, query):
+    results = json.loads((FIXTURES / fixture).read_text())["results"]
+    builder = ContextBuilder({"quick": 500, "deep_search": 1500})
+
+    quick = builder.build(query, results, "quick")
+    deep = builder.build(query, results, "deep_search")
+    legacy = estimate_tokens(_legacy_context(results))
+
+    assert estimate_tokens(quick) <= 500
+    assert estimate_tokens(quick) <= 0.6 * legacy
+    assert estimate_tokens(quick) < estimate_tokens(deep) <= 1500
+    # Nothing is cut mid-sentence
+    assert not any(block.endswith("...") for block in quick.split("\n\n"))
+
+
+def test_syndicated_copies_appear_once_and_relevant_sentences_win():
+    results = json.loads((FIXTURES / "influenza_treatment.json").read_text())["results"]
+    context = ContextBuilder({"deep_search": 1500}).build("How is seasonal influenza treated?", results, "deep_search")
+
+    assert context.count("They can lessen symptoms and shorten the time you are sick") == 1
+    # The WebMD and NIH pages only repeat the CDC text and are dropped as sources
+    assert "NIH News in Health" not in context
+    assert "Treating Flu with Antiviral Drugs" in context
+
+
+def test_sentences_are_ranked_against_the_query():
+    results = [
+        {"title": "A", "score": 0.9, "content": "Sleep hygiene improves rest. Regular exercise helps mood overall."},
+        {"title": "B", "score": 0.5, "content": "Migraine attacks respond to triptans taken early in the attack."},
+    ]
+    builder = ContextBuilder({"quick": 25})
+
+    context = builder.build("What treats a migraine attack?", results, "quick")
+
+    assert context.startswith("Source: B\nMigraine attacks respond to triptans")
+    assert builder.build("anything", [{"title": "Empty", "content": ""}]) == NO_CONTEXT
+
+
+@pytest.mark.anyio
+async def test_search_builds_the_context_once_per_call(monkeypatch):
+    from app.services.search_service import MedicalSearchService
+
+    monkeypatch.setattr(MedicalSearchService, "_create_redis_client", lambda self: None)
+    service = MedicalSearchService()
+    results = [{"title": "CDC", "content": "Antivirals shorten the flu.", "url": "https://cdc.gov", "score": 0.9}]
+
+    class FakeTavily:
+        async def search(self, query, **kwargs):
+            return {"query": query, "results": results}
+
+    service.client = FakeTavily()
+    builds = []
+    build = service.context_builder.build
+    monkeypatch.setattr(service.context_builder, "build", lambda *args: builds.append(args[2]) or build(*args))
+
+    searched = await service.search_medical_info("flu treatment", mode="deep_search")
+    cached = await service.search_medical_info("flu treatment", mode="quick")
+
+    assert builds == ["deep_search", "quick"]
+    assert "Antivirals shorten the flu." in searched["context"] and cached["results"] == searched["results"]
+    assert "context" not in service._l1.get(service._cache_key("flu treatment", service.settings.MAX_SEARCH_RESULTS))
@@ -0,0 +1,107 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import pytest
+from app.services.context_builder import estimate_tokens
+from app.services.conversation_memory import ConversationStore
+
+
+@pytest.mark.anyio
+async def test_sessions_are_isolated_and_stateless_without_id():
+    store = ConversationStore()
+    await store.append("alice", "What causes migraines?", "Triggers include stress and poor sleep.")
+    await store.append(None, "Ignored question", "Ignored answer")
+
+    history = await store.load_history("alice")
+    assert "User: What causes migraines?" in history
+    assert "Assistant: Triggers include stress and poor sleep." in history
+    assert await store.load_history("bob") == ""
+    assert await store.load_history(None) == ""
+
+
+@pytest.mark.anyio
+async def test_history_stays_within_token_budget_and_rolls_into_summary():
+    store = ConversationStore(history_token_budget=300, summary_token_budget=80)
+    long_answer = "Hydration matters. " + "Drink water regularly and rest well. " * 200
+
+    sizes = []
+    for turn in range(50):
+        await store.append("s", f"Follow-up question number {turn} about dehydration", long_answer)
+        sizes.append(estimate_tokens(await store.load_history("s")))
+
+    history = await store.load_history("s")
+    assert max(sizes) <= 300
+    assert sizes[-1] == pytest.approx(sizes[10], abs=20)  # flat, not growing with turns
+    assert history.startswith("Summary of earlier conversation: ")
+    assert "number 49" in history
+    assert "Hydration matters." in history.split("\n")[0]
+
+
+@pytest.mark.anyio
+async def test_least_recent_sessions_are_evicted():
+    store = ConversationStore(max_sessions=2)
+    for session in ("a", "b", "c"):
+        await store.append(session, "question", "answer")
+
+    assert await store.load_history("a") == ""
+    assert await store.load_history("c") != ""
+
+
+class InterleavingRedis:
+    """get/setex plus the compare-and-set script, yielding to other tasks on every call."""
+
+    def __init__(self) -> None:
+        self.store: Dict[str, str] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        await asyncio.sleep(0)
+        return self.store.get(key)
+
+    def register_script(self, script: str):
+        async def compare_and_set(keys: List[str], args: List[Any]) -> int:
+            await asyncio.sleep(0)
+            if self.store.get(keys[0], "") != args[0]:
+                return 0
+            self.store[keys[0]] = args[2]
+            return 1
+
+        return compare_and_set
+
+
+@pytest.mark.anyio
+async def test_concurrent_turns_in_a_shared_session_are_all_kept():
+    redis = InterleavingRedis()
+    workers = [ConversationStore(redis_client=redis) for _ in range(2)]
+
+    await asyncio.gather(
+        *(workers[turn % 2].append("s", f"question {turn}", f"answer {turn}") for turn in range(4))
+    )
+
+    history = await workers[0].load_history("s")
+    assert sorted(line for line in history.split("\n") if line.startswith("User:")) == [
+        f"User: question {turn}" for turn in range(4)
+    ]
+
+@pytest.mark.anyio
+async def test_service_threads_history_per_session(monkeypatch):
+    from app.services.ai_service import MedicalAIService
+
+    monkeypatch.setattr(MedicalAIService, "_create_redis_client", lambda self: None)
+    service = MedicalAIService()
+    seen_history: List[str] = []
+
+    async def fake_invoke_llm(llm: Any, query: str, search_context: Optional[str], chat_history: str = "") -> str:
+        seen_history.append(chat_history)
+        return f"Answer to {query}"
+
+    monkeypatch.setattr(service, "_invoke_llm", fake_invoke_llm)
+
+    await service.generate_response("What are symptoms of asthma?", session_id="patient-1")
+    await service.generate_response("And how is it treated?", session_id="patient-1")
+    await service.generate_response("And how is it treated?", session_id="patient-2")
+
+    assert seen_history[0] == ""
+    assert "User: What are symptoms of asthma?" in seen_history[1]
+    # Same follow-up in a fresh session must not reuse the first session's answer
+    assert seen_history[2] == ""
+    assert len(seen_history) == 3
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from typing import Any, Dict
+
+import pytest
+from app.main import app
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.deadline import Deadline, DeadlineExceeded, deadline_scope
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def slow_search(monkeypatch):
+    from app.api import endpoints
+
+    seen: Dict[str, Any] = {}
+
+    async def fake_search(query: str, mode: str = "quick") -> Dict[str, Any]:
+        await asyncio.sleep(5)
+        return {"results": [], "context": "late context", "query": query}
+
+    async def fake_generate_response(query: str, search_context: str = None, mode: str = "quick", session_id=None):
+        seen["search_context"] = search_context
+        return {"response": "Rest and fluids.", "confidence_score": 0.7, "model_used": "gemini-pro"}
+
+    monkeypatch.setattr(endpoints.search_service, "search_medical_info", fake_search)
+    monkeypatch.setattr(endpoints.ai_service, "generate_response", fake_generate_response)
+    monkeypatch.setattr(endpoints, "save_query_to_db", lambda **kwargs: None)
+    yield seen
+
+
+def test_deep_search_answers_without_context_when_search_overruns(slow_search):
+    started = time.monotonic()
+    response = client.post(
+        "/api/v1/analyze",
+        data={"query": "How is seasonal influenza treated?", "mode": "deep_search"},
+        headers={"X-Request-Timeout": "1"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["degraded"] is True
+    assert slow_search["search_context"] == ""
+    assert time.monotonic() - started < 1  # search got its share (0.35s), not 5s
+
+
+def test_client_header_can_only_shorten_the_deadline():
+    from app.api.endpoints import _request_deadline
+    from starlette.requests import Request
+
+    def request(value: str) -> Request:
+        return Request({"type": "http", "headers": [(b"x-request-timeout", value.encode())]})
+
+    assert _request_deadline(request("3"), "deep_search").seconds == 3
+    assert _request_deadline(request("9999"), "deep_search").seconds == 50
+    assert _request_deadline(request("soon"), "quick").seconds == 25
+
+
+@pytest.mark.anyio
+async def test_deadline_caps_upstream_calls_without_tripping_the_breaker():
+    breaker = CircuitBreaker("dep", min_calls=1, failure_rate=0.1, max_timeout=10)
+
+    async def slow():
+        await asyncio.sleep(5)
+
+    with deadline_scope(Deadline(0.05)):
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            await breaker.call(slow)
+        assert time.monotonic() - started < 1
+        await asyncio.sleep(0.06)
+        with pytest.raises(DeadlineExceeded):
+            await breaker.call(slow)  # no time left: not even started
+
+    assert breaker.state == "closed"
+
+
+def test_exhausted_deadline_maps_to_504(monkeypatch):
+    from app.api import endpoints
+
+    async def fake_search(query: str, mode: str = "quick"):
+        return {"results": [], "context": "", "query": query}
+
+    async def out_of_time(*args, **kwargs):
+        raise DeadlineExceeded("request deadline reached while calling gemini")
+
+    monkeypatch.setattr(endpoints.search_service, "search_medical_info", fake_search)
+    monkeypatch.setattr(endpoints.ai_service, "generate_response", out_of_time)
+
+    response = client.post("/api/v1/query", json={"query": "What helps with a sore throat?"})
+
+    assert response.status_code == 504
@@ -0,0 +1,93 @@
+import asyncio
+from typing import List
+
+import pytest
+from app.utils.hedging import HEDGE_DECISIONS, HEDGE_WINNERS, Hedger
+
+
+class FakeLLM:
+    def __init__(self, model: str, first_token_delay: float, tokens: List[str]) -> None:
+        self.model = model
+        self.first_token_delay = first_token_delay
+        self.tokens = tokens
+        self.started = 0
+        self.closed = 0
+
+    async def astream(self, prompt: str):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.first_token_delay)
+            for token in self.tokens:
+                yield token
+        finally:
+            self.closed += 1
+
+
+async def _collect(stream) -> str:
+    return "".join([chunk async for chunk in stream])
+
+
+@pytest.mark.anyio
+async def test_fast_primary_is_not_hedged():
+    primary = FakeLLM("gemini", 0.0, ["fast ", "answer"])
+    backup = FakeLLM("openrouter", 0.0, ["backup"])
+    hedger = Hedger(delay=0.2)
+
+    name, stream = await hedger.race(lambda: primary.astream("p"), lambda: backup.astream("p"))
+
+    assert (name, await _collect(stream)) == ("primary", "fast answer")
+    assert backup.started == 0
+
+
+@pytest.mark.anyio
+async def test_slow_primary_is_hedged_and_loser_cancelled():
+    primary = FakeLLM("gemini", 5.0, ["slow"])
+    backup = FakeLLM("openrouter", 0.01, ["backup ", "answer"])
+    hedger = Hedger(delay=0.05)
+    fired = HEDGE_DECISIONS.labels("fired")._value.get()
+    wins = HEDGE_WINNERS.labels("openrouter")._value.get()
+
+    name, stream = await hedger.race(
+        lambda: primary.astream("p"), lambda: backup.astream("p"), "gemini", "openrouter"
+    )
+
+    assert (name, await _collect(stream)) == ("openrouter", "backup answer")
+    assert primary.closed == 1  # cancelled, not left running
+    assert HEDGE_DECISIONS.labels("fired")._value.get() == fired + 1
+    assert HEDGE_WINNERS.labels("openrouter")._value.get() == wins + 1
+
+
+@pytest.mark.anyio
+async def test_hedge_budget_and_latency_derived_delay():
+    hedger = Hedger(max_ratio=0.0, min_delay=0.01, max_delay=1.0, min_samples=5)
+    for seconds in (0.1, 0.2, 0.3, 0.4, 2.0):
+        hedger.observe(seconds)
+    assert hedger.delay() == 1.0  # p95 of the window, clamped to max_delay
+    hedger.observe(0.2)
+    hedger.fixed_delay = 0.02
+
+    slow = [FakeLLM("gemini", 0.1, ["a"]) for _ in range(2)]
+    backup = FakeLLM("openrouter", 0.0, ["b"])
+    first, _ = await hedger.race(lambda: slow[0].astream("p"), lambda: backup.astream("p"))
+    # The initial budget allows one hedge; with max_ratio=0 it never refills
+    second, stream = await hedger.race(lambda: slow[1].astream("p"), lambda: backup.astream("p"))
+
+    assert (first, second) == ("secondary", "primary")
+    assert await _collect(stream) == "a"
+    assert backup.started == 1
+
+
+@pytest.mark.anyio
+async def test_service_reports_the_model_that_answered(monkeypatch):
+    from app.services.ai_service import MedicalAIService
+
+    monkeypatch.setattr(MedicalAIService, "_create_redis_client", lambda self: None)
+    service = MedicalAIService()
+    service.llm = FakeLLM("gemini-flash", 5.0, ["slow"])
+    service._hedge_llm = FakeLLM("llama-70b", 0.0, ["Rest and ", "fluids."])
+    service._hedger = Hedger(delay=0.01)
+
+    payload = await service.generate_response("How should I treat a mild cold?")
+
+    assert payload["response"] == "Rest and fluids."
+    assert payload["model_used"] == "llama-70b"
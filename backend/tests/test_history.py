@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import pytest
+from app.main import app
+from app.models.database import MedicalQuery, SessionLocal, engine, response_preview
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, text
+
+client = TestClient(app)
+USER_ID = 4242
+
+
+@pytest.fixture
+def history_rows():
+    started = datetime(2024, 1, 1, 12, 0, 0)
+    modes = ["quick", "deep_search", "expert", "image"]
+    rows = []
+    for i in range(25):
+        response = f"Answer {i}. " + "detail " * 60
+        rows.append(
+            MedicalQuery(
+                user_id=USER_ID,
+                mode=modes[i % 4],
+                query=f"question {i}",
+                response=response,
+                # Legacy rows have no stored preview
+                response_preview=None if i == 0 else response_preview(response),
+                confidence_score=0.5,
+                sources="[]",
+                # Pairs of rows share a timestamp so the id tie-break matters
+                created_at=started + timedelta(minutes=i // 2),
+            )
+        )
+    with SessionLocal() as session:
+        session.add_all(rows)
+        session.commit()
+    yield
+    with SessionLocal() as session:
+        session.execute(delete(MedicalQuery).where(MedicalQuery.user_id == USER_ID))
+        session.commit()
+
+
+def test_history_pages_through_every_row_newest_first(history_rows):
+    seen = []
+    cursor = None
+    while True:
+        params = {"user_id": USER_ID, "limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/history", params=params)
+        assert response.status_code == 200
+        seen.extend(item["query"] for item in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert seen == [f"question {i}" for i in reversed(range(25))]
+
+
+def test_history_filters_by_mode_and_returns_previews(history_rows):
+    response = client.get("/api/v1/history", params={"user_id": USER_ID, "mode": "quick", "limit": 50})
+    items = response.json()
+
+    assert [item["query"] for item in items] == [f"question {i}" for i in (24, 20, 16, 12, 8, 4, 0)]
+    assert {item["mode"] for item in items} == {"quick"}
+    assert items[0]["response_preview"].endswith("...")
+    assert len(items[0]["response_preview"]) == 203
+    # Legacy row: preview computed in SQL
+    assert items[-1]["response_preview"].startswith("Answer 0. detail")
+    assert "x-next-cursor" not in response.headers
+
+
+def test_history_rejects_malformed_cursor():
+    response = client.get("/api/v1/history", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_history_queries_use_keyset_indexes():
+    def plan(where: str) -> str:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    "EXPLAIN QUERY PLAN SELECT id FROM medical_queries "
+                    f"{where} ORDER BY created_at DESC, id DESC LIMIT 11"
+                )
+            ).all()
+        return " ".join(str(row[-1]) for row in rows)
+
+    assert "ix_medical_queries_created_at_id" in plan("WHERE (created_at, id) < ('2024-01-01', 5)")
+    assert "ix_medical_queries_user_created_at" in plan("WHERE user_id = 1")
+    assert "ix_medical_queries_mode_created_at" in plan("WHERE mode = 'quick'")
+    assert "TEMP B-TREE" not in plan("WHERE user_id = 1")
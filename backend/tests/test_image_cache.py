@@ -0,0 +1,139 @@
+import random
+from io import BytesIO
+from typing import Any, List
+
+import pytest
+from app.services.image_cache import ImageResultCache, hamming_distance
+from app.services.image_processing import image_dhash, preprocess_image
+from PIL import Image, ImageDraw
+
+
+def _scan(seed: int = 0) -> Image.Image:
+    rng = random.Random(seed)
+    img = Image.new("L", (800, 600), 20)
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randint(0, 700), rng.randint(0, 500)
+        draw.ellipse((x, y, x + rng.randint(40, 200), y + rng.randint(40, 200)), fill=rng.randint(60, 250))
+    return img
+
+
+def _jpeg(img: Image.Image, quality: int = 90) -> bytes:
+    buffer = BytesIO()
+    img.convert("RGB").save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def test_multi_index_lookup_matches_brute_force():
+    rng = random.Random(3)
+    cache = ImageResultCache(max_distance=6)
+    hashes = {f"key-{index}": rng.getrandbits(64) for index in range(5000)}
+    for cache_key, image_hash in hashes.items():
+        cache.add("chest x-ray", image_hash, cache_key)
+
+    for _ in range(200):
+        # Probes at every distance from 0 to 8 bits away from a stored hash
+        target = rng.choice(list(hashes.values()))
+        probe = target
+        for bit in rng.sample(range(64), rng.randint(0, 8)):
+            probe ^= 1 << bit
+
+        closest = min(hamming_distance(probe, value) for value in hashes.values())
+        match = cache.lookup("chest x-ray", probe)
+        if closest <= 6:
+            assert match.distance == closest
+        else:
+            assert match is None
+
+
+def test_dhash_tolerates_recompression_and_rescaling():
+    original = _scan()
+    copy = Image.open(BytesIO(_jpeg(original.resize((640, 480)), quality=50)))
+
+    assert hamming_distance(image_dhash(original), image_dhash(copy)) <= 6
+    assert hamming_distance(image_dhash(original), image_dhash(_scan(seed=1))) > 12
+
+    # Passthrough uploads are hashed from a reduced decode and still agree
+    prepared = preprocess_image(_jpeg(original))
+    assert hamming_distance(prepared.dhash, image_dhash(original)) <= 6
+
+
+def test_matches_are_scoped_to_the_normalized_query():
+    cache = ImageResultCache(max_distance=6)
+    cache.add("Is there a fracture?", 0xF0F0, "key-fracture")
+
+    assert cache.lookup("is there a fracture", 0xF0F1).cache_key == "key-fracture"
+    assert cache.lookup("is there a fracture", 0xF0F1).distance == 1
+    assert cache.lookup("Is there pneumonia?", 0xF0F0) is None
+    assert cache.lookup("is there a fracture", 0x0F0F) is None
+
+
+def test_index_is_bounded_and_supports_invalidation():
+    cache = ImageResultCache(max_entries=2)
+    hashes = [0, 0xFFFFFFFF00000000, 0x00000000FFFFFFFF]
+    for index, image_hash in enumerate(hashes):
+        cache.add("fracture", image_hash, f"k{index}")
+
+    assert len(cache) == 2
+    assert cache.lookup("fracture", hashes[0]) is None
+    cache.invalidate("k1")
+    assert cache.lookup("fracture", hashes[1]) is None
+    assert cache.lookup("fracture", hashes[2]).cache_key == "k2"
+
+
+def _vision_service(monkeypatch, calls: List[Any]):
+    import google.generativeai as genai
+    from app.services.ai_service import MedicalAIService
+
+    class FakeResponse:
+        text = "No fracture is visible; soft tissue appears normal."
+
+    class FakeModel:
+        def __init__(self, model_name: str) -> None:
+            pass
+
+        async def generate_content_async(self, contents: Any) -> FakeResponse:
+            calls.append(contents)
+            return FakeResponse()
+
+    monkeypatch.setattr(MedicalAIService, "_create_redis_client", lambda self: None)
+    monkeypatch.setattr(genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(genai, "GenerativeModel", FakeModel)
+    return MedicalAIService()
+
+
+@pytest.mark.anyio
+async def test_service_reuses_analysis_only_for_identical_uploads_by_default(monkeypatch):
+    calls: List[Any] = []
+    service = _vision_service(monkeypatch, calls)
+
+    scan = _scan()
+    other_patient = scan.copy()
+    other_patient.putpixel((5, 5), 255)  # a different scan of the same view, same dHash
+    first, second = preprocess_image(_jpeg(scan)), preprocess_image(_jpeg(other_patient))
+    assert first.dhash == second.dhash and first.data != second.data
+
+    await service.analyze_medical_image("Is there a fracture?", first)
+    await service.analyze_medical_image("is there a fracture", preprocess_image(_jpeg(scan)))
+    await service.analyze_medical_image("Is there a fracture?", second)
+    await service.analyze_medical_image("Is there a fracture?", preprocess_image(_jpeg(scan, quality=55)))
+
+    assert len(calls) == 3  # only the byte-identical re-upload was served from the cache
+
+
+@pytest.mark.anyio
+async def test_service_reuses_analysis_for_recompressed_upload_when_opted_in(monkeypatch):
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "IMAGE_CACHE_MAX_DISTANCE", 6)
+    calls: List[Any] = []
+    service = _vision_service(monkeypatch, calls)
+
+    scan = _scan()
+    first = await service.analyze_medical_image("Is there a fracture?", preprocess_image(_jpeg(scan)))
+    again = await service.analyze_medical_image("is there a fracture", preprocess_image(_jpeg(scan, quality=55)))
+    other = await service.analyze_medical_image("Is there a fracture?", preprocess_image(_jpeg(_scan(seed=1))))
+
+    assert again == first
+    assert other == first  # same canned model answer, but it took a second call
+    assert len(calls) == 2
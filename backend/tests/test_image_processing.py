@@ -0,0 +1,146 @@
+from io import BytesIO
+
+import pytest
+from app.main import app
+from app.services.image_processing import (ImagePoolSaturated, ImageProcessor, PreparedImage, preprocess_image,
+                                           to_vision_part)
+from fastapi.testclient import TestClient
+from PIL import Image
+
+client = TestClient(app)
+
+
+def _encode(size, mode="RGB", fmt="JPEG", color=(120, 60, 30, 255)) -> bytes:
+    buffer = BytesIO()
+    Image.new(mode, size, color=color[: len(mode)] if len(mode) > 1 else color[0]).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _noise(size, mode="RGB") -> Image.Image:
+    channels = [Image.effect_noise(size, 64) for _ in range(len(mode))]
+    return channels[0] if mode == "L" else Image.merge(mode, channels)
+
+
+def test_preprocess_downscales_large_jpeg_and_normalizes_mode():
+    buffer = BytesIO()
+    _noise((4000, 3000)).save(buffer, format="JPEG")
+    prepared = preprocess_image(buffer.getvalue(), max_size=1024)
+    processed = Image.open(BytesIO(prepared.data))
+    assert prepared.mime_type == "image/jpeg"
+    assert processed.mode == "RGB"
+    assert max(processed.size) == 1024
+    assert (prepared.width, prepared.height) == processed.size
+
+    png = preprocess_image(_encode((300, 200), mode="RGBA", fmt="PNG"))
+    assert Image.open(BytesIO(png.data)).mode == "RGB"
+    assert (png.width, png.height) == (300, 200)
+
+
+def test_model_ready_jpeg_is_passed_through_untouched():
+    upload = _encode((800, 600))
+    prepared = preprocess_image(upload)
+
+    assert prepared.data is upload
+    assert (prepared.mime_type, prepared.width, prepared.height) == ("image/jpeg", 800, 600)
+
+
+def test_jpeg_metadata_is_stripped_before_the_model_sees_it():
+    exif = Image.Exif()
+    exif[0x010F] = "ScannerCo"  # Make
+    exif[0x0131] = "PACS export, patient 12345"  # Software
+    buffer = BytesIO()
+    Image.new("RGB", (800, 600), color=(120, 60, 30)).save(buffer, format="JPEG", exif=exif, comment=b"Jane Doe")
+
+    prepared = preprocess_image(buffer.getvalue())
+
+    assert prepared.data != buffer.getvalue()
+    with Image.open(BytesIO(prepared.data)) as sent:
+        assert not sent.getexif() and "comment" not in sent.info
+        assert sent.size == (800, 600)
+
+
+def test_encoding_adapts_to_grayscale_and_byte_budget():
+    scan = Image.merge("RGB", [_noise((1500, 1500), "L")] * 3)
+    buffer = BytesIO()
+    scan.save(buffer, format="PNG")
+
+    prepared = preprocess_image(buffer.getvalue(), max_size=1024, max_bytes=150_000)
+    decoded = Image.open(BytesIO(prepared.data))
+
+    assert decoded.mode == "L"
+    assert prepared.mime_type == "image/jpeg"
+    assert len(prepared.data) <= 150_000
+
+    # Flat-colour diagrams stay lossless
+    diagram = preprocess_image(_encode((400, 400), fmt="PNG"))
+    assert diagram.mime_type == "image/png"
+
+
+def test_vision_part_hands_encoded_bytes_over_without_decoding():
+    upload = _encode((64, 64))
+
+    assert to_vision_part(PreparedImage(upload, "image/jpeg", 64, 64)) == {"mime_type": "image/jpeg", "data": upload}
+    assert to_vision_part(memoryview(upload)) == {"mime_type": "image/jpeg", "data": upload}
+
+    decoded = Image.open(BytesIO(upload))
+    assert to_vision_part(decoded) is decoded
+
+
+@pytest.mark.anyio
+async def test_processor_runs_on_worker_processes():
+    processor = ImageProcessor(max_workers=1, max_pending=2)
+    try:
+        prepared = await processor.preprocess(_encode((2048, 2048)))
+    finally:
+        processor.shutdown()
+
+    assert (prepared.width, prepared.height) == (1024, 1024)
+    assert processor.pending == 0
+
+
+@pytest.mark.anyio
+async def test_processor_rejects_work_beyond_queue_depth():
+    processor = ImageProcessor(max_workers=0, max_pending=0)
+    with pytest.raises(ImagePoolSaturated):
+        await processor.preprocess(_encode((10, 10), fmt="PNG"))
+
+    # Uploads that need no processing never touch the pool
+    assert (await processor.preprocess(_encode((10, 10)))).mime_type == "image/jpeg"
+
+
+def test_analyze_returns_503_when_image_pool_is_saturated(monkeypatch):
+    from app.api import endpoints
+
+    monkeypatch.setattr(endpoints, "image_processor", ImageProcessor(max_workers=0, max_pending=0))
+    response = client.post(
+        "/api/v1/analyze",
+        data={"query": "Please review this chest X-ray", "mode": "image"},
+        files={"image": ("scan.png", _encode((64, 64), fmt="PNG"), "image/png")},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+def test_analyze_passes_prepared_image_to_vision_model(monkeypatch):
+    from app.api import endpoints
+
+    received = {}
+
+    async def fake_analyze(query: str, image=None):
+        received["image"] = image
+        return {"response": "No acute findings.", "confidence_score": 0.8}
+
+    monkeypatch.setattr(endpoints.ai_service, "analyze_medical_image", fake_analyze)
+    monkeypatch.setattr(endpoints, "save_query_to_db", lambda **kwargs: None)
+    upload = _encode((512, 512))
+    response = client.post(
+        "/api/v1/analyze",
+        data={"query": "Please review this chest X-ray", "mode": "image"},
+        files={"image": ("scan.jpg", upload, "image/jpeg")},
+    )
+
+    assert response.status_code == 200
+    prepared = received["image"]
+    assert (prepared.data, prepared.mime_type, prepared.width, prepared.height) == (upload, "image/jpeg", 512, 512)
+    assert prepared.dhash is not None
@@ -0,0 +1,150 @@
+import os
+import tracemalloc
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+import pytest
+from app.api.middleware import BodySizeLimitMiddleware
+from app.main import app
+from app.services.image_processing import ImageProcessor
+from app.services.image_upload import UnsupportedImage, UploadTooLarge, ingest_upload, sniff_image_type
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+from starlette.datastructures import Headers
+from starlette.datastructures import UploadFile as StarletteUploadFile
+
+client = TestClient(app)
+
+
+def _upload(data: bytes, content_type: str = "image/jpeg") -> StarletteUploadFile:
+    # What the form parser hands the endpoint: a spooled file, rolled to disk past 1 MB
+    file = SpooledTemporaryFile(max_size=1024 * 1024)
+    file.write(data)
+    file.seek(0)
+    return StarletteUploadFile(file, size=len(data), headers=Headers({"content-type": content_type}))
+
+
+def _jpeg(size=(64, 64), quality=75) -> bytes:
+    buffer = BytesIO()
+    Image.effect_noise(size, 64).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def test_sniffs_real_format_from_magic_bytes():
+    png = BytesIO()
+    Image.new("L", (8, 8)).save(png, format="PNG")
+    webp = BytesIO()
+    Image.new("RGB", (8, 8)).save(webp, format="WEBP")
+
+    assert sniff_image_type(_jpeg()) == "image/jpeg"
+    assert sniff_image_type(png.getvalue()) == "image/png"
+    assert sniff_image_type(webp.getvalue()) == "image/webp"
+    assert sniff_image_type(b"%PDF-1.7\n") is None
+
+
+@pytest.mark.anyio
+async def test_ingest_stops_at_the_limit_and_checks_the_type():
+    data = _jpeg((256, 256))
+
+    spooled = _upload(data)
+    with await ingest_upload(spooled, max_bytes=len(data)) as upload:
+        assert (upload.size, upload.mime_type) == (len(data), "image/jpeg")
+        assert open(upload.path, "rb").read() == data
+        # The spooled file itself, not a second copy on disk
+        assert os.stat(upload.path).st_ino == os.fstat(spooled.file.fileno()).st_ino
+
+    unsized = _upload(data)
+    unsized.size = None  # no recorded size: measured from the spooled file
+    with pytest.raises(UploadTooLarge):
+        await ingest_upload(unsized, max_bytes=len(data) - 1, chunk_bytes=1024)
+    with pytest.raises(UnsupportedImage):
+        await ingest_upload(_upload(b"<html>not a scan</html>"), max_bytes=1024)
+
+
+@pytest.mark.anyio
+async def test_ingest_copies_only_when_the_spooled_file_has_no_path(monkeypatch):
+    from app.services import image_upload
+
+    data = _jpeg()
+    monkeypatch.setattr(image_upload, "_reopenable_path", lambda file: None)
+
+    with await ingest_upload(_upload(data), max_bytes=len(data)) as upload:
+        assert open(upload.path, "rb").read() == data
+    assert not os.path.exists(upload.path)
+
+
+@pytest.mark.anyio
+async def test_large_upload_is_processed_without_a_heap_copy():
+    data = _jpeg((4000, 3000), quality=95)
+    upload_file = _upload(data)
+    size = len(data)
+    del data
+
+    tracemalloc.start()
+    try:
+        with await ingest_upload(upload_file, max_bytes=size) as upload:
+            prepared = await ImageProcessor(max_workers=0).preprocess(upload.path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert size > 5_000_000
+    assert (prepared.width, prepared.height) == (1024, 768)
+    # Reading the upload into bytes would alone have cost ``size``
+    assert peak < 2 * 1024 * 1024
+
+
+
+@pytest.mark.anyio
+async def test_worker_processes_read_the_spooled_upload():
+    data = _jpeg((2048, 1536))
+    processor = ImageProcessor(max_workers=1)
+    try:
+        with await ingest_upload(_upload(data), max_bytes=len(data)) as upload:
+            prepared = await processor.preprocess(upload.path)
+    finally:
+        processor.shutdown()
+
+    assert (prepared.width, prepared.height) == (1024, 768)
+
+def test_endpoint_rejects_uploads_by_content_and_mode_limit(monkeypatch):
+    from app.api import endpoints
+
+    disguised = client.post(
+        "/api/v1/analyze",
+        data={"query": "Please review this chest X-ray", "mode": "image"},
+        files={"image": ("scan.png", b"MZ\x90\x00 definitely not an image", "image/png")},
+    )
+    assert disguised.status_code == 415
+
+    monkeypatch.setitem(endpoints.settings.IMAGE_UPLOAD_MAX_BYTES, "quick", 1024)
+    too_large = client.post(
+        "/api/v1/analyze",
+        data={"query": "Please review this chest X-ray", "mode": "quick"},
+        files={"image": ("scan.jpg", _jpeg((256, 256)), "image/jpeg")},
+    )
+    assert too_large.status_code == 413
+
+
+def test_body_limit_answers_before_the_form_is_parsed():
+    limited = FastAPI()
+    limited.add_middleware(BodySizeLimitMiddleware, max_bytes=1024)
+    parsed = []
+
+    @limited.post("/upload")
+    async def upload(image: UploadFile = File(...)):
+        parsed.append(image.filename)
+        return {"ok": True}
+
+    limited_client = TestClient(limited)
+    declared = limited_client.post("/upload", files={"image": ("a.jpg", b"x" * 4096, "image/jpeg")})
+    streamed = limited_client.post(
+        "/upload",
+        content=(b"x" * 512 for _ in range(8)),  # chunked, no Content-Length
+        headers={"Content-Type": "multipart/form-data; boundary=abc"},
+    )
+    small = limited_client.post("/upload", files={"image": ("a.jpg", b"x" * 100, "image/jpeg")})
+
+    assert declared.status_code == 413 and streamed.status_code == 413
+    assert small.status_code == 200 and parsed == ["a.jpg"]
@@ -0,0 +1,95 @@
+from typing import Any, Dict
+
+import pytest
+from app.utils import cache as cache_module
+from app.utils.cache import L1Cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1000.0}
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now["t"])
+    return now
+
+
+def test_hits_misses_and_ttl_expiry(clock):
+    cache = L1Cache("test", max_bytes=1024, ttl_seconds=10)
+
+    assert cache.get("a") is None
+    cache.set("a", {"response": "x"}, size=100)
+    assert cache.get("a") == {"response": "x"}
+
+    clock["t"] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+    assert cache.current_bytes == 0
+
+
+def test_memory_ceiling_evicts_least_recently_used(clock):
+    cache = L1Cache("test", max_bytes=300, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        cache.get(key)
+        cache.set(key, key, size=100)
+
+    cache.get("a")  # "b" becomes the LRU entry
+    for _ in range(3):
+        cache.get("d")
+    assert cache.set("d", "d", size=100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    assert cache.current_bytes <= 300
+    assert cache.evictions == 1
+    assert not cache.set("huge", "x", size=301)
+
+
+def test_tinylfu_admission_protects_hot_entries(clock):
+    cache = L1Cache("test", max_bytes=200, ttl_seconds=60)
+    for key in ("hot1", "hot2"):
+        for _ in range(5):
+            cache.get(key)
+        cache.set(key, key, size=100)
+
+    # A one-off query must not flush a frequently requested answer
+    cache.get("one-off")
+    assert cache.set("one-off", "x", size=100) is False
+    assert cache.get("hot1") == "hot1"
+    assert cache.get("hot2") == "hot2"
+    assert cache.rejections == 1
+
+
+def test_zero_ceiling_disables_cache():
+    cache = L1Cache("test", max_bytes=0, ttl_seconds=60)
+    assert cache.set("a", "a", size=1) is False
+    assert cache.get("a") is None
+
+
+@pytest.mark.anyio
+async def test_service_serves_hot_answers_without_redis_round_trip(monkeypatch):
+    from app.services.search_service import MedicalSearchService
+
+    class CountingRedis:
+        def __init__(self) -> None:
+            self.store: Dict[str, str] = {}
+            self.gets = 0
+
+        async def get(self, key: str) -> Any:
+            self.gets += 1
+            return self.store.get(key)
+
+        async def setex(self, key: str, ttl: int, value: str) -> None:
+            self.store[key] = value
+
+    redis_client = CountingRedis()
+    monkeypatch.setattr(MedicalSearchService, "_create_redis_client", lambda self: redis_client)
+    service = MedicalSearchService()
+
+    await service._persist_cache("k", {"results": [], "context": "cached"})
+    service._l1.clear()
+
+    # First read comes from Redis and is promoted into L1; later reads stay local
+    for _ in range(5):
+        assert (await service._fetch_cache("k"))["context"] == "cached"
+    assert redis_client.gets == 1
+    assert service._l1.stats()["hits"] == 4
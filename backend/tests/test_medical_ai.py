@@ -13,7 +13,7 @@ client = TestClient(app)
 def stub_external_services(monkeypatch):
     from app.api import endpoints
 
-    async def fake_search(query: str) -> Dict[str, Any]:
+    async def fake_search(query: str, mode: str = "quick") -> Dict[str, Any]:
         return {
             "results": [
                 {
@@ -27,7 +27,7 @@ def stub_external_services(monkeypatch):
             "query": query,
         }
 
-    async def fake_generate_response(query: str, search_context: str):
+    async def fake_generate_response(query: str, search_context: str, session_id: str = None):
         return {
             "response": f"Mock response for: {query}",
             "confidence_score": 0.8,
@@ -65,6 +65,25 @@ def test_medical_query():
     assert data["sources"] == ["https://example.com"]
 
 
+def test_analyze_deep_search_returns_source_details(monkeypatch):
+    from app.api import endpoints
+
+    async def fake_generate_response(query: str, search_context: str = None, mode: str = "quick", session_id=None):
+        return {"response": "Oseltamivir within 48 hours.", "confidence_score": 0.8, "model_used": "gemini-pro"}
+
+    monkeypatch.setattr(endpoints.ai_service, "generate_response", fake_generate_response)
+    monkeypatch.setattr(endpoints, "save_query_to_db", lambda **kwargs: None)
+
+    response = client.post(
+        "/api/v1/analyze", data={"query": "How is seasonal influenza treated?", "mode": "deep_search"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["sources"] == [
+        {"title": "Mock Source", "content": "Example medical content.", "url": "https://example.com", "score": 0.9}
+    ]
+
+
 def test_emergency_query_validation():
     from app.services.medical_validator import MedicalValidator
 
@@ -0,0 +1,43 @@
+import pytest
+from app.services.medical_validator import (MedicalValidator, compile_phrases,
+                                            normalize_text)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "I can’t breathe after climbing stairs",  # curly apostrophe
+        "I CAN'T BREATHE properly at night",
+        "Thoughts of self‐harm lately",  # Unicode hyphen
+        "thinking about self   harm again",
+        "ＣＨＥＳＴ ＰＡＩＮ when I run",  # full-width
+        "He had a massive heart\nattack last year",
+    ],
+)
+def test_emergency_variants_are_detected(query):
+    assert MedicalValidator().validate_query(query)["reason"] == "emergency"
+
+
+def test_validate_many_preserves_order_and_reasons():
+    validator = MedicalValidator(keywords=["chest pain"])
+
+    results = validator.validate_many(["", "Sudden chest pain", "short", "What lowers LDL cholesterol?"])
+
+    assert [r.get("reason") for r in results] == ["empty", "emergency", "too_short", None]
+    assert results[3] == {"valid": True}
+
+
+def test_keyword_file_and_large_phrase_sets(tmp_path):
+    keywords = tmp_path / "keywords.txt"
+    keywords.write_text("# comment\n\nAnaphylaxis\nanaphylactic shock\n", encoding="utf-8")
+    validator = MedicalValidator(keywords_file=str(keywords))
+    assert validator.dangerous_keywords == {"anaphylaxis", "anaphylactic shock"}
+    assert validator.validate_query("Is this ANAPHYLACTIC shock?")["reason"] == "emergency"
+    assert validator.validate_query("What does an allergist treat?") == {"valid": True}
+
+    # Shared prefixes collapse into one trie; substring semantics match `in`
+    phrases = [f"symptom code {i:04d}" for i in range(5000)] + ["sympt"]
+    pattern = compile_phrases(phrases)
+    assert pattern.search(normalize_text("Asymptomatic carrier"))
+    assert compile_phrases(phrases[:5000]).search("symptom code 4321 observed")
+    assert not compile_phrases(phrases[:5000]).search("symptom code 99")
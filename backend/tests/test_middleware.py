@@ -0,0 +1,69 @@
+import logging
+
+from app.api.middleware import (HTTP_REQUEST_SECONDS, RateLimitMiddleware,
+                                RequestIDMiddleware, TimingMiddleware)
+from app.utils.logger import RequestIDFilter
+from app.utils.rate_limiter import TokenBucketLimiter
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+
+def _build_app() -> FastAPI:
+    api = FastAPI()
+    api.add_middleware(RateLimitMiddleware, limiter=TokenBucketLimiter(rate_per_second=0.1, burst=1))
+    api.add_middleware(TimingMiddleware)
+    api.add_middleware(RequestIDMiddleware)
+
+    @api.get("/whoami")
+    async def whoami(request: Request):
+        record = logging.LogRecord("test", logging.INFO, __file__, 0, "msg", None, None)
+        RequestIDFilter().filter(record)
+        return {"state": request.state.request_id, "logged": record.request_id}
+
+    @api.get("/health/stream")
+    async def stream():
+        async def chunks():
+            for part in ("a", "b", "c"):
+                yield part
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return api
+
+
+def test_request_id_is_generated_echoed_and_logged():
+    client = TestClient(_build_app())
+
+    generated = client.get("/whoami")
+    request_id = generated.headers["x-request-id"]
+    assert len(request_id) == 32
+    assert generated.json() == {"state": request_id, "logged": request_id}
+
+    # Rejected by the limiter, but still tagged with the caller's id
+    limited = client.get("/whoami", headers={"X-Request-ID": "trace-42"})
+    assert limited.status_code == 429
+    assert limited.headers["x-request-id"] == "trace-42"
+
+    spoofed = client.get("/health/stream", headers={"X-Request-ID": "<script>" * 20})
+    assert len(spoofed.headers["x-request-id"]) == 32
+
+
+def test_timing_header_and_histogram_cover_streaming_responses():
+    client = TestClient(_build_app())
+    labels = {"method": "GET", "handler": "stream", "status": "200"}
+    count_before = _count(labels)
+
+    response = client.get("/health/stream")
+
+    assert response.text == "abc"
+    assert response.headers["server-timing"].startswith("app;dur=")
+    assert _count(labels) == count_before + 1
+
+
+def _count(labels) -> float:
+    for metric in HTTP_REQUEST_SECONDS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_count") and sample.labels == labels:
+                return sample.value
+    return 0.0
@@ -0,0 +1,209 @@
+import importlib.util
+import io
+import json
+import random
+import struct
+import tracemalloc
+from email.message import Message
+from pathlib import Path
+
+import pytest
+
+API_DIR = Path(__file__).resolve().parents[2] / "api"
+BOUNDARY = "----MediverseFormBoundary7MA4YWxkTrZu0gW"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def _load(name: str):
+    spec = importlib.util.spec_from_file_location(name, API_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+multipart = _load("_multipart")
+
+
+def _form(query: str, image: bytes = None, mime: str = "image/png") -> bytes:
+    parts = [
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="query"\r\n\r\n{query}\r\n'.encode(),
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="mode"\r\n\r\nimage\r\n'.encode(),
+    ]
+    if image is not None:
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="image"; filename="scan.png"\r\n'
+            f"Content-Type: {mime}\r\n\r\n".encode()
+            + image
+            + b"\r\n"
+        )
+    parts.append(f"--{BOUNDARY}--\r\n".encode())
+    return b"".join(parts)
+
+
+def _bmp_header(width: int, height: int) -> bytes:
+    pixels = width * height * 3
+    return (
+        b"BM" + struct.pack("<IHHI", 54 + pixels, 0, 0, 54)
+        + struct.pack("<IiiHHIIiiII", 40, width, height, 1, 24, 0, pixels, 2835, 2835, 0, 0)
+    )
+
+
+class GeneratedUpload(io.RawIOBase):
+    """A multipart body with a ``size``-byte file part, produced as it is read.
+
+    The file part starts with ``prefix`` (e.g. an image header) and continues
+    with binary filler.
+    """
+
+    def __init__(self, size: int, prefix: bytes = b"") -> None:
+        self.head = (
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="query"\r\n\r\nAny fracture?\r\n'
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="image"; filename="ct.bmp"\r\n'
+            "Content-Type: image/png\r\n\r\n"
+        ).encode() + prefix
+        self.tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+        self.size = size
+        self.length = len(self.head) + size + len(self.tail)
+        self.position = 0
+        self.block = bytes(range(256)) * 256  # binary, with CR/LF and dashes
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        count = min(len(target), self.length - self.position)
+        written = 0
+        while written < count:
+            offset = self.position + written
+            if offset < len(self.head):
+                piece = self.head[offset:]
+            elif offset < len(self.head) + self.size:
+                start = (offset - len(self.head)) % len(self.block)
+                piece = self.block[start : start + self.size - (offset - len(self.head))]
+            else:
+                piece = self.tail[offset - len(self.head) - self.size :]
+            piece = piece[: count - written]
+            target[written : written + len(piece)] = piece
+            written += len(piece)
+        self.position += written
+        return written
+
+
+@pytest.mark.parametrize("chunk_bytes", [7, 64, 64 * 1024])
+def test_binary_parts_survive_any_chunking(chunk_bytes):
+    image = random.Random(1).randbytes(200_000) + f"\r\n--{BOUNDARY[:-1]}".encode()
+    body = _form("Is this a fracture? ¿Fractura?", image)
+
+    fields, files = multipart.parse_multipart(
+        io.BytesIO(body), CONTENT_TYPE, len(body), max_body_bytes=len(body), chunk_bytes=chunk_bytes, spool_bytes=4096
+    )
+
+    assert fields == {"query": "Is this a fracture? ¿Fractura?", "mode": "image"}
+    upload = files["image"]
+    assert (upload.filename, upload.content_type, upload.size) == ("scan.png", "image/png", len(image))
+    assert upload.read() == image
+    upload.close()
+
+
+def test_limits_and_malformed_bodies():
+    body = _form("What is this?", b"\x89PNG" * 100)
+
+    with pytest.raises(multipart.PayloadTooLarge):
+        multipart.parse_multipart(io.BytesIO(b""), CONTENT_TYPE, len(body), max_body_bytes=len(body) - 1)
+    with pytest.raises(multipart.PayloadTooLarge):
+        multipart.parse_multipart(io.BytesIO(body), CONTENT_TYPE, len(body), len(body), max_field_bytes=4)
+    with pytest.raises(multipart.MultipartError):
+        multipart.parse_multipart(io.BytesIO(body[:-40]), CONTENT_TYPE, len(body), len(body))
+    with pytest.raises(multipart.MultipartError):
+        multipart.parse_multipart(io.BytesIO(body), "multipart/form-data", len(body), len(body))
+
+
+def test_repeated_file_fields_are_rejected_and_closed(monkeypatch):
+    spools = []
+    spooled = multipart.SpooledTemporaryFile
+
+    def tracked(*args, **kwargs):
+        spools.append(spooled(*args, **kwargs))
+        return spools[-1]
+
+    monkeypatch.setattr(multipart, "SpooledTemporaryFile", tracked)
+    image = (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="image"; filename="scan.png"\r\n'
+        "Content-Type: image/png\r\n\r\n\x89PNG\r\n"
+    ).encode()
+    body = image * 3 + f"--{BOUNDARY}--\r\n".encode()
+
+    with pytest.raises(multipart.MultipartError, match="repeated"):
+        multipart.parse_multipart(io.BytesIO(body), CONTENT_TYPE, len(body), len(body))
+    assert len(spools) == 1 and spools[0].closed
+
+
+def _post(handler_class, body: io.RawIOBase, length: int, content_type: str = CONTENT_TYPE):
+    headers = Message()
+    headers["Content-Type"] = content_type
+    headers["Content-Length"] = str(length)
+    request = handler_class.__new__(handler_class)
+    request.rfile = io.BufferedReader(body)
+    request.wfile = io.BytesIO()
+    request.headers = headers
+    request.path = "/api/v1/analyze"
+    request.command = "POST"
+    request.request_version = "HTTP/1.1"
+    request.requestline = "POST /api/v1/analyze HTTP/1.1"
+    request.client_address = ("127.0.0.1", 0)
+    request.log_message = lambda *args: None
+    request.do_POST()
+    status_line, _, rest = request.wfile.getvalue().partition(b"\r\n")
+    return int(status_line.split()[1]), json.loads(rest.partition(b"\r\n\r\n")[2])
+
+
+def test_handler_streams_a_50mb_upload_with_flat_memory(monkeypatch):
+    from PIL import Image
+
+    index = _load("index")
+    seen = {}
+
+    def fake_generate(self, query, mode, api_key, image=None):
+        data, mime_type = image
+        with Image.open(io.BytesIO(data)) as sent:
+            seen.update(query=query, mime_type=mime_type, size=sent.size, fits=len(data) <= index.IMAGE_MAX_BYTES)
+        return {"response": "No fracture.", "mode": mode, "status": "success"}
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(index, "GEMINI_AVAILABLE", True)
+    monkeypatch.setattr(index, "MAX_UPLOAD_BYTES", 64 * 1024 * 1024)
+    monkeypatch.setattr(index.handler, "generate_medical_response", fake_generate)
+
+    # A 4096x4096 24-bit BMP: 48 MB of pixels, sent with a misleading image/png type
+    upload = GeneratedUpload(4096 * 4096 * 3, prefix=_bmp_header(4096, 4096))
+    tracemalloc.start()
+    try:
+        status, body = _post(index.handler, upload, upload.length)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert status == 200 and body["response"] == "No fracture."
+    assert seen == {"query": "Any fracture?", "mime_type": "image/jpeg", "size": (1024, 1024), "fits": True}
+    assert peak < 4 * 1024 * 1024  # the old parser held several copies of the 50 MB body
+
+
+def test_handler_sniffs_the_image_type_from_its_bytes(monkeypatch):
+    index = _load("index")
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(index, "GEMINI_AVAILABLE", True)
+    body = _form("What is this?", b"MZ\x90\x00 definitely not a scan", mime="image/png")
+
+    status, response = _post(index.handler, io.BytesIO(body), len(body))
+
+    assert status == 415 and "JPEG, PNG" in response["error"]
+
+
+def test_handler_refuses_oversized_bodies_before_reading(monkeypatch):
+    index = _load("index")
+    upload = GeneratedUpload(50 * 1024 * 1024)
+
+    status, body = _post(index.handler, upload, upload.length)
+
+    assert status == 413 and body["details"]["max_bytes"] == index.MAX_UPLOAD_BYTES
+    assert upload.position == 0
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict
+
+import pytest
+from app.services.provider_tape import (ProviderTape, TapedChatModel,
+                                        TapedSearchClient, TapeEntry, TapeMiss,
+                                        replay_chunks)
+
+
+class FakeChunk:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class FakeChatModel:
+    model = "fake-gemini"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def ainvoke(self, prompt: str) -> FakeChunk:
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return FakeChunk(f"Answer to: {prompt}")
+
+    async def astream(self, prompt: str):
+        self.calls += 1
+        await asyncio.sleep(0.1)
+        for token in ["Rest ", "and ", "fluids."]:
+            yield FakeChunk(token)
+            await asyncio.sleep(0.05)
+
+
+class FakeTavily:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def search(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+        self.calls += 1
+        return {"query": query, "results": [{"title": "CDC", "url": "https://cdc.gov", "content": "Flu care."}]}
+
+
+@pytest.mark.anyio
+async def test_recorded_calls_replay_without_the_provider(tmp_path):
+    path = tmp_path / "tape.jsonl.gz"
+    recorder = ProviderTape(str(path), mode="record")
+    llm, tavily = FakeChatModel(), FakeTavily()
+    taped, search = TapedChatModel(llm, recorder, "gemini"), TapedSearchClient(tavily, recorder)
+
+    message = await taped.ainvoke("What helps a cold?")
+    streamed = [chunk.content async for chunk in taped.astream("What helps flu?")]
+    found = await search.search("flu", max_results=3, timeout=2.0)
+
+    assert message.content == "Answer to: What helps a cold?" and streamed == ["Rest ", "and ", "fluids."]
+    entries = recorder.load()
+    assert [(entry.kind, entry.provider) for entry in entries] == [("llm", "gemini"), ("llm", "gemini"), ("search", "tavily")]
+    assert entries[1].chunks == streamed and 90 <= entries[1].first_token_ms < 150
+    assert entries[1].completion_tokens > 0 and entries[2].request == {"query": "flu", "max_results": 3}
+
+    replayer = ProviderTape(str(path), mode="replay", latency="recorded")
+    offline = TapedChatModel(llm, replayer, "gemini")
+    started = time.perf_counter()
+    chunks = [chunk async for chunk in offline.astream("What helps flu?")]
+    elapsed = time.perf_counter() - started
+
+    assert chunks == streamed and 0.2 <= elapsed < 0.35  # first token after ~0.1s, then the recorded gaps
+    assert await offline.ainvoke("What helps a cold?") == "Answer to: What helps a cold?"
+    assert await TapedSearchClient(None, replayer).search("flu", max_results=3) == found
+    assert (llm.calls, tavily.calls) == (2, 1)  # nothing reached the providers on replay
+
+
+@pytest.mark.anyio
+async def test_misses_are_sampled_or_refused(tmp_path):
+    path = tmp_path / "tape.jsonl"
+    recorder = ProviderTape(str(path), mode="record")
+    await TapedSearchClient(FakeTavily(), recorder).search("flu")
+    recorder.close()
+
+    sampled = ProviderTape(str(path), mode="replay", latency="none", seed=1)
+    strict = ProviderTape(str(path), mode="replay", latency="none", on_miss="error")
+
+    assert (await TapedSearchClient(None, sampled).search("measles"))["query"] == "flu"
+    with pytest.raises(TapeMiss):
+        await TapedSearchClient(None, strict).search("measles")
+
+
+def test_sampled_latency_paces_tokens_at_recorded_rates(tmp_path):
+    tape = ProviderTape(str(tmp_path / "tape.jsonl"), mode="record")
+    for first_token_ms in (100.0, 300.0):
+        # 40 tokens in one second after the first chunk: 40 tokens/s
+        tape.append(
+            TapeEntry(
+                kind="llm", provider="gemini", model="m", key=str(first_token_ms), request={"prompt": "p"},
+                response="x" * 160, chunks=["x" * 40] * 4, first_token_ms=first_token_ms,
+                total_ms=first_token_ms + 1000, completion_tokens=40,
+            )
+        )
+    tape.close()
+    replay = ProviderTape(str(tmp_path / "tape.jsonl"), mode="replay", latency="sampled", latency_scale=0.1, seed=3)
+
+    first, gaps = replay._pacing(replay.load()[0], ["x" * 40] * 4)
+
+    assert round(first, 6) in (0.01, 0.03)  # one of the recorded first-token times, scaled
+    assert gaps == [pytest.approx(10 / 40 * 0.1)] * 3  # each 10-token chunk at 40 tokens/s, scaled
+
+
+
+def test_appends_are_written_off_the_calling_thread_to_one_handle(monkeypatch, tmp_path):
+    tape = ProviderTape(str(tmp_path / "tape.jsonl.gz"), mode="record")
+    opened = []
+    open_file = tape._open
+    monkeypatch.setattr(tape, "_open", lambda mode: opened.append(threading.current_thread()) or open_file(mode))
+
+    for index in range(20):
+        tape.append(TapeEntry(kind="search", provider="tavily", model="search", key=str(index), request={}, response={}))
+
+    assert [entry.key for entry in tape.load()] == [str(index) for index in range(20)]
+    assert len(opened) == 2 and opened[0] is not threading.current_thread()  # the writer's handle, then load()
+
+
+def test_interrupted_tape_loads_up_to_the_last_flushed_entry(tmp_path):
+    import gzip
+
+    path = tmp_path / "tape.jsonl.gz"
+    handle = gzip.open(path, "at", encoding="utf-8")
+    handle.write('{"kind":"search","provider":"tavily","model":"search","key":"k","request":{},"response":{}}\n')
+    handle.flush()  # the process dies before the gzip member is finished
+
+    assert [entry.key for entry in ProviderTape(str(path), mode="replay").load()] == ["k"]
+    handle.close()
+
+def test_unstreamed_answers_replay_as_token_chunks():
+    text = "Paracetamol or ibuprofen can ease fever and aches; see a clinician if symptoms last beyond a week."
+    entry = TapeEntry(kind="llm", provider="openrouter", model="m", key="k", request={}, response=text)
+
+    chunks = replay_chunks(entry)
+
+    assert "".join(chunks) == text and len(chunks) > 2
+
+
+@pytest.mark.anyio
+async def test_services_use_the_configured_tape(monkeypatch, tmp_path):
+    from app.config import get_settings
+    from app.services import ai_service, provider_tape, search_service
+
+    class FakeGemini(FakeChatModel):
+        def __init__(self, **kwargs: Any) -> None:
+            super().__init__()
+
+    monkeypatch.setattr(ai_service, "ChatGoogleGenerativeAI", FakeGemini)
+    monkeypatch.setattr(search_service, "AsyncTavilyClient", lambda **kwargs: FakeTavily())
+    monkeypatch.setattr(ai_service.MedicalAIService, "_create_redis_client", lambda self: None)
+    monkeypatch.setattr(search_service.MedicalSearchService, "_create_redis_client", lambda self: None)
+    monkeypatch.setattr(provider_tape, "_TAPES", {})
+    monkeypatch.setenv("PROVIDER_TAPE_PATH", str(tmp_path / "tape.jsonl.gz"))
+    monkeypatch.setenv("PROVIDER_TAPE_LATENCY", "none")
+
+    try:
+        monkeypatch.setenv("PROVIDER_TAPE_MODE", "record")
+        get_settings.cache_clear()
+        recorded = await ai_service.MedicalAIService().generate_response("What helps a sore throat?")
+        await search_service.MedicalSearchService().search_medical_info("sore throat")
+
+        monkeypatch.setenv("PROVIDER_TAPE_MODE", "replay")
+        get_settings.cache_clear()
+        monkeypatch.setattr(FakeGemini, "ainvoke", None)  # replay must not call the model
+        replayed = await ai_service.MedicalAIService().generate_response("What helps a sore throat?")
+        search = search_service.MedicalSearchService()
+        results = await search.search_medical_info("sore throat")
+    finally:
+        get_settings.cache_clear()
+
+    assert replayed["response"] == recorded["response"] and replayed["model_used"] == "fake-gemini"
+    assert results["results"][0]["url"] == "https://cdc.gov"
+    assert isinstance(search.client, TapedSearchClient) and search.client._client.calls == 0
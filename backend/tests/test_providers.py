@@ -0,0 +1,69 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+from app.services import providers
+from app.services.providers import ProviderRegistry
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_registry_builds_each_configuration_once():
+    registry = ProviderRegistry()
+    built: List[str] = []
+
+    def factory(name: str):
+        return lambda: built.append(name) or object()
+
+    first = registry.get("openrouter", "m", factory("a"), temperature=0.5, headers={"X-Title": "x"})
+    again = registry.get("openrouter", "m", factory("b"), headers={"X-Title": "x"}, temperature=0.5)
+    other = registry.get("openrouter", "m", factory("c"), temperature=0.7, headers={"X-Title": "x"})
+
+    assert first is again and other is not first
+    assert built == ["a", "c"] and len(registry) == 2
+
+
+def test_serverless_copy_matches_backend_module():
+    mirror = REPO_ROOT / "api" / "_providers.py"
+
+    assert mirror.read_text() == Path(providers.__file__).read_text()
+
+
+@pytest.mark.anyio
+async def test_one_worker_serves_many_generations_concurrently(monkeypatch):
+    import google.generativeai as genai
+    from app.services.ai_service import MedicalAIService
+
+    constructed: List[str] = []
+    configured: List[str] = []
+
+    class FakeResponse:
+        text = "The image shows no acute abnormality."
+
+    class FakeModel:
+        def __init__(self, model_name: str) -> None:
+            constructed.append(model_name)
+
+        async def generate_content_async(self, contents: Any) -> FakeResponse:
+            await asyncio.sleep(0.2)  # upstream generation time
+            return FakeResponse()
+
+    monkeypatch.setattr(MedicalAIService, "_create_redis_client", lambda self: None)
+    monkeypatch.setattr(genai, "configure", lambda **kwargs: configured.append(kwargs["api_key"]))
+    monkeypatch.setattr(genai, "GenerativeModel", FakeModel)
+    service = MedicalAIService()
+    # The LangChain text model configures the SDK and builds a model of its own
+    constructed.clear()
+    configured.clear()
+
+    started = time.monotonic()
+    results = await asyncio.gather(
+        *(service.analyze_medical_image(f"Describe scan {index}") for index in range(50))
+    )
+    elapsed = time.monotonic() - started
+
+    assert all(result["response"] for result in results)
+    assert elapsed < 1.5  # 50 x 0.2s back to back would take 10s
+    assert len(constructed) == 1 and len(configured) == 1
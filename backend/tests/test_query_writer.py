@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+from app.models.database import Base, MedicalQuery
+from app.services.query_writer import QueryWriter
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool, future=True
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, future=True)
+    factory.commits = 0
+    original = factory.class_.commit
+
+    def counting_commit(session):
+        factory.commits += 1
+        return original(session)
+
+    factory.class_ = type("CountingSession", (factory.class_,), {"commit": counting_commit})
+    yield factory
+    engine.dispose()
+
+
+def _row_count(factory) -> int:
+    with factory() as session:
+        return session.scalar(select(func.count()).select_from(MedicalQuery))
+
+
+def _submit(writer: QueryWriter, count: int) -> None:
+    for i in range(count):
+        assert writer.submit(query=f"q{i}", response="r", confidence=0.5, sources="[]")
+
+
+def test_rows_are_written_in_bulk_batches(session_factory):
+    writer = QueryWriter(session_factory, batch_size=100, flush_interval_seconds=0.2)
+    _submit(writer, 250)
+
+    assert writer.flush(timeout=10)
+    assert _row_count(session_factory) == 250
+    # 250 rows in batches of up to 100 rather than 250 transactions
+    assert session_factory.commits <= 5
+    writer.close()
+
+
+def test_partial_batch_is_flushed_after_interval(session_factory):
+    writer = QueryWriter(session_factory, batch_size=1000, flush_interval_seconds=0.05)
+    _submit(writer, 3)
+
+    time.sleep(0.5)
+    assert _row_count(session_factory) == 3
+    writer.close()
+
+
+def test_full_queue_applies_backpressure_then_drops(session_factory):
+    release = threading.Event()
+
+    def slow_factory():
+        release.wait()
+        return session_factory()
+
+    writer = QueryWriter(slow_factory, batch_size=1, max_queue=2, put_timeout_seconds=0.05)
+    results = [writer.submit(query="q0", response="r", confidence=0.5, sources="[]")]
+    while writer.pending:  # wait until the writer holds the first row
+        time.sleep(0.01)
+    results += [writer.submit(query=f"q{i}", response="r", confidence=0.5, sources="[]") for i in range(1, 5)]
+
+    assert results[:3] == [True, True, True]  # one being written, two queued
+    assert results[3:] == [False, False]
+    release.set()
+    writer.close()
+    assert _row_count(session_factory) == 3
+
+
+def test_close_drains_backlog_without_waiting_for_interval(session_factory):
+    writer = QueryWriter(session_factory, batch_size=1000, flush_interval_seconds=60)
+    _submit(writer, 50)
+
+    started = time.monotonic()
+    writer.close()
+
+    assert time.monotonic() - started < 5
+    assert _row_count(session_factory) == 50
+    # Writes after shutdown are not lost either
+    _submit(writer, 1)
+    assert _row_count(session_factory) == 51
+
+
+def test_close_does_not_hang_when_queue_is_full(session_factory):
+    release = threading.Event()
+
+    def slow_factory():
+        release.wait()
+        return session_factory()
+
+    writer = QueryWriter(slow_factory, batch_size=1, max_queue=1, put_timeout_seconds=0.05)
+    _submit(writer, 1)
+    while writer.pending:  # the writer holds the first row
+        time.sleep(0.01)
+    _submit(writer, 1)  # fills the queue
+
+    started = time.monotonic()
+    writer.close(timeout=0.2)
+    assert time.monotonic() - started < 2
+
+    release.set()
+    writer._thread.join(5)
+    assert not writer._thread.is_alive()
+    assert _row_count(session_factory) == 2
+
+
+def test_close_waits_for_rows_already_being_queued(session_factory):
+    release = threading.Event()
+
+    def slow_factory():
+        release.wait()
+        return session_factory()
+
+    writer = QueryWriter(slow_factory, batch_size=1, max_queue=1, put_timeout_seconds=5)
+    _submit(writer, 1)
+    while writer.pending:
+        time.sleep(0.01)
+    _submit(writer, 1)
+    late = threading.Thread(target=_submit, args=(writer, 1))
+    late.start()  # blocks on the full queue while close() starts
+    time.sleep(0.1)
+
+    threading.Timer(0.2, release.set).start()
+    writer.close()
+    late.join()
+
+    assert _row_count(session_factory) == 3
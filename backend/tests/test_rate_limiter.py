@@ -0,0 +1,104 @@
+from typing import Any, List
+
+import pytest
+from app.api.middleware import RateLimitMiddleware
+from app.main import app
+from app.utils.rate_limiter import RedisTokenBucketLimiter, TokenBucketLimiter
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def test_bucket_allows_burst_then_refills_at_rate():
+    limiter = TokenBucketLimiter(rate_per_second=1.0, burst=3)
+
+    assert [limiter.try_acquire("ip", now=0.0).allowed for _ in range(4)] == [True, True, True, False]
+    assert limiter.try_acquire("ip", now=0.0).retry_after == pytest.approx(1.0)
+    assert limiter.try_acquire("ip", now=1.0).allowed
+    # Weighted requests need that many tokens
+    assert not limiter.try_acquire("ip", cost=2, now=1.5).allowed
+    assert limiter.try_acquire("ip", cost=2, now=3.0).allowed
+    assert limiter.try_acquire("other-ip", now=3.0).allowed
+
+
+def test_idle_buckets_are_evicted_and_table_is_bounded():
+    limiter = TokenBucketLimiter(rate_per_second=1.0, burst=5, idle_ttl_seconds=60, max_keys=100)
+    for i in range(50):
+        limiter.try_acquire(f"10.0.0.{i}", now=0.0)
+    limiter.try_acquire("10.0.0.1", now=30.0)
+
+    limiter.try_acquire("late", now=61.0)
+    assert len(limiter) == 2  # the client seen at t=30 and the new one
+
+    for i in range(500):
+        limiter.try_acquire(f"burst-{i}", now=62.0)
+    assert len(limiter) == 100
+
+
+def test_middleware_returns_429_with_retry_after_and_skips_health():
+    api = FastAPI()
+    api.add_middleware(RateLimitMiddleware, limiter=TokenBucketLimiter(rate_per_second=0.1, burst=2))
+
+    @api.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @api.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    client = TestClient(api)
+    assert [client.get("/ping").status_code for _ in range(3)] == [200, 200, 429]
+
+    limited = client.get("/ping")
+    assert limited.json() == {"detail": "Rate limit exceeded. Please slow down and try again shortly."}
+    assert int(limited.headers["retry-after"]) >= 1
+    assert client.get("/health").status_code == 200
+
+
+def test_expensive_modes_consume_more_budget(monkeypatch):
+    from app.api import endpoints
+
+    async def fake_generate_response(query: str, search_context: str = None, mode: str = "quick", session_id=None):
+        return {"response": "Answer.", "confidence_score": 0.8}
+
+    monkeypatch.setattr(endpoints.ai_service, "generate_response", fake_generate_response)
+    monkeypatch.setattr(endpoints, "save_query_to_db", lambda **kwargs: None)
+    # Room for one expert call's extra cost (4 - 1 taken by the middleware)
+    monkeypatch.setattr(endpoints, "rate_limiter", TokenBucketLimiter(rate_per_second=0.01, burst=3))
+
+    client = TestClient(app)
+    data = {"query": "Explain the mechanism of statins", "mode": "expert"}
+    assert client.post("/api/v1/analyze", data=data).status_code == 200
+    second = client.post("/api/v1/analyze", data=data)
+    assert second.status_code == 429
+    assert "retry-after" in second.headers
+
+
+class FakeScriptRedis:
+    def __init__(self, reply: Any = None) -> None:
+        self.reply = reply
+        self.calls: List[dict] = []
+
+    def register_script(self, script: str):
+        async def run(keys, args):
+            self.calls.append({"keys": keys, "args": args})
+            if self.reply is None:
+                raise ConnectionError("redis down")
+            return self.reply
+
+        return run
+
+
+@pytest.mark.anyio
+async def test_redis_limiter_runs_one_script_call_and_falls_back_when_down():
+    shared = FakeScriptRedis(reply=[0, "0.5", "2.5"])
+    limiter = RedisTokenBucketLimiter(shared, rate_per_second=1.0, burst=10, namespace="test")
+
+    result = await limiter.acquire("1.2.3.4", cost=3)
+    assert (result.allowed, result.remaining, result.retry_after) == (False, 0.5, 2.5)
+    assert result.retry_after_header == "3"
+    assert shared.calls == [{"keys": ["test:ratelimit:1.2.3.4"], "args": [1.0, 10, 3, 600000]}]
+
+    down = RedisTokenBucketLimiter(FakeScriptRedis(), rate_per_second=1.0, burst=1)
+    assert (await down.acquire("1.2.3.4")).allowed
+    assert not (await down.acquire("1.2.3.4")).allowed
@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+import pytest
+from app.services.semantic_cache import SemanticQueryCache, normalize_query
+
+
+def test_normalization_drops_case_punctuation_and_stopwords():
+    assert normalize_query("What are symptoms of flu?") == ["symptom", "flu"]
+    assert normalize_query("what are the symptoms of the flu") == ["symptom", "flu"]
+    assert normalize_query("I can’t sleep without pills") == ["cant", "sleep", "without", "pill"]
+
+
+def test_near_duplicates_hit_within_the_same_mode_only():
+    cache = SemanticQueryCache(threshold=0.8)
+    cache.add("What are symptoms of flu?", "quick", "key-flu")
+
+    match = cache.lookup("what are the symptoms of the flu", "quick")
+    assert match is not None
+    assert match.cache_key == "key-flu"
+    assert match.similarity == pytest.approx(1.0)
+
+    assert cache.lookup("what are the symptoms of the flu", "expert") is None
+
+
+def test_different_questions_do_not_share_answers():
+    cache = SemanticQueryCache(threshold=0.8)
+    cache.add("flu symptoms in children", "quick", "key-children")
+    cache.add("is chest tightness relieved by rest", "quick", "key-rest")
+
+    assert cache.lookup("flu symptoms in adults", "quick") is None
+    assert cache.lookup("is chest tightness not relieved by rest", "quick") is None
+    assert cache.lookup("the of and", "quick") is None
+
+
+@pytest.mark.parametrize(
+    "cached, asked",
+    [
+        ("amoxicillin dosing for a 5 year old", "amoxicillin dosing for a 15 year old"),
+        ("diet advice for type 1 diabetes", "diet advice for type 2 diabetes"),
+        ("ibuprofen 400 mg every 8 hours for back pain", "ibuprofen 800 mg every 8 hours for back pain"),
+        ("stage ii breast cancer survival rates", "stage iv breast cancer survival rates"),
+    ],
+)
+def test_doses_ages_and_disease_types_do_not_share_answers(cached, asked):
+    cache = SemanticQueryCache(threshold=0.8)
+    cache.add(cached, "quick", "key")
+
+    assert cache.lookup(asked, "quick") is None
+    assert cache.lookup(cached.capitalize() + "?", "quick").cache_key == "key"
+
+
+def test_index_is_bounded_and_supports_invalidation():
+    cache = SemanticQueryCache(max_entries=2)
+    cache.add("migraine aura treatment", "quick", "k1")
+    cache.add("asthma inhaler technique", "quick", "k2")
+    cache.add("eczema moisturizer routine", "quick", "k3")
+
+    assert len(cache) == 2
+    assert cache.lookup("migraine aura treatment", "quick") is None
+
+    cache.invalidate("k2")
+    assert cache.lookup("asthma inhaler technique", "quick") is None
+    assert cache.lookup("eczema moisturizer routine", "quick").cache_key == "k3"
+
+
+def test_band_keys_are_stable_across_processes():
+    script = (
+        "from app.services.semantic_cache import SemanticQueryCache as C; c = C();"
+        "print(c._band_keys(*c._scoped_tokens('flu symptoms in children', 'quick')))"
+    )
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=Path(__file__).resolve().parents[1],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for seed in ("1", "2")
+    }
+
+    assert len(keys) == 1
+
+@pytest.mark.anyio
+async def test_service_reuses_answer_for_rephrased_query(monkeypatch):
+    from app.services.ai_service import MedicalAIService
+
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(MedicalAIService, "_create_redis_client", lambda self: None)
+    service = MedicalAIService()
+    calls = []
+
+    async def fake_invoke_llm(llm: Any, query: str, search_context: Optional[str], chat_history: str = "") -> str:
+        calls.append(query)
+        return "Fever, cough and body aches."
+
+    monkeypatch.setattr(service, "_invoke_llm", fake_invoke_llm)
+
+    first = await service.generate_response("What are symptoms of flu?")
+    second = await service.generate_response("what are the symptoms of the flu")
+    await service.generate_response("what are the symptoms of the flu", mode="expert")
+
+    assert second == first
+    assert calls == ["What are symptoms of flu?", "what are the symptoms of the flu"]
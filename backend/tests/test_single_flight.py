@@ -0,0 +1,152 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+import pytest
+from app.utils.deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+from app.utils.singleflight import SingleFlight
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the single-flight lock protocol."""
+
+    def __init__(self) -> None:
+        self.store: Dict[str, Any] = {}
+
+    async def set(self, key: str, value: Any, nx: bool = False, px: Optional[int] = None) -> bool:
+        if nx and key in self.store:
+            return False
+        self.store[key] = value
+        return True
+
+    async def get(self, key: str) -> Any:
+        return self.store.get(key)
+
+    async def exists(self, key: str) -> int:
+        return int(key in self.store)
+
+    async def eval(self, script: str, numkeys: int, key: str, token: str) -> int:
+        if self.store.get(key) == token:
+            del self.store[key]
+            return 1
+        return 0
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_ai_requests_make_one_llm_call(monkeypatch):
+    from app.services.ai_service import MedicalAIService
+
+    monkeypatch.setattr(MedicalAIService, "_create_redis_client", lambda self: None)
+    service = MedicalAIService()
+    calls = []
+
+    async def fake_invoke_llm(llm: Any, query: str, search_context: Optional[str], chat_history: str = "") -> str:
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return "Influenza symptoms include fever and cough."
+
+    monkeypatch.setattr(service, "_invoke_llm", fake_invoke_llm)
+
+    results = await asyncio.gather(
+        *(service.generate_response("What are the symptoms of influenza?") for _ in range(100))
+    )
+
+    assert len(calls) == 1
+    assert {r["response"] for r in results} == {"Influenza symptoms include fever and cough."}
+    assert service._single_flight.inflight() == 0
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_searches_make_one_tavily_call(monkeypatch):
+    from app.services.search_service import MedicalSearchService
+
+    monkeypatch.setattr(MedicalSearchService, "_create_redis_client", lambda self: None)
+    service = MedicalSearchService()
+    calls = []
+
+    class FakeTavily:
+        async def search(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+            calls.append(query)
+            return {"results": [{"title": "CDC", "content": "Flu guidance.", "url": "https://cdc.gov"}], "query": query}
+
+    service.client = FakeTavily()
+
+    results = await asyncio.gather(*(service.search_medical_info("influenza treatment") for _ in range(100)))
+
+    assert len(calls) == 1
+    assert all(r["results"][0]["url"] == "https://cdc.gov" for r in results)
+
+
+@pytest.mark.anyio
+async def test_followers_share_leader_failure_and_survive_leader_cancellation():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def upstream() -> str:
+        started.set()
+        await release.wait()
+        return "shared"
+
+    leader = asyncio.ensure_future(flight.do("key", upstream))
+    await started.wait()
+    follower = asyncio.ensure_future(flight.do("key", upstream))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+
+    assert await follower == "shared"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    async def failing() -> str:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    outcomes = await asyncio.gather(*(flight.do("bad", failing) for _ in range(5)), return_exceptions=True)
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+    assert flight.inflight() == 0
+
+
+@pytest.mark.anyio
+async def test_each_waiter_keeps_its_own_deadline():
+    flight = SingleFlight()
+    seen = []
+
+    async def upstream() -> str:
+        seen.append(current_deadline())
+        await asyncio.sleep(0.3)
+        return "shared"
+
+    async def call(seconds: float) -> str:
+        with deadline_scope(Deadline(seconds)):
+            return await flight.do("key", upstream)
+
+    impatient, patient = await asyncio.gather(call(0.1), call(30), return_exceptions=True)
+
+    assert isinstance(impatient, DeadlineExceeded)
+    assert patient == "shared"
+    assert seen == [None]  # the shared call is not bound by the first caller's deadline
+
+
+@pytest.mark.anyio
+async def test_redis_lock_coalesces_across_workers():
+    shared_redis = FakeRedis()
+    workers = [SingleFlight(redis_client=shared_redis, poll_interval_seconds=0.01) for _ in range(2)]
+    calls = []
+
+    async def upstream() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        shared_redis.store["answer"] = "cached answer"
+        return "cached answer"
+
+    async def fetch_shared() -> Optional[str]:
+        return await shared_redis.get("answer")
+
+    results = await asyncio.gather(
+        *(workers[i % 2].do("answer", upstream, fetch_shared=fetch_shared) for i in range(100))
+    )
+
+    assert len(calls) == 1
+    assert set(results) == {"cached answer"}
+    assert "answer:lock" not in shared_redis.store
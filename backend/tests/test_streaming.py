@@ -0,0 +1,126 @@
+import json
+from typing import Any, Dict, List
+
+import pytest
+from app.main import app
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def _parse_sse(body: str) -> List[Dict[str, Any]]:
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append({"event": lines["event"], "data": json.loads(lines["data"])})
+    return events
+
+
+@pytest.fixture
+def saved_queries(monkeypatch):
+    from app.api import endpoints
+
+    saved: List[Dict[str, Any]] = []
+
+    async def fake_search(query: str, mode: str = "quick") -> Dict[str, Any]:
+        return {
+            "results": [{"title": "Mock Source", "content": "Example.", "url": "https://example.com", "score": 0.9}],
+            "context": "Evidence-based context snippet",
+            "query": query,
+        }
+
+    async def fake_stream_response(
+        query: str, search_context: str = None, mode: str = "quick", session_id: str = None
+    ):
+        for token in ["Rest ", "and ", "fluids."]:
+            yield {"event": "token", "data": token}
+        yield {
+            "event": "complete",
+            "data": {
+                "response": "Rest and fluids.",
+                "confidence_score": 0.75,
+                "model_used": "gemini-pro",
+                "medications_detected": ["Acetaminophen"],
+            },
+        }
+
+    monkeypatch.setattr(endpoints.search_service, "search_medical_info", fake_search)
+    monkeypatch.setattr(endpoints.ai_service, "stream_response", fake_stream_response)
+    monkeypatch.setattr(endpoints, "save_query_to_db", lambda **kwargs: saved.append(kwargs))
+    yield saved
+
+
+def test_query_stream_emits_tokens_then_completion(saved_queries):
+    payload = {"query": "What are the symptoms of the common cold?", "include_sources": True}
+    response = client.post("/api/v1/query/stream", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_sse(response.text)
+    assert [e["event"] for e in events] == ["token", "token", "token", "complete"]
+    assert "".join(e["data"]["text"] for e in events[:-1]) == "Rest and fluids."
+
+    final = events[-1]["data"]
+    assert final["confidence_score"] == pytest.approx(0.75)
+    assert final["sources"] == ["https://example.com"]
+    assert final["medications_detected"] == ["Acetaminophen"]
+
+    assert saved_queries == [
+        {
+            "query": payload["query"],
+            "response": "Rest and fluids.",
+            "confidence": 0.75,
+            "sources": json.dumps(["https://example.com"]),
+            "mode": "quick",
+        }
+    ]
+
+
+def test_analyze_stream_deep_search_includes_sources(saved_queries):
+    response = client.post(
+        "/api/v1/analyze/stream",
+        data={"query": "How is seasonal influenza treated?", "mode": "deep_search"},
+    )
+
+    assert response.status_code == 200
+    events = _parse_sse(response.text)
+    assert events[-1]["event"] == "complete"
+    assert events[-1]["data"]["sources"][0]["url"] == "https://example.com"
+    assert saved_queries[0]["query"] == "How is seasonal influenza treated?"
+    assert saved_queries[0]["mode"] == "deep_search"
+
+
+@pytest.mark.anyio
+async def test_stream_response_caches_completed_answer(monkeypatch):
+    from app.services.ai_service import MedicalAIService
+
+    monkeypatch.setattr(MedicalAIService, "_create_redis_client", lambda self: None)
+    service = MedicalAIService()
+
+    class FakeChunk:
+        def __init__(self, content: str) -> None:
+            self.content = content
+
+    class FakeLLM:
+        model = "fake-llm"
+
+        async def astream(self, prompt: str):
+            for token in ["Influenza ", "symptom ", "relief."]:
+                yield FakeChunk(token)
+
+    persisted: Dict[str, Any] = {}
+
+    async def fake_persist(key: str, payload: Dict[str, Any]) -> None:
+        persisted[key] = payload
+
+    service.llm = FakeLLM()
+    monkeypatch.setattr(service, "_persist_cache", fake_persist)
+
+    events = [e async for e in service.stream_response("What helps with flu symptoms?")]
+
+    assert [e["data"] for e in events if e["event"] == "token"] == ["Influenza ", "symptom ", "relief."]
+    final = events[-1]
+    assert final["event"] == "complete"
+    assert final["data"]["response"] == "Influenza symptom relief."
+    assert list(persisted.values()) == [final["data"]]
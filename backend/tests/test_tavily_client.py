@@ -0,0 +1,48 @@
+import json
+
+import httpx
+import pytest
+from app.services.tavily_client import AsyncTavilyClient
+
+
+@pytest.mark.anyio
+async def test_search_posts_payload_and_applies_per_call_timeout():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.url.path, json.loads(request.content), request.extensions["timeout"]))
+        return httpx.Response(200, json={"query": "flu", "results": [{"url": "https://cdc.gov"}]})
+
+    client = AsyncTavilyClient("key", base_url="https://tavily.test/", transport=httpx.MockTransport(handler))
+
+    result = await client.search("flu", search_depth="advanced", max_results=3, include_domains=["cdc.gov"])
+    await client.search("flu", timeout=2.5)
+    await client.aclose()
+
+    assert result["results"][0]["url"] == "https://cdc.gov"
+    path, payload, timeout = seen[0]
+    assert path == "/search"
+    assert payload["api_key"] == "key"
+    assert payload["include_domains"] == ["cdc.gov"] and payload["exclude_domains"] is None
+    assert (payload["search_depth"], payload["max_results"]) == ("advanced", 3)
+    assert timeout["read"] == 15.0 and timeout["connect"] == 3.0
+    assert seen[1][2]["read"] == 2.5
+
+
+@pytest.mark.anyio
+async def test_http_errors_surface_and_service_degrades(monkeypatch):
+    from app.services.search_service import MedicalSearchService
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(429, json={"detail": "slow down"}))
+    client = AsyncTavilyClient("key", transport=transport)
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.search("flu")
+
+    monkeypatch.setattr(MedicalSearchService, "_create_redis_client", lambda self: None)
+    service = MedicalSearchService()
+    service.client = client
+
+    result = await service.search_medical_info("seasonal flu treatment")
+
+    assert result["results"] == []
+    assert "429" in result["error"]